@@ -8,6 +8,11 @@ This script:
 3. Creates a PyInstaller executable with target triple naming
 4. Copies the sidecar to gui/src-tauri/bin/
 5. Runs tauri build to generate the final app bundle
+
+With --onedir, step 3 builds a one-directory sidecar instead, which starts
+faster because nothing is unpacked at launch, and the script stops there:
+Tauri's externalBin ships a single file, so the one-dir build is for running
+the sidecar directly and for benchmarks/startup.py.
 """
 print("Starting build script...")
 
@@ -31,6 +36,13 @@ SIDECAR_BIN_DIR = FRONTEND_DIR / "src-tauri" / "bin"
 TECTONIC_VERSION = "0.16.8"
 TECTONIC_RELEASE_URL = f"https://github.com/tectonic-typesetting/tectonic/releases/download/tectonic%40{TECTONIC_VERSION}"
 
+# Standard-library packages the sidecar never imports; keeping them out of the
+# frozen bundle makes it smaller to unpack on every launch.
+SIDECAR_EXCLUDED_MODULES = ["tkinter", "test", "idlelib"]
+# Packages whose submodules the sidecar imports on first use, which
+# PyInstaller's import analysis does not follow.
+SIDECAR_LAZY_PACKAGES = ["core.project"]
+
 
 def get_target_triple() -> str:
     """Return the Tauri target triple for the current platform."""
@@ -174,8 +186,12 @@ def build_wheel() -> Path:
     return wheel
 
 
-def build_pyinstaller(target_triple: str) -> Path:
-    """Build PyInstaller executable and return path to the binary."""
+def build_pyinstaller(target_triple: str, onedir: bool = False) -> Path:
+    """Build PyInstaller executable and return path to the binary.
+
+    With onedir, the executable sits in a directory next to its libraries
+    instead of unpacking them to a temporary directory on every launch.
+    """
     print("\n=== Building PyInstaller executable ===")
 
     sidecar_name = get_sidecar_name(target_triple)
@@ -194,6 +210,12 @@ def build_pyinstaller(target_triple: str) -> Path:
 
     copy_metadata = []
 
+    # Templates ship as one pack with shared files stored once.
+    pack_path = build_dir / "templates.pack"
+    run(["uv", "run", "python", "-m", "core.project.template_pack",
+         str(pack_path)],
+        cwd=SIDECAR_DIR)
+
     # Build the command with hidden imports
     cmd = [
         "uv",
@@ -201,7 +223,7 @@ def build_pyinstaller(target_triple: str) -> Path:
         "--group",
         "dev",
         "pyinstaller",
-        "--onefile",
+        "--onedir" if onedir else "--onefile",
         "--name",
         exe_name,
         "--distpath",
@@ -210,12 +232,16 @@ def build_pyinstaller(target_triple: str) -> Path:
         str(build_dir),
         "--specpath",
         str(build_dir),
-        # Include template files for project creation
+        # Include the template pack for project creation
         "--add-data",
-        f"{SIDECAR_DIR / 'core' / 'project' / 'templates'}:core/project/templates",
+        f"{pack_path}:core/project",
     ]
     for module in copy_metadata:
         cmd.extend(["--copy-metadata", module])
+    for module in SIDECAR_EXCLUDED_MODULES:
+        cmd.extend(["--exclude-module", module])
+    for package in SIDECAR_LAZY_PACKAGES:
+        cmd.extend(["--collect-submodules", package])
     cmd.append("api/server.py")
 
     # Run PyInstaller via uv to use the dev dependency
@@ -223,6 +249,8 @@ def build_pyinstaller(target_triple: str) -> Path:
 
     # Find the built executable
     exe_path = dist_dir / sidecar_name
+    if onedir:
+        exe_path = dist_dir / exe_name / sidecar_name
     if not exe_path.exists():
         raise FileNotFoundError(f"PyInstaller output not found: {exe_path}")
 
@@ -276,7 +304,11 @@ def main():
     build_wheel()
 
     # Step 2: Build PyInstaller executable
-    exe_path = build_pyinstaller(target_triple)
+    onedir = "--onedir" in sys.argv
+    exe_path = build_pyinstaller(target_triple, onedir=onedir)
+    if onedir:
+        print("\n=== One-dir sidecar built; skipping Tauri bundle ===")
+        return
 
     # Step 3: Copy sidecar to Tauri
     copy_sidecar(exe_path, target_triple)
@@ -1,4 +1,8 @@
-import { SIDECAR_API_BASE_URL, API_ENDPOINTS } from "./constants";
+import {
+  SERVER_API_BASE_URL,
+  SIDECAR_API_BASE_URL,
+  API_ENDPOINTS,
+} from "./constants";
 
 interface ApiResponse<T = unknown> {
   success: boolean;
@@ -94,6 +98,82 @@ export async function listFiles(
   return request(`${API_ENDPOINTS.FILES}?dir=${encodeURIComponent(dir)}`, options);
 }
 
+export interface FileEntry {
+  path: string;
+  size: number;
+}
+
+export interface DirectorySummary {
+  path: string;
+  files: number;
+  bytes: number;
+}
+
+export interface FilePage {
+  files: string[];
+  entries: FileEntry[];
+  start: number;
+  total_files: number;
+  total_bytes: number;
+  directories: DirectorySummary[];
+  next_cursor: string | null;
+}
+
+export async function listFilePage(
+  dir: string,
+  page: { recursive?: boolean; directory?: string; cursor?: string; limit?: number } = {},
+  options?: RequestInit,
+): Promise<ApiResponse<FilePage>> {
+  const params = new URLSearchParams({ dir, detail: "true" });
+  if (page.recursive !== undefined) params.set("recursive", String(page.recursive));
+  if (page.directory) params.set("directory", page.directory);
+  if (page.cursor) params.set("cursor", page.cursor);
+  if (page.limit !== undefined) params.set("limit", String(page.limit));
+  return request(`${API_ENDPOINTS.FILES}?${params}`, options);
+}
+
+export async function getOutline(
+  dir: string,
+  file?: string,
+  options?: RequestInit,
+): Promise<ApiResponse<{ outline: string }>> {
+  const params = new URLSearchParams({ dir });
+  if (file) params.set("file", file);
+  return request(`${API_ENDPOINTS.OUTLINE}?${params}`, options);
+}
+
+/** Optional server features, as reported by the server's `/health`. */
+export interface ServerFeatures {
+  project_snapshot: boolean;
+}
+
+let serverFeatures: Promise<ServerFeatures> | null = null;
+
+/**
+ * Fetched once per session. A failed check reports every feature off and is
+ * retried on the next call.
+ */
+export function getServerFeatures(): Promise<ServerFeatures> {
+  serverFeatures ??= fetch(`${SERVER_API_BASE_URL}${API_ENDPOINTS.HEALTH}`)
+    .then((res) => (res.ok ? res.json() : null))
+    .then((body) => ({
+      project_snapshot: body?.features?.project_snapshot === true,
+    }))
+    .catch(() => {
+      serverFeatures = null;
+      return { project_snapshot: false };
+    });
+  return serverFeatures;
+}
+
+export async function getSnapshot(
+  dir: string,
+  options?: RequestInit,
+): Promise<ApiResponse<{ snapshot: string | null }>> {
+  const params = new URLSearchParams({ dir });
+  return request(`${API_ENDPOINTS.SNAPSHOT}?${params}`, options);
+}
+
 export async function getPDF(
   dir: string,
   options?: RequestInit,
@@ -115,11 +195,155 @@ export async function getPDF(
   return new Uint8Array(buffer);
 }
 
+export interface HistorySnapshot {
+  id: string;
+  created: number;
+  label: string;
+  parent: string | null;
+  file_count: number;
+  changed: number;
+}
+
+export async function listHistory(
+  dir: string,
+  options?: RequestInit,
+): Promise<ApiResponse<{ snapshots: HistorySnapshot[] }>> {
+  const params = new URLSearchParams({ dir });
+  return request(`${API_ENDPOINTS.HISTORY}?${params}`, options);
+}
+
+export async function takeHistorySnapshot(
+  dir: string,
+  label: string = "",
+  options?: RequestInit,
+): Promise<ApiResponse<HistorySnapshot>> {
+  return request(API_ENDPOINTS.HISTORY, {
+    method: "POST",
+    body: JSON.stringify({ dir, label }),
+    ...options,
+  });
+}
+
+export interface HistoryDiff {
+  added: string[];
+  removed: string[];
+  modified: string[];
+}
+
+/** Compare two snapshots, or a snapshot with the current files if `to` is omitted. */
+export async function diffHistory(
+  dir: string,
+  from: string,
+  to?: string,
+  options?: RequestInit,
+): Promise<ApiResponse<HistoryDiff>> {
+  const params = new URLSearchParams({ dir, from });
+  if (to) params.set("to", to);
+  return request(`${API_ENDPOINTS.HISTORY_DIFF}?${params}`, options);
+}
+
+export async function diffHistoryFile(
+  dir: string,
+  path: string,
+  from: string,
+  to?: string,
+  options?: RequestInit,
+): Promise<ApiResponse<{ diff: string }>> {
+  const params = new URLSearchParams({ dir, from, path });
+  if (to) params.set("to", to);
+  return request(`${API_ENDPOINTS.HISTORY_DIFF}?${params}`, options);
+}
+
+export async function restoreHistory(
+  dir: string,
+  snapshotId: string,
+  paths?: string[],
+  options?: RequestInit,
+): Promise<
+  ApiResponse<{ safety_snapshot: string; written: string[]; removed: string[] }>
+> {
+  return request(API_ENDPOINTS.HISTORY_RESTORE, {
+    method: "POST",
+    body: JSON.stringify({ dir, snapshot_id: snapshotId, paths }),
+    ...options,
+  });
+}
+
+/** Download URL for a project archive; pass etag and offset to resume. */
+export function exportProjectUrl(
+  dir: string,
+  resume?: { etag: string; offset: number },
+): string {
+  const params = new URLSearchParams({ dir });
+  if (resume) {
+    params.set("etag", resume.etag);
+    params.set("offset", String(resume.offset));
+  }
+  return `${SIDECAR_API_BASE_URL}${API_ENDPOINTS.EXPORT}?${params}`;
+}
+
+export interface ImportResult {
+  received: number;
+  complete: boolean;
+  files?: number;
+  skipped?: number;
+}
+
+const IMPORT_CHUNK_BYTES = 8 * 1024 * 1024;
+
+/**
+ * Upload a project archive in pieces and extract it into `dir`. Calling it
+ * again with the same `id` after a failure continues from what the sidecar
+ * already has.
+ */
+export async function importProject(
+  archive: Blob,
+  dir: string,
+  id: string,
+  options?: RequestInit,
+): Promise<ApiResponse<ImportResult>> {
+  const status = await request<{ received: number }>(
+    `${API_ENDPOINTS.IMPORT}?${new URLSearchParams({ id })}`,
+    options,
+  );
+  let offset = Math.min(status.data?.received ?? 0, archive.size);
+  for (;;) {
+    const end = Math.min(offset + IMPORT_CHUNK_BYTES, archive.size);
+    const params = new URLSearchParams({
+      dir,
+      id,
+      offset: String(offset),
+      complete: String(end === archive.size),
+    });
+    const res = await request<ImportResult>(
+      `${API_ENDPOINTS.IMPORT}?${params}`,
+      {
+        method: "POST",
+        headers: { "Content-Type": "application/octet-stream" },
+        body: archive.slice(offset, end),
+        ...options,
+      },
+    );
+    if (res.data?.complete) {
+      return res;
+    }
+    offset = end;
+  }
+}
+
 export interface UploadImageData {
   original_filename: string;
   saved_filename: string;
   path: string;
-  image_bytes: string;
+  handle: string;
+  size: number;
+  sha256: string;
+  thumbnail_url: string;
+}
+
+/** URL the webview can load the stored upload from. */
+export function uploadedImageUrl(data: UploadImageData): string {
+  return `${SIDECAR_API_BASE_URL}${data.thumbnail_url}`;
 }
 
 export async function uploadImage(
@@ -133,17 +357,16 @@ export async function uploadImage(
   });
 }
 
-export async function uploadImageData(
-  payload: {
-    original_filename: string;
-    media_type: string;
-    image_base64: string;
-  },
+export async function uploadImageBlob(
+  blob: Blob,
+  filename: string,
   options?: RequestInit,
 ): Promise<ApiResponse<UploadImageData>> {
-  return request(API_ENDPOINTS.UPLOAD_IMAGE_DATA, {
+  const params = new URLSearchParams({ filename });
+  return request(`${API_ENDPOINTS.UPLOAD_IMAGE_STREAM}?${params}`, {
     method: "POST",
-    body: JSON.stringify(payload),
+    headers: { "Content-Type": blob.type || "application/octet-stream" },
+    body: blob,
     ...options,
   });
 }
@@ -216,6 +439,28 @@ export async function getFileContent(
   );
 }
 
+export interface FileContentPage {
+  content: string;
+  file: string;
+  start_line: number;
+  end_line: number;
+  total_lines: number;
+  size: number;
+  next_offset: number | null;
+}
+
+export async function getFileContentPage(
+  dir: string,
+  file: string,
+  offset: number = 0,
+  limit?: number,
+  options?: RequestInit,
+): Promise<ApiResponse<FileContentPage>> {
+  const params = new URLSearchParams({ dir, file, offset: String(offset) });
+  if (limit !== undefined) params.set("limit", String(limit));
+  return request(`${API_ENDPOINTS.FILES_CONTENT}?${params}`, options);
+}
+
 export async function updateFileContent(
   dir: string,
   file: string,
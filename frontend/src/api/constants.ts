@@ -13,10 +13,18 @@ export const API_ENDPOINTS = {
   CHAT: "/chat",
   UPLOAD_IMAGE: "/upload-image",
   UPLOAD_IMAGE_DATA: "/upload-image-data",
+  UPLOAD_IMAGE_STREAM: "/upload-image-stream",
   FILES: "/files",
   FILES_CONTENT: "/files/content",
   FILES_RENAME: "/files/rename",
+  OUTLINE: "/outline",
+  SNAPSHOT: "/snapshot",
   PDF: "/pdf",
+  HISTORY: "/history",
+  HISTORY_DIFF: "/history/diff",
+  HISTORY_RESTORE: "/history/restore",
+  EXPORT: "/export",
+  IMPORT: "/import",
   CONFIG: "/config",
   NUKE: "/nuke",
   CHATBOT: "/chatbot",
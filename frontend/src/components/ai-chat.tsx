@@ -11,6 +11,7 @@ import { useImageForAIChat } from "@/contexts/image-for-ai-chat-context";
 import { useEditor } from "@/contexts/editor-context";
 import useReadFileTool from "./tool-calls/read-file-tool";
 import useListFilesTool from "./tool-calls/list-files-tool";
+import useProjectOutlineTool from "./tool-calls/project-outline-tool";
 import useEditFileTool from "./tool-calls/edit-file-tool";
 import useDeleteFileTool from "./tool-calls/delete-file-tool";
 import useRenameFileTool from "./tool-calls/rename-file-tool";
@@ -50,6 +51,7 @@ export default function AIChat() {
 
   useReadFileTool(dir ?? "");
   useListFilesTool(dir ?? "");
+  useProjectOutlineTool(dir ?? "");
   useEditFileTool(dir ?? "");
   useDeleteFileTool(dir ?? "");
   useRenameFileTool(dir ?? "");
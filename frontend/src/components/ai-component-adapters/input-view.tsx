@@ -29,13 +29,19 @@ import {
 } from "@/components/ai-elements/attachments";
 import { useImageForAIChat } from "@/contexts/image-for-ai-chat-context";
 import { useEditor } from "@/contexts/editor-context";
-import type { UploadImageData } from "@/api/client";
+import {
+  takeHistorySnapshot,
+  uploadedImageUrl,
+  type UploadImageData,
+} from "@/api/client";
 import { cn } from "@/lib/utils";
 import type { FileUIPart } from "ai";
 import { ImagePlus } from "lucide-react";
 import { useCallback, useMemo } from "react";
 
 const CONTEXT_ATTACHED_ID = "context-attached";
+// Longest a turn waits for its restore point before it is sent anyway.
+const HISTORY_SNAPSHOT_WAIT_MS = 1500;
 
 function mimeFromFilename(fileName: string): string {
   const lower = fileName.toLowerCase();
@@ -57,7 +63,7 @@ function uploadDataToFileUIPart(
     id: CONTEXT_ATTACHED_ID,
     filename: data.original_filename,
     mediaType,
-    url: `data:${mediaType};base64,${data.image_bytes}`,
+    url: uploadedImageUrl(data),
   };
 }
 
@@ -143,7 +149,7 @@ function AdaptedInputView(props: CopilotChatInputProps) {
 
   const { syncImageFromPromptFiles, clearAttachmentAfterSend, handleAddImage } =
     useImageForAIChat();
-  const { startNewCopilotThread } = useEditor();
+  const { startNewCopilotThread, dir } = useEditor();
 
   const handleClearChat = useCallback(() => {
     if (agent.isRunning) {
@@ -159,7 +165,21 @@ function AdaptedInputView(props: CopilotChatInputProps) {
       maxFiles={1}
       multiple={false}
       onSubmit={async (prompt) => {
+        // Restore point for this turn's agent edits. It is usually quick,
+        // since the project's first snapshot is taken when it opens, but it
+        // never holds the turn for longer than HISTORY_SNAPSHOT_WAIT_MS.
+        const snapshot = dir
+          ? takeHistorySnapshot(dir, "Before agent turn").catch(() => {})
+          : null;
         const pathForMessage = await syncImageFromPromptFiles(prompt.files);
+        if (snapshot) {
+          await Promise.race([
+            snapshot,
+            new Promise((resolve) =>
+              setTimeout(resolve, HISTORY_SNAPSHOT_WAIT_MS),
+            ),
+          ]);
+        }
         await Promise.resolve(onSubmitMessage?.(prompt.text));
         if (pathForMessage) {
           clearAttachmentAfterSend(pathForMessage);
@@ -1,20 +1,59 @@
 import { useFrontendTool } from "@copilotkit/react-core";
 import { CodeBlock } from "@/components/ui/code-block";
 import { Tool, ToolContent, ToolHeader, ToolOutput } from "@/components/ui/tool";
-import { listFiles } from "@/api/client";
+import { listFilePage } from "@/api/client";
+import { formatSize } from "@/lib/utils";
 
 export default function useListFilesTool(dir: string) {
   useFrontendTool({
     name: "list_files_tool",
-    description: "List all files in the project directory.",
-    parameters: [],
-    handler: async () => {
+    description: "List files in the project directory with their sizes. Long listings start with a per-directory summary and are paged.",
+    parameters: [
+      {
+        name: "recursive",
+        type: "boolean",
+        description: "If true (default), list files in subdirectories too",
+        required: false,
+      },
+      {
+        name: "directory",
+        type: "string",
+        description: "Relative path of a folder to list instead of the project root (e.g., 'figures')",
+        required: false,
+      },
+      {
+        name: "cursor",
+        type: "string",
+        description: "Continue after this path, as given at the end of the previous page",
+        required: false,
+      },
+      {
+        name: "limit",
+        type: "number",
+        description: "Maximum number of files to return (default and maximum 200)",
+        required: false,
+      },
+    ],
+    handler: async ({ recursive, directory, cursor, limit }) => {
       try {
-        const res = await listFiles(dir);
-        const files = res.data?.files;
-        if (!files || files.length === 0) return "No files found in the project directory.";
-        const fileList = files.map((f: string) => `  - ${f}`).join("\n");
-        return `Files in project directory:\n${fileList}`;
+        const res = await listFilePage(dir, { recursive, directory, cursor, limit });
+        const page = res.data;
+        if (!page || page.total_files === 0) return "No files found in the project directory.";
+        const where = directory ? `'${directory.replace(/^\/+|\/+$/g, "")}'` : "project directory";
+        const lines = [`Files in ${where}: ${page.total_files} files, ${formatSize(page.total_bytes)}`];
+        if (page.directories.length > 0) {
+          lines.push("Directories:");
+          for (const d of page.directories) {
+            lines.push(`  - ${d.path} (${d.files} files, ${formatSize(d.bytes)})`);
+          }
+        }
+        const paged = page.start > 0 || page.next_cursor !== null;
+        if (paged) lines.push(`Showing files ${page.start + 1}-${page.start + page.entries.length}:`);
+        for (const f of page.entries) lines.push(`  - ${f.path} (${formatSize(f.size)})`);
+        if (page.next_cursor !== null) {
+          lines.push(`[More files follow: call list_files_tool with cursor='${page.next_cursor}' to continue, or pass directory to list one folder.]`);
+        }
+        return lines.join("\n");
       } catch (e) {
         return `Error listing files: ${e instanceof Error ? e.message : String(e)}`;
       }
@@ -0,0 +1,62 @@
+import { useFrontendTool } from "@copilotkit/react-core";
+import { CodeBlock } from "@/components/ui/code-block";
+import { Tool, ToolContent, ToolHeader, ToolInput, ToolOutput } from "@/components/ui/tool";
+import { getOutline } from "@/api/client";
+
+export default function useProjectOutlineTool(dir: string) {
+  useFrontendTool({
+    name: "project_outline_tool",
+    description: "Outline the project structure without reading whole files. Lists sections, figures, tables, labels, citations, \\input targets and bibliography entries with 1-based line ranges; pass offset=start-1 to read_file_tool to read just that part.",
+    parameters: [{
+      name: "file_path",
+      type: "string",
+      description: "Relative path of one .tex or .bib file to outline; omit for the whole project",
+      required: false,
+    }],
+    handler: async ({ file_path }) => {
+      try {
+        const res = await getOutline(dir, file_path || undefined);
+        return res.data?.outline ?? "Error: could not outline the project.";
+      } catch (e) {
+        return `Error outlining project: ${e instanceof Error ? e.message : String(e)}`;
+      }
+    },
+    render: ({ args: { file_path }, status, result }) => {
+      const title = file_path ? `Outline ${file_path}` : "Outline project";
+      if (status === "executing") {
+        return (
+          <Tool>
+            <ToolHeader
+              state="input-available"
+              title={`${title}...`}
+              type="tool-project_outline_tool"
+            />
+            {file_path && (
+              <ToolContent>
+                <ToolInput input={{ file_path }} />
+              </ToolContent>
+            )}
+          </Tool>
+        );
+      }
+      if (status === "complete") {
+        return (
+          <Tool>
+            <ToolHeader
+              state="output-available"
+              title={title}
+              type="tool-project_outline_tool"
+            />
+            <ToolContent>
+              <ToolOutput errorText={undefined} output={
+                <CodeBlock code={result} language="markdown" />
+              } />
+            </ToolContent>
+          </Tool>
+        );
+      }
+
+      return <></>;
+    },
+  });
+}
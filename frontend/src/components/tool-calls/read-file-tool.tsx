@@ -1,21 +1,45 @@
 import { useFrontendTool } from "@copilotkit/react-core";
 import { CodeBlock } from "@/components/ui/code-block";
 import { Tool, ToolContent, ToolHeader, ToolInput, ToolOutput } from "@/components/ui/tool";
-import { getFileContent } from "@/api/client";
+import { getFileContentPage } from "@/api/client";
+import { formatSize } from "@/lib/utils";
 
 export default function useReadFileTool(dir: string) {
   useFrontendTool({
     name: "read_file_tool",
-    description: "Read the contents of a file in the project directory.",
-    parameters: [{
-      name: "file_path",
-      type: "string",
-      description: "Relative path to the file from the project root (e.g., 'main.tex' or 'refs.bib')",
-    }],
-    handler: async ({ file_path }) => {
+    description: "Read the contents of a file in the project directory. Large files are returned in pages; the page ends with the offset to continue from.",
+    parameters: [
+      {
+        name: "file_path",
+        type: "string",
+        description: "Relative path to the file from the project root (e.g., 'main.tex' or 'refs.bib')",
+      },
+      {
+        name: "offset",
+        type: "number",
+        description: "Zero-based line to start reading from (default 0)",
+        required: false,
+      },
+      {
+        name: "limit",
+        type: "number",
+        description: "Maximum number of lines to return (default and maximum 2000)",
+        required: false,
+      },
+    ],
+    handler: async ({ file_path, offset, limit }) => {
       try {
-        const res = await getFileContent(dir, file_path);
-        return res.data?.content ?? `Error: could not read '${file_path}'`;
+        const res = await getFileContentPage(dir, file_path, offset ?? 0, limit);
+        const page = res.data;
+        if (!page) return `Error: could not read '${file_path}'`;
+        // Whole file in one page: return it verbatim, like before paging existed.
+        if (page.start_line === 0 && page.next_offset === null) return page.content;
+        const content = page.content.endsWith("\n") ? page.content : `${page.content}\n`;
+        const range = `[Lines ${page.start_line + 1}-${page.end_line} of ${page.total_lines}; file size ${formatSize(page.size)}.`;
+        const more = page.next_offset === null
+          ? " End of file.]"
+          : ` More content follows: call read_file_tool with offset=${page.next_offset} to continue. Read every page before rewriting the whole file.]`;
+        return content + range + more;
       } catch (e) {
         return `Error reading file '${file_path}': ${e instanceof Error ? e.message : String(e)}`;
       }
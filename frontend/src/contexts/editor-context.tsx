@@ -7,7 +7,14 @@ import {
   type ReactNode,
   useEffect,
 } from "react";
-import { compileProject, getPDF, listFiles, getFileContent, updateFileContent } from "@/api/client";
+import {
+  compileProject,
+  getPDF,
+  listFiles,
+  getFileContent,
+  takeHistorySnapshot,
+  updateFileContent,
+} from "@/api/client";
 
 interface EditorContextValue {
   dir: string | null;
@@ -183,6 +190,14 @@ export function EditorProvider({ dir, children }: EditorProviderProps) {
     pdfPreviewPageRef.current = 1;
   }, [dir]);
 
+  // The first history snapshot of a project hashes and copies every file.
+  // Taking it in the background on open keeps that cost off the first agent
+  // turn; an unchanged project returns its latest snapshot without writing.
+  useEffect(() => {
+    if (!dir) return;
+    takeHistorySnapshot(dir, "Project opened").catch(() => {});
+  }, [dir]);
+
   useEffect(() => {
     setLoading(true);
     setError(null);
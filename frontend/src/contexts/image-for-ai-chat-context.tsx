@@ -4,43 +4,21 @@ import { createContext, useCallback, useContext, useMemo, useState, type ReactNo
 import {
   removeUploadedImage,
   uploadImage,
-  uploadImageData,
+  uploadImageBlob,
   type UploadImageData,
 } from "@/api/client";
 
-function fileUIPartToUploadPayload(part: FileUIPart): {
-  image_base64: string;
-  media_type: string;
-  original_filename: string;
-} | null {
-  const url = part.url;
-  if (!url) {
+async function fileUIPartToBlob(part: FileUIPart): Promise<Blob | null> {
+  if (!part.url) {
     return null;
   }
-  if (!url.startsWith("data:")) {
-    return null;
-  }
-  const comma = url.indexOf(",");
-  if (comma === -1) {
-    return null;
-  }
-  const header = url.slice(0, comma);
-  const data = url.slice(comma + 1);
-  const filename = part.filename ?? "image.png";
-  const mediaType = part.mediaType ?? "application/octet-stream";
-  if (header.includes(";base64")) {
-    return {
-      image_base64: data,
-      media_type: mediaType,
-      original_filename: filename,
-    };
-  }
   try {
-    return {
-      image_base64: btoa(data),
-      media_type: mediaType,
-      original_filename: filename,
-    };
+    // Works for data: and blob: URLs alike, without decoding base64 by hand.
+    const res = await fetch(part.url);
+    const blob = await res.blob();
+    return part.mediaType && !blob.type
+      ? new Blob([blob], { type: part.mediaType })
+      : blob;
   } catch {
     return null;
   }
@@ -100,11 +78,11 @@ export function ImageForAIChatProvider({ children }: ImageForAIChatProviderProps
       if (files.length === 0) {
         return uploadedImageData?.path ?? null;
       }
-      const payload = fileUIPartToUploadPayload(files[0]);
-      if (!payload) {
+      const blob = await fileUIPartToBlob(files[0]);
+      if (!blob) {
         return null;
       }
-      const res = await uploadImageData(payload);
+      const res = await uploadImageBlob(blob, files[0].filename ?? "image.png");
       const next = res?.data ?? null;
       if (!next) {
         return null;
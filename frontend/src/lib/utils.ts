@@ -4,3 +4,15 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs))
 }
+
+export function formatSize(size: number): string {
+  if (size < 1024) return `${size} B`
+  const units = ["KB", "MB", "GB"]
+  let value = size
+  let unit = units[0]
+  for (unit of units) {
+    value /= 1024
+    if (value < 1024) break
+  }
+  return `${value.toFixed(1)} ${unit}`
+}
@@ -1,4 +1,11 @@
-import { lazy, Suspense, useEffect, useRef, useState } from "react";
+import {
+  lazy,
+  Suspense,
+  useCallback,
+  useEffect,
+  useRef,
+  useState,
+} from "react";
 import { useSearchParams } from "react-router-dom";
 
 const CodeEditor = lazy(() => import("@/components/code-editor"));
@@ -19,6 +26,7 @@ import {
 import { CopilotKit } from "@copilotkit/react-core";
 import { useAgent } from "@copilotkit/react-core/v2";
 import { SERVER_API_BASE_URL } from "@/api/constants";
+import { getServerFeatures, getSnapshot } from "@/api/client";
 import { useTokenRefresh } from "@/lib/auth";
 
 function CompileOnAgentIdle({
@@ -39,6 +47,55 @@ function CompileOnAgentIdle({
   return null;
 }
 
+// Marks the snapshot as sent once a run that carried it has finished.
+function ClearSnapshotAfterRun({
+  hasSnapshot,
+  onSent,
+}: {
+  hasSnapshot: boolean;
+  onSent: () => void;
+}) {
+  const { agent } = useAgent({ agentId: "0" });
+  const carried = useRef(false);
+
+  useEffect(() => {
+    if (agent.isRunning) {
+      if (hasSnapshot) carried.current = true;
+    } else if (carried.current) {
+      carried.current = false;
+      onSent();
+    }
+  }, [agent.isRunning, hasSnapshot, onSent]);
+
+  return null;
+}
+
+// Snapshot of the project taken when a chat thread starts. The server pins the
+// first one it receives for the thread and ignores later ones, so it is only
+// sent until a run has carried it, not with every run of the thread. Nothing is
+// built unless the server has snapshots turned on.
+function useProjectSnapshot(dir: string | null, threadId: string) {
+  const [snapshot, setSnapshot] = useState<string | null>(null);
+
+  useEffect(() => {
+    setSnapshot(null);
+    if (!dir) return;
+    const controller = new AbortController();
+    getServerFeatures()
+      .then((features) =>
+        features.project_snapshot
+          ? getSnapshot(dir, { signal: controller.signal })
+          : null,
+      )
+      .then((res) => setSnapshot(res?.data?.snapshot ?? null))
+      .catch(() => {});
+    return () => controller.abort();
+  }, [dir, threadId]);
+
+  const markSent = useCallback(() => setSnapshot(null), []);
+  return [snapshot, markSent] as const;
+}
+
 function EditorContent() {
   const {
     currentFile,
@@ -52,6 +109,10 @@ function EditorContent() {
   const { uploadedImageData } = useImageForAIChat();
   const [activeTab, setActiveTab] = useState<"preview" | "source">("preview");
   const token = useTokenRefresh();
+  const [projectSnapshot, markSnapshotSent] = useProjectSnapshot(
+    dir,
+    copilotThreadId,
+  );
 
   return (
     <CopilotKit
@@ -64,10 +125,15 @@ function EditorContent() {
       properties={{
         folder_path: dir,
         attached_image_path: uploadedImageData?.path ?? null,
+        project_snapshot: projectSnapshot,
       }}
       showDevConsole={false}
     >
       <CompileOnAgentIdle compileAndRefresh={compileAndRefresh} />
+      <ClearSnapshotAfterRun
+        hasSnapshot={projectSnapshot !== null}
+        onSent={markSnapshotSent}
+      />
       <div className="flex flex-col h-screen overflow-hidden">
         <TopNavigation
           activeTab={activeTab}
@@ -2,7 +2,12 @@ import dotenv
 
 dotenv.load_dotenv()
 
+import asyncio
+from contextlib import asynccontextmanager
+import math
+import os
 from pathlib import Path
+import time
 import uuid
 
 from ag_ui.core.types import RunAgentInput
@@ -10,11 +15,19 @@ from ag_ui.encoder import EventEncoder
 from copilotkit import LangGraphAGUIAgent
 from core import __version__
 from core import agent
+from core import analytics
+from core import auth
+from core import loop_monitor
+from core import metrics
+from core import prompt_cache
+from core import shared_state
+from core import snapshot
+from core import tracing
 from core.auth import AuthError, authenticate_request
-from core.usage import router as usage_router, validate_and_fetch_creds
+from core.usage import USAGE_CACHE, UsageLimitError, router as usage_router, validate_and_fetch_creds
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from langchain_core.messages import AIMessage, HumanMessage
 from pydantic import BaseModel
 
@@ -39,19 +52,59 @@ class ChatRequest(BaseModel):
     openai_api_model: str | None = None
 
 
-app = FastAPI(title="Spartan Write - Server")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with shared_state.open_checkpointer() as checkpointer, \
+            loop_monitor.monitor_from_env(app) as monitor:
+        app.state.checkpointer = checkpointer
+        app.state.loop_monitor = monitor
+        yield
+
+
+app = FastAPI(title="Spartan Write - Server", lifespan=lifespan)
 
 app.include_router(usage_router)
 
+metrics.Collector(
+    "spartan_prompt_cache",
+    "Provider prompt-cache counters and hit rates per model.",
+    lambda: [({
+        "model": model,
+        "field": key
+    }, value) for model, data in prompt_cache.snapshot().items()
+             for key, value in data.items()],
+)
+metrics.Collector(
+    "spartan_analytics_pipeline",
+    "Analytics pipeline counters and queue depth.",
+    lambda: [({
+        "field": key
+    }, value) for key, value in analytics.pipeline.stats().items()],
+)
+metrics.Collector(
+    "spartan_usage_cache",
+    "Usage-info cache counters.",
+    lambda: [({
+        "field": key
+    }, value) for key, value in vars(USAGE_CACHE.stats).items()],
+)
+metrics.Collector(
+    "spartan_auth_cache",
+    "WorkOS user cache counters and verified-session cache size.",
+    lambda: [({
+        "field": key
+    }, value) for key, value in auth.cache_stats().items()],
+)
+
 
 @app.middleware("http")
 async def auth_middleware(request: Request, call_next):
-    unauthenticated_paths = {"/health", "/chat", "/usage-info"}
+    unauthenticated_paths = {"/health", "/metrics", "/chat", "/usage-info"}
     if request.method == "OPTIONS" or request.url.path in unauthenticated_paths:
         return await call_next(request)
 
     try:
-        request.state.auth = authenticate_request(request)
+        request.state.auth = await authenticate_request(request)
     except AuthError as exc:
         return JSONResponse(status_code=exc.status_code,
                             content={"detail": exc.detail})
@@ -59,9 +112,51 @@ async def auth_middleware(request: Request, call_next):
     return await call_next(request)
 
 
+@app.middleware("http")
+async def tracing_middleware(request: Request, call_next):
+    # Registered after auth_middleware, so it wraps it and auth is a child span.
+    with tracing.span("http_request",
+                      method=request.method,
+                      path=request.url.path) as current:
+        response = await call_next(request)
+        current.set_attribute("status_code", response.status_code)
+    return response
+
+
 @app.get("/health")
 async def health():
-    return {"status": "ok", "version": __version__}
+    # The frontend reads `features` to skip work for features that are off.
+    return {
+        "status": "ok",
+        "version": __version__,
+        "features": {
+            "project_snapshot": snapshot.enabled()
+        },
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(),
+                             media_type="text/plain; version=0.0.4")
+
+
+@app.get("/prompt-cache-stats")
+async def prompt_cache_stats():
+    return {"success": True, "data": {"models": prompt_cache.snapshot()}}
+
+
+@app.get("/debug/loop-blocks")
+async def loop_blocks():
+    monitor = app.state.loop_monitor
+    return {
+        "success": True,
+        "data": {
+            "enabled": monitor is not None,
+            "threshold_ms": monitor.threshold * 1000 if monitor else None,
+            "reports": monitor.reports() if monitor else [],
+        },
+    }
 
 
 @app.post("/chat")
@@ -74,14 +169,21 @@ async def chat(request: ChatRequest):
                                  user_email=request.user_email,
                                  thread_id=request.session_id)
         folder_path = Path(request.dir)
-        graph = agent.create_graph(creds,
-                                   folder_path,
-                                   request.attached_image_path,
-                                   local_execution=True)
+        project_snapshot = None
+        if snapshot.enabled():
+            project_snapshot = await asyncio.to_thread(
+                snapshot.build_snapshot, folder_path)
+        graph = agent.create_graph(
+            creds,
+            folder_path,
+            request.attached_image_path,
+            local_execution=True,
+            checkpointer=app.state.checkpointer,
+            project_snapshot=project_snapshot)
         thread_id = str(uuid.uuid4())
         config = {"configurable": {"thread_id": thread_id}}
         initial_state = {"messages": [HumanMessage(content=request.prompt)]}
-        final_state = graph.invoke(initial_state, config=config)
+        final_state = await graph.ainvoke(initial_state, config=config)
 
         # Extract agent's response messages (AIMessages)
         agent_responses = [
@@ -115,6 +217,15 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _starts_user_turn(input_data: RunAgentInput) -> bool:
+    """False for runs that continue a turn: interrupt resumes and tool results."""
+    command = (input_data.forwarded_props or {}).get("command") or {}
+    if command.get("resume") is not None:
+        return False
+    messages = input_data.messages or []
+    return not messages or messages[-1].role == "user"
+
+
 @app.post("/copilotkit")
 @app.post("/copilotkit/")
 @app.post("/copilotkit/{path:path}")
@@ -141,16 +252,45 @@ async def copilotkit_handler(request: Request, path: str = ""):
         if user is None:
             raise HTTPException(status_code=401, detail="Unauthorized")
 
-        creds = validate_and_fetch_creds(user, input_data.thread_id)
-        graph = agent.create_graph(creds, folder_path, attached_image_path)
+        try:
+            creds = await validate_and_fetch_creds(
+                user, input_data.thread_id, _starts_user_turn(input_data))
+        except UsageLimitError as exc:
+            return JSONResponse(
+                status_code=exc.status_code,
+                content={
+                    "detail": exc.detail,
+                    "retry_after": round(exc.retry_after, 1),
+                },
+                headers={"Retry-After": str(math.ceil(exc.retry_after))},
+            )
+        # Pinned on the thread's first run so later turns send the same text.
+        project_snapshot = await snapshot.pin(
+            input_data.thread_id, forwarded_props.get("project_snapshot"))
+        graph = agent.create_graph(creds,
+                                   folder_path,
+                                   attached_image_path,
+                                   checkpointer=app.state.checkpointer,
+                                   project_snapshot=project_snapshot)
         agui_agent = SafeLangGraphAGUIAgent(name="0", graph=graph)
 
         accept_header = request.headers.get("accept")
         encoder = EventEncoder(accept=accept_header)
 
         async def event_generator():
-            async for event in agui_agent.run(input_data):
-                yield encoder.encode(event)
+            # Covers the whole stream, unlike http_request which ends once
+            # the response headers are sent.
+            with tracing.span("agent_run",
+                              thread_id=input_data.thread_id) as current:
+                encode_seconds = 0.0
+                async for event in agui_agent.run(input_data):
+                    start = time.perf_counter()
+                    chunk = encoder.encode(event)
+                    encode_seconds += time.perf_counter() - start
+                    yield chunk
+                current.set_attribute("encode_seconds", encode_seconds)
+                tracing.PHASE_SECONDS.observe(encode_seconds,
+                                              phase="encode_events")
 
         return StreamingResponse(event_generator(),
                                  media_type=encoder.get_content_type())
@@ -180,7 +320,16 @@ app.add_middleware(
 
 def main():
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8767)
+    host = os.getenv("SPARTAN_SERVER_HOST", "127.0.0.1")
+    port = int(os.getenv("SPARTAN_SERVER_PORT", "8767"))
+    workers = shared_state.worker_count()
+    if workers > 1:
+        # Workers are separate processes; make them agree on the state dir.
+        os.environ.setdefault(shared_state.STATE_DIR_ENV,
+                              str(shared_state.default_state_dir()))
+        uvicorn.run("api.server:app", host=host, port=port, workers=workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
 
 
 if __name__ == "__main__":
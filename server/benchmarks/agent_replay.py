@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Replay recorded agent transcripts against template projects, offline.
+
+A scripted stand-in chat model returns the recorded AI turns in order, so the
+graph, tools and state handling run for real while the model costs nothing
+and needs no network. Each transcript runs in a fresh copy of its template in
+both modes:
+
+- local: create_graph(local_execution=True); tools run in the server graph.
+- interrupt: the CopilotKit path; the graph interrupts for every tool batch,
+  the benchmark executes the calls (standing in for the frontend) and resumes.
+
+Reports per-step framework overhead (wall time minus model and tool time),
+tool latency, traced memory growth across iterations and the size of the
+final messages state.
+
+A transcript is JSON with "template", "prompt" and "steps"; each step is one
+AI turn with optional "content" and "tool_calls" ([{"name", "args"}]). The
+"messages" list from a /chat response can be used as "steps" directly.
+
+Usage:
+    uv run python benchmarks/agent_replay.py [transcripts ...] [--iterations 20]
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Any
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.types import Command
+from pydantic import PrivateAttr
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+TRANSCRIPTS_DIR = Path(__file__).resolve().parent / "transcripts"
+TEMPLATES_DIR = SERVER_DIR.parent / "sidecar" / "core" / "project" / "templates"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers with the next recorded step."""
+
+    steps: list[dict]
+    _position: int = PrivateAttr(default=0)
+    _generate_seconds: float = PrivateAttr(default=0.0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _generate(self,
+                  messages: list[BaseMessage],
+                  stop: list[str] | None = None,
+                  run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        if self._position < len(self.steps):
+            step = self.steps[self._position]
+        else:
+            step = {"content": "(end of transcript)"}
+        self._position += 1
+        tool_calls = [{
+            "name": tc["name"],
+            "args": tc.get("args") or {},
+            "id": f"call_{self._position}_{i}",
+            "type": "tool_call",
+        } for i, tc in enumerate(step.get("tool_calls") or [])]
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        message = AIMessage(content=step.get("content") or "",
+                            tool_calls=tool_calls,
+                            usage_metadata={
+                                "input_tokens": prompt_chars // 4,
+                                "output_tokens": 0,
+                                "total_tokens": prompt_chars // 4,
+                            })
+        self._generate_seconds += time.perf_counter() - start
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @property
+    def model_calls(self) -> int:
+        return self._position
+
+    @property
+    def generate_seconds(self) -> float:
+        return self._generate_seconds
+
+
+class NullSink:
+    """Analytics sink that drops events, so they do not count as growth."""
+
+    def send(self, events: list) -> None:
+        pass
+
+
+class SpanRecorder:
+    """Collects finished tracing spans in memory."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span) -> None:
+        self.spans.append(span)
+
+    def seconds(self, prefix: str) -> float:
+        return sum((s.end_time_unix_nano - s.start_time_unix_nano) / 1e9
+                   for s in self.spans if s.name.startswith(prefix))
+
+
+def load_transcript(path: Path) -> dict:
+    data = json.loads(path.read_text())
+    if "steps" not in data:
+        # A saved /chat response: {"data": {"messages": [...]}}
+        data = {
+            "name": path.stem,
+            "template": "minimal",
+            "prompt": "",
+            "steps": data["data"]["messages"],
+        }
+    data.setdefault("name", path.stem)
+    return data
+
+
+def fresh_project(template: str) -> Path:
+    project = Path(tempfile.mkdtemp(prefix="agent-replay-"))
+    shutil.copytree(TEMPLATES_DIR / template, project, dirs_exist_ok=True)
+    return project
+
+
+def fake_creds():
+    from core.models import AgentCreds
+
+    return AgentCreds(openai_api_key="unused",
+                      openai_api_base="http://127.0.0.1:9",
+                      openai_api_model="scripted/replay",
+                      user_email="replay@example.com",
+                      thread_id=str(uuid.uuid4()))
+
+
+async def run_local(transcript: dict, project: Path,
+                    model: ScriptedChatModel) -> tuple[list, float]:
+    from core import agent
+
+    graph = agent.create_graph(fake_creds(),
+                               project,
+                               None,
+                               local_execution=True,
+                               model=model)
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    state = await graph.ainvoke(
+        {"messages": [HumanMessage(content=transcript["prompt"])]},
+        config=config)
+    return state["messages"], 0.0
+
+
+async def run_interrupt(transcript: dict, project: Path,
+                        model: ScriptedChatModel) -> tuple[list, float]:
+    from core import agent
+    from core.local_tools import create_local_tools
+
+    graph = agent.create_graph(fake_creds(), project, None, model=model)
+    tools = {t.name: t for t in create_local_tools(project, None)}
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    tool_seconds = 0.0
+    state = await graph.ainvoke(
+        {"messages": [HumanMessage(content=transcript["prompt"])]},
+        config=config)
+    while state.get("__interrupt__"):
+        payload = state["__interrupt__"][0].value
+        results = []
+        start = time.perf_counter()
+        # Stands in for the frontend's useFrontendTool handlers.
+        for call in payload["tool_calls"]:
+            selected = tools.get(call["name"])
+            content = (selected.invoke(call["args"]) if selected else
+                       f"Error: {call['name']} is not a valid tool.")
+            results.append({"tool_call_id": call["id"], "content": content})
+        tool_seconds += time.perf_counter() - start
+        state = await graph.ainvoke(Command(resume=results), config=config)
+    return state["messages"], tool_seconds
+
+
+async def run_once(transcript: dict, mode: str) -> dict:
+    from core import tracing
+
+    runner = run_local if mode == "local" else run_interrupt
+    project = fresh_project(transcript["template"])
+    model = ScriptedChatModel(steps=transcript["steps"])
+    recorder = SpanRecorder()
+    tracing.set_exporter(recorder)
+    try:
+        start = time.perf_counter()
+        final, frontend_tool_seconds = await runner(transcript, project,
+                                                    model)
+        wall = time.perf_counter() - start
+    finally:
+        tracing.set_exporter(None)
+        shutil.rmtree(project, ignore_errors=True)
+    tool_seconds = recorder.seconds("tool.") + frontend_tool_seconds
+    steps = model.model_calls
+    return {
+        "steps": steps,
+        "wall": wall,
+        "tool": tool_seconds,
+        "overhead_per_step":
+        (wall - tool_seconds - model.generate_seconds) / max(steps, 1),
+        "messages": len(final),
+        "state_bytes": len(json.dumps(messages_to_dict(final), default=str)),
+    }
+
+
+async def replay(transcript: dict, mode: str, iterations: int) -> dict:
+    # Timings come from a pass without tracemalloc, which slows allocation.
+    runs = [await run_once(transcript, mode) for _ in range(iterations)]
+
+    memory: list[int] = []
+    tracemalloc.start()
+    for _ in range(iterations):
+        await run_once(transcript, mode)
+        memory.append(tracemalloc.get_traced_memory()[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    last = runs[-1]
+    return {
+        "steps": last["steps"],
+        "wall_ms": statistics.median(r["wall"] for r in runs) * 1000,
+        "overhead_ms_per_step":
+        statistics.median(r["overhead_per_step"] for r in runs) * 1000,
+        "tool_ms": statistics.median(r["tool"] for r in runs) * 1000,
+        "messages": last["messages"],
+        "state_kb": last["state_bytes"] / 1024,
+        # Growth after the first traced iteration, which pays one-off costs.
+        "mem_growth_kb": (memory[-1] - memory[0]) / 1024,
+        "peak_kb": peak / 1024,
+    }
+
+
+async def main_async(args) -> None:
+    from core import analytics
+
+    # Keep PostHog callbacks local.
+    analytics.configure_pipeline(NullSink())
+
+    paths = args.transcripts or sorted(TRANSCRIPTS_DIR.glob("*.json"))
+    print(f"{'transcript':<16} {'mode':<10} {'steps':>5} {'wall ms':>8} "
+          f"{'ovh ms/step':>11} {'tool ms':>8} {'msgs':>5} {'state KB':>9} "
+          f"{'mem +KB':>8} {'peak KB':>8}")
+    for path in paths:
+        transcript = load_transcript(Path(path))
+        for mode in args.modes:
+            r = await replay(transcript, mode, args.iterations)
+            print(f"{transcript['name']:<16} {mode:<10} {r['steps']:>5} "
+                  f"{r['wall_ms']:>8.2f} {r['overhead_ms_per_step']:>11.3f} "
+                  f"{r['tool_ms']:>8.2f} {r['messages']:>5} "
+                  f"{r['state_kb']:>9.1f} {r['mem_growth_kb']:>8.1f} "
+                  f"{r['peak_kb']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("transcripts", nargs="*", type=Path)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--modes",
+                        nargs="+",
+                        choices=["local", "interrupt"],
+                        default=["local", "interrupt"])
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Measure what figure optimization saves when the agent places attached images.
+
+Generates camera-sized photos (JPEG) and large screenshots (PNG), attaches each
+the way the sidecar stores uploads (a hardlink to a blob), and places them with
+move_attached_image_to_project_tool into two copies of a two-column project:
+once with SPARTAN_FIGURE_OPTIMIZE off and once with it on. Reports figure
+bytes and placement time for each, then compiles both with compile_latex_tool
+and reports the median compile time and main.pdf size. Without tectonic,
+pdflatex or latexmk on PATH only the figure numbers are reported.
+
+Variants are cached under a temporary XDG_CACHE_HOME, so the optimized run
+pays for encoding; a final run shows placement from the warm cache.
+
+Usage:
+    uv run python benchmarks/figures.py [--figures 4] [--runs 3]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from core import figures  # noqa: E402
+from core.local_tools import create_local_tools  # noqa: E402
+
+MAIN_TEX = """\\documentclass[conference]{IEEEtran}
+\\usepackage{graphicx}
+\\begin{document}
+\\title{Figure benchmark}
+\\maketitle
+\\section{Results}
+Figures follow.
+\\end{document}
+"""
+
+
+def photo(seed: int) -> Image.Image:
+    """A 4000x3000 image with smooth gradients and sensor-like noise."""
+    rng = random.Random(seed)
+    img = Image.linear_gradient("L").resize((4000, 3000)).convert("RGB")
+    noise = Image.effect_noise((4000, 3000), 24).convert("RGB")
+    tint = Image.new("RGB", (4000, 3000),
+                     tuple(rng.randrange(256) for _ in range(3)))
+    return Image.blend(Image.blend(img, tint, 0.4), noise, 0.15)
+
+
+def screenshot(seed: int) -> Image.Image:
+    """A 3000x2000 image of flat panels, text and an embedded photo."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (3000, 2000), "white")
+    img.paste(photo(seed).resize((1400, 1000)), (1500, 900))
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rng.randrange(3000), rng.randrange(2000)
+        draw.rectangle((x, y, x + rng.randrange(400), y + rng.randrange(200)),
+                       fill=tuple(rng.randrange(256) for _ in range(3)))
+    for row in range(0, 2000, 24):
+        draw.text((40, row), "lorem ipsum dolor sit amet " * 8, fill="black")
+    return img
+
+
+def make_figures(count: int, dest: Path) -> list[Path]:
+    paths = []
+    for i in range(count):
+        if i % 2 == 0:
+            path = dest / f"photo-{i}.jpg"
+            photo(i).save(path, quality=95)
+        else:
+            path = dest / f"screenshot-{i}.png"
+            screenshot(i).save(path)
+        paths.append(path)
+    return paths
+
+
+def attach(source: Path, runtime: Path) -> Path:
+    """Store `source` as the sidecar does: a blob and a hardlinked upload."""
+    blob = runtime / "images" / f"{source.name}.blob"
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    if not blob.exists():
+        blob.write_bytes(source.read_bytes())
+    upload = runtime / f"{'0' * 32}-{source.name}"
+    upload.unlink(missing_ok=True)
+    os.link(blob, upload)
+    return upload
+
+
+def tool(root: Path, name: str, attached: Path | None = None):
+    tools = create_local_tools(root, str(attached) if attached else None)
+    return next(t for t in tools if t.name == name)
+
+
+def build_project(root: Path, sources: list[Path], runtime: Path,
+                  optimize: bool) -> float:
+    root.mkdir()
+    (root / "main.tex").write_text(MAIN_TEX)
+    os.environ[figures.ENABLE_ENV] = "1" if optimize else "0"
+    placed = []
+    elapsed = 0.0
+    for source in sources:
+        move = tool(root, "move_attached_image_to_project_tool",
+                    attach(source, runtime))
+        started = time.perf_counter()
+        result = move.invoke({})
+        elapsed += time.perf_counter() - started
+        placed.append(result.split("'")[1])
+
+    includes = "\n".join(
+        "\\begin{figure}[t]\\centering"
+        f"\\includegraphics[width=\\columnwidth]{{{rel}}}"
+        "\\end{figure}" for rel in placed)
+    main = root / "main.tex"
+    main.write_text(main.read_text().replace(
+        "\\end{document}", f"{includes}\n\\end{{document}}"))
+    return elapsed
+
+
+def figure_bytes(root: Path) -> int:
+    return sum(p.stat().st_size for p in (root / "figures").iterdir())
+
+
+def compile_seconds(root: Path, runs: int) -> tuple[float, int] | None:
+    compile_tool = tool(root, "compile_latex_tool")
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = compile_tool.invoke({})
+        times.append(time.perf_counter() - started)
+        if result != "SUCCESS":
+            print(f"  compile: {result.strip()[:200]}")
+            return None
+    return statistics.median(times), (root / "main.pdf").stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--figures", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        os.environ["XDG_CACHE_HOME"] = str(tmp / "cache")
+        (tmp / "sources").mkdir()
+        sources = make_figures(args.figures, tmp / "sources")
+        runtime = tmp / "runtime"
+        for label, optimize in (("original", False), ("optimized", True)):
+            root = tmp / label
+            elapsed = build_project(root, sources, runtime, optimize)
+            print(f"{label}: figures {figure_bytes(root) / 1e6:.1f} MB, "
+                  f"placed in {elapsed * 1000:.0f} ms")
+            compiled = compile_seconds(root, args.runs)
+            if compiled is not None:
+                seconds, pdf_bytes = compiled
+                print(f"  compile median {seconds:.2f} s, "
+                      f"main.pdf {pdf_bytes / 1e6:.1f} MB")
+
+        cached = build_project(tmp / "cached", sources, runtime, True)
+        print(f"optimized again (cached variants): {cached * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Load test for the server's multi-worker mode.
+
+Starts the server with 1, 2, 4, ... workers (up to the core count), drives a
+fixed number of concurrent clients (spread over several client processes)
+against one endpoint and prints throughput and latency per worker count.
+Throughput should scale with workers until the cores are saturated; run it on
+a machine with spare cores for the client processes.
+
+Usage:
+    uv run python benchmarks/load_test.py [--path /health] [--duration 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import httpx
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+
+def worker_counts(max_workers: int) -> list[int]:
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def start_server(workers: int, port: int, state_dir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SPARTAN_SERVER_WORKERS": str(workers),
+        "SPARTAN_SERVER_PORT": str(port),
+        "SPARTAN_STATE_DIR": state_dir,
+    }
+    return subprocess.Popen(
+        [sys.executable, "-c", "from api.server import main; main()"],
+        cwd=SERVER_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_healthy(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/health")).is_success:
+                    return
+            except httpx.RequestError:
+                pass
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"Server at {base_url} did not become healthy")
+
+
+async def drive(base_url: str, path: str, concurrency: int,
+                duration: float) -> list[float]:
+    latencies: list[float] = []
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+
+        async def client_loop():
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                resp = await client.get(path)
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return latencies
+
+
+def drive_in_process(base_url: str, path: str, concurrency: int,
+                     duration: float) -> list[float]:
+    return asyncio.run(drive(base_url, path, concurrency, duration))
+
+
+def run_clients(base_url: str, path: str, concurrency: int, duration: float,
+                processes: int) -> list[float]:
+    """Spread clients over several processes so the client is not the cap."""
+    per_process = max(1, concurrency // processes)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(drive_in_process, base_url, path, per_process,
+                        duration) for _ in range(processes)
+        ]
+        return [lat for f in futures for lat in f.result()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--client-processes",
+                        type=int,
+                        default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8787)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    with tempfile.TemporaryDirectory() as state_dir:
+        for workers in worker_counts(args.max_workers):
+            base_url = f"http://127.0.0.1:{args.port}"
+            proc = start_server(workers, args.port, state_dir)
+            try:
+                asyncio.run(wait_healthy(base_url))
+                latencies = run_clients(base_url, args.path,
+                                        args.concurrency, args.duration,
+                                        args.client_processes)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+            latencies.sort()
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+            print(f"{workers:>8} {len(latencies) / args.duration:>10.0f} "
+                  f"{p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Exercise the /usage-info cache against a local fake PostHog endpoint.
+
+Starts a fake PostHog query endpoint with a configurable delay, points the
+server at it and fires bursts of concurrent identical /usage-info requests.
+Prints upstream call counts and latencies, which should show one upstream
+call per burst (single flight), near-zero latency on hits and stale values
+served while a background refresh runs.
+
+Usage:
+    uv run python benchmarks/usage_cache.py [--delay 0.5] [--burst 50]
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+FAKE_PORT = 8799
+
+fake_posthog = FastAPI()
+upstream_calls = 0
+
+
+@fake_posthog.post("/run")
+async def run_query(request: Request):
+    global upstream_calls
+    upstream_calls += 1
+    body = await request.json()
+    await asyncio.sleep(fake_posthog.state.delay)
+    user_id = body["variables"]["user_id"]
+    return {
+        "columns": ["user_id", "ai_model", "generations", "total_cost"],
+        "results": [[user_id, '"openai/gpt-4o"', upstream_calls, 0.25]],
+    }
+
+
+def start_fake_posthog(delay: float) -> uvicorn.Server:
+    fake_posthog.state.delay = delay
+    server = uvicorn.Server(
+        uvicorn.Config(fake_posthog,
+                       host="127.0.0.1",
+                       port=FAKE_PORT,
+                       log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def burst(client: httpx.AsyncClient, size: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(client.post(
+        "/usage-info", json={
+            "user_id": "user_123",
+            "n_days_window": 30
+        }) for _ in range(size)))
+    for resp in responses:
+        resp.raise_for_status()
+    generations = responses[0].json()["data"]["data"][0]["generations"]
+    return time.perf_counter() - start, generations
+
+
+async def main_async(args) -> None:
+    from api.server import app
+    from core.usage import USAGE_CACHE
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url="http://server") as client:
+        phases = [
+            ("cold burst", 0),
+            ("warm burst", 0),
+            ("stale burst", args.ttl + 0.1),
+            ("after refresh", args.delay + 0.2),
+        ]
+        print(f"{'phase':<14} {'wall ms':>8} {'upstream':>9} {'served gen':>11}")
+        for name, wait in phases:
+            await asyncio.sleep(wait)
+            elapsed, generations = await burst(client, args.burst)
+            print(f"{name:<14} {elapsed * 1000:>8.1f} {upstream_calls:>9} "
+                  f"{generations:>11}")
+    print(f"cache stats: {USAGE_CACHE.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--delay", type=float, default=0.5)
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--ttl", type=float, default=1.0)
+    args = parser.parse_args()
+
+    os.environ["POSTHOG_READ_API_KEY_USER_USAGE_INFO"] = "fake"
+    os.environ["POSTHOG_USAGE_ENDPOINT_URL"] = f"http://127.0.0.1:{FAKE_PORT}/run"
+    os.environ["USAGE_CACHE_TTL_SECONDS"] = str(args.ttl)
+    os.environ["USAGE_CACHE_STALE_SECONDS"] = "60"
+
+    server = start_fake_posthog(args.delay)
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,21 @@
-import base64
-import mimetypes
 from pathlib import Path
 from textwrap import dedent
 
+from langchain_core.language_models import BaseChatModel
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.state import CompiledStateGraph
-from langgraph.prebuilt import ToolNode, tools_condition
+from langchain_core.runnables import RunnableConfig
+from langgraph.prebuilt import tools_condition
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.types import interrupt
 from copilotkit import CopilotKitState
 
-from .local_tools import create_local_tools
+from . import prompt_cache, snapshot, tracing
+from .images import ImageRejectedError, prepare_image_data_url
+from .local_tools import create_local_tools, run_tool_calls
 from .models import AgentCreds
 from .analytics import handle_callback
 
@@ -26,10 +29,12 @@ SYSTEM_PROMPT = dedent(
         5. Move the currently attached image into the project's figures directory
         6. Delete a file from the project directory
         7. Rename or move a file within the project directory
+        8. Outline the project: sections, figures, tables, labels, citations and bibliography entries with line ranges
 
         # Workflow
         When a user asks you to modify LaTeX files, you should:
-        - First, list files to understand the project structure if needed
+        - First, list files to understand the project structure if needed, unless a project snapshot already shows it
+        - To find a section, figure, table, label or citation, use the project outline instead of reading whole files, then read only the line range you need
         - Read relevant files to understand the current content
         - Make the requested changes
         - Write the updated content back to the file
@@ -108,10 +113,35 @@ FRONTEND_TOOL_SCHEMAS: list[dict] = [
         "type": "function",
         "function": {
             "name": "list_files_tool",
-            "description": "List all files in the project directory.",
+            "description":
+            "List files in the project directory with their sizes. Long listings start with a per-directory summary and are paged.",
             "parameters": {
                 "type": "object",
-                "properties": {}
+                "properties": {
+                    "recursive": {
+                        "type":
+                        "boolean",
+                        "description":
+                        "If true (default), list files in subdirectories too",
+                    },
+                    "directory": {
+                        "type":
+                        "string",
+                        "description":
+                        "Relative path of a folder to list instead of the project root (e.g., 'figures')",
+                    },
+                    "cursor": {
+                        "type":
+                        "string",
+                        "description":
+                        "Continue after this path, as given at the end of the previous page",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description":
+                        "Maximum number of files to return (default and maximum 200)",
+                    },
+                },
             },
         },
     },
@@ -120,7 +150,7 @@ FRONTEND_TOOL_SCHEMAS: list[dict] = [
         "function": {
             "name": "read_file_tool",
             "description":
-            "Read the contents of a file in the project directory.",
+            "Read the contents of a file in the project directory. Large files are returned in pages; the page ends with the offset to continue from.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -130,6 +160,17 @@ FRONTEND_TOOL_SCHEMAS: list[dict] = [
                         "description":
                         "Relative path to the file from the project root (e.g., 'main.tex' or 'refs.bib')",
                     },
+                    "offset": {
+                        "type": "integer",
+                        "description":
+                        "Zero-based line to start reading from (default 0)",
+                    },
+                    "limit": {
+                        "type":
+                        "integer",
+                        "description":
+                        "Maximum number of lines to return (default and maximum 2000)",
+                    },
                 },
                 "required": ["file_path"],
             },
@@ -205,6 +246,25 @@ FRONTEND_TOOL_SCHEMAS: list[dict] = [
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "project_outline_tool",
+            "description":
+            "Outline the project structure without reading whole files. Lists sections, figures, tables, labels, citations, \\input targets and bibliography entries with 1-based line ranges; pass offset=start-1 to read_file_tool to read just that part.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type":
+                        "string",
+                        "description":
+                        "Relative path of one .tex or .bib file to outline; omit for the whole project",
+                    },
+                },
+            },
+        },
+    },
     {
         "type": "function",
         "function": {
@@ -240,28 +300,6 @@ def _content_has_image_url_block(content: object) -> bool:
     return False
 
 
-def _data_url_for_image_file(path: Path) -> str | None:
-    try:
-        raw = path.read_bytes()
-    except OSError:
-        return None
-    mime, _ = mimetypes.guess_type(str(path))
-    if not mime or not mime.startswith("image/"):
-        ext = path.suffix.lower()
-        fallback = {
-            ".png": "image/png",
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".gif": "image/gif",
-            ".webp": "image/webp",
-            ".bmp": "image/bmp",
-            ".svg": "image/svg+xml",
-        }
-        mime = fallback.get(ext, "image/png")
-    b64 = base64.b64encode(raw).decode("ascii")
-    return f"data:{mime};base64,{b64}"
-
-
 def _inject_attached_image_into_messages(
     messages: list[BaseMessage],
     attached_image_path: str | None,
@@ -272,8 +310,13 @@ def _inject_attached_image_into_messages(
     path = Path(attached_image_path)
     if not path.is_file():
         return messages
-    data_url = _data_url_for_image_file(path)
-    if not data_url:
+    rejection = None
+    try:
+        with tracing.span("encode_image"):
+            data_url = prepare_image_data_url(path)
+    except ImageRejectedError as exc:
+        data_url, rejection = None, str(exc)
+    if not data_url and not rejection:
         return messages
 
     out = list(messages)
@@ -283,10 +326,16 @@ def _inject_attached_image_into_messages(
             continue
         if _content_has_image_url_block(msg.content):
             break
-        image_block: dict = {
-            "type": "image_url",
-            "image_url": {"url": data_url},
-        }
+        if data_url:
+            image_block: dict = {
+                "type": "image_url",
+                "image_url": {"url": data_url},
+            }
+        else:
+            image_block = {
+                "type": "text",
+                "text": f"[The attached image was not sent: {rejection}]",
+            }
         content = msg.content
         if isinstance(content, str):
             new_content: list | str = [
@@ -308,17 +357,37 @@ def _inject_attached_image_into_messages(
     return out
 
 
-def create_graph(creds: AgentCreds,
-                 folder_path: Path,
-                 attached_image_path: str | None,
-                 local_execution: bool = False) -> CompiledStateGraph:
+@tracing.traced("create_graph")
+def create_graph(
+        creds: AgentCreds,
+        folder_path: Path,
+        attached_image_path: str | None,
+        local_execution: bool = False,
+        checkpointer: BaseCheckpointSaver | None = None,
+        model: BaseChatModel | None = None,
+        project_snapshot: str | None = None) -> CompiledStateGraph:
     """Create and return a configured LangGraph agent.
 
     When local_execution is True, server-side tools are bound to the model and
     included in the graph.  When False (CopilotKit path), schema-only tools are
     always bound so the model outputs structured tool calls; execution is on the frontend.
+    Pass a shared checkpointer to persist thread state across requests and
+    worker processes; otherwise the graph gets a private in-memory one.
+    Pass a model to use instead of the one built from creds (e.g. a scripted
+    stand-in for benchmarks).
+    A project_snapshot (see core.snapshot) is sent after the system prompt
+    on every call, so it should be the one pinned to the thread.
     """
-    model = create_model(creds)
+    model = model or create_model(creds)
+    # Built once per graph and reused on every call so the static prefix
+    # (tools + system prompt) stays byte-identical for provider-side caching.
+    system_message = prompt_cache.build_system_message(
+        SYSTEM_PROMPT, creds.openai_api_model)
+    prefix = [system_message]
+    if project_snapshot:
+        prefix.append(
+            snapshot.snapshot_message(project_snapshot,
+                                      creds.openai_api_model))
 
     if local_execution:
         tools = create_local_tools(folder_path, attached_image_path)
@@ -328,14 +397,22 @@ def create_graph(creds: AgentCreds,
         model_with_tools = model.bind_tools(FRONTEND_TOOL_SCHEMAS)
 
     def call_model(state: CopilotKitState):
-        augmented = _inject_attached_image_into_messages(
-            state["messages"], attached_image_path)
-        messages = [SystemMessage(content=SYSTEM_PROMPT)] + augmented
+        with tracing.span("call_model",
+                          model=creds.openai_api_model) as current:
+            augmented = _inject_attached_image_into_messages(
+                state["messages"], attached_image_path)
+            messages = prefix + augmented
+            response = model_with_tools.invoke(
+                messages, config={"callbacks": [handle_callback(creds)]})
+            prompt_cache.record(creds.openai_api_model, response)
+            current.set_attribute("tool_calls", len(response.tool_calls))
+        return {"messages": [response]}
+
+    async def local_tools_node(state: CopilotKitState, config: RunnableConfig):
+        """Execute the last message's tool calls server-side, in parallel where safe."""
+        last = state["messages"][-1]
         return {
-            "messages": [
-                model_with_tools.invoke(
-                    messages, config={"callbacks": [handle_callback(creds)]})
-            ]
+            "messages": await run_tool_calls(tools, last.tool_calls, config)
         }
 
     def should_continue_after_agent(state: CopilotKitState) -> str:
@@ -387,7 +464,7 @@ def create_graph(creds: AgentCreds,
     workflow.add_edge(START, "agent")
 
     if local_execution:
-        workflow.add_node("tools", ToolNode(tools))
+        workflow.add_node("tools", local_tools_node)
         workflow.add_conditional_edges("agent", tools_condition)
         workflow.add_edge("tools", "agent")
     else:
@@ -398,7 +475,6 @@ def create_graph(creds: AgentCreds,
         })
         workflow.add_edge("frontend_tools", "agent")
 
-    memory = MemorySaver()
-    graph = workflow.compile(checkpointer=memory)
+    graph = workflow.compile(checkpointer=checkpointer or MemorySaver())
 
     return graph
@@ -1,16 +1,220 @@
+"""LLM analytics, captured off the request path.
+
+PostHog's LangChain CallbackHandler builds the `$ai_generation` / `$ai_trace`
+events; instead of handing them to PostHog inline, it is given a client proxy
+whose `capture` only enqueues. A background worker drains the bounded queue
+and forwards events in batches to a sink. When the queue is full events are
+dropped and counted rather than slowing down a model turn.
+
+Each model call gets its own handler, since a handler tracks the runs it is
+observing in unsynchronized dicts; only the queued client is shared.
+"""
+import atexit
+import logging
 import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Protocol
+
 from posthog.ai.langchain import CallbackHandler
 from posthog import Posthog
 
 from .models import AgentCreds
 
+logger = logging.getLogger(__name__)
+
 posthog = Posthog(os.getenv("POSTHOG_API_KEY"),
                   host="https://us.i.posthog.com")
 
+QUEUE_SIZE = 10_000
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 1.0
+
+# Put on the queue by close() to wake a worker waiting for a batch to fill.
+_WAKE = ("", {})
+
+
+class Sink(Protocol):
+
+    def send(self, events: list[tuple[str, dict]]) -> None:
+        ...
+
+
+class PosthogSink:
+    """Replays queued calls on the real PostHog client."""
+
+    def __init__(self, client: Posthog):
+        self.client = client
+
+    def send(self, events: list[tuple[str, dict]]) -> None:
+        for method, kwargs in events:
+            getattr(self.client, method)(**kwargs)
+
+
+class MemorySink:
+    """Keeps events in memory; for tests and local runs without PostHog."""
+
+    def __init__(self):
+        self.events: list[tuple[str, dict]] = []
+
+    def send(self, events: list[tuple[str, dict]]) -> None:
+        self.events.extend(events)
+
+
+@dataclass
+class PipelineStats:
+    enqueued: int = 0
+    sent: int = 0
+    dropped: int = 0
+    failed: int = 0
+    batches: int = 0
+    queue_depth: int = 0
+    queue_high_water: int = 0
+
+
+class AnalyticsPipeline:
+
+    def __init__(self,
+                 sink: Sink,
+                 queue_size: int = QUEUE_SIZE,
+                 batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[tuple[str, dict]] = queue.Queue(queue_size)
+        self._stats = PipelineStats()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run,
+                                         name="analytics-pipeline",
+                                         daemon=True)
+        self._worker.start()
+
+    def enqueue(self, method: str, kwargs: dict) -> bool:
+        """Queue a call without blocking; returns False if it was dropped."""
+        try:
+            self._queue.put_nowait((method, kwargs))
+        except queue.Full:
+            with self._lock:
+                self._stats.dropped += 1
+                dropped = self._stats.dropped
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning("Analytics queue full; %d events dropped",
+                               dropped)
+            return False
+        with self._lock:
+            self._stats.enqueued += 1
+            self._stats.queue_high_water = max(self._stats.queue_high_water,
+                                               self._queue.qsize())
+        return True
+
+    def _next_batch(self) -> list[tuple[str, dict]]:
+        batch: list[tuple[str, dict]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _WAKE:
+                break
+            batch.append(item)
+        return batch
+
+    def _send(self, batch: list[tuple[str, dict]]) -> None:
+        try:
+            self.sink.send(batch)
+        except Exception:
+            logger.exception("Failed to send %d analytics events", len(batch))
+            with self._lock:
+                self._stats.failed += len(batch)
+                self._stats.batches += 1
+            return
+        with self._lock:
+            self._stats.sent += len(batch)
+            self._stats.batches += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._send(batch)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the worker and flush whatever is still queued."""
+        self._stop.set()
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass  # the worker is not waiting on an empty queue
+        self._worker.join(timeout)
+        remaining: list[tuple[str, dict]] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _WAKE:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.batch_size):
+            self._send(remaining[start:start + self.batch_size])
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            self._stats.queue_depth = self._queue.qsize()
+            return asdict(self._stats)
+
+
+class _QueuedClient:
+    """PostHog client stand-in whose captures go through the pipeline."""
+
+    def __init__(self, client: Posthog, pipeline: AnalyticsPipeline):
+        self._client = client
+        self._pipeline = pipeline
+
+    def capture(self, **kwargs: Any) -> None:
+        self._pipeline.enqueue("capture", kwargs)
+
+    def capture_exception(self, exception: BaseException,
+                          **kwargs: Any) -> None:
+        self._pipeline.enqueue("capture_exception", {
+            "exception": exception,
+            **kwargs
+        })
+
+    def __getattr__(self, name: str) -> Any:
+        # Read-only settings (privacy_mode, enable_exception_autocapture, ...)
+        return getattr(self._client, name)
+
+
+pipeline = AnalyticsPipeline(PosthogSink(posthog))
+_client = _QueuedClient(posthog, pipeline)
+
+
+@atexit.register
+def _close_pipeline() -> None:
+    pipeline.close()
+
+
+def configure_pipeline(sink: Sink) -> AnalyticsPipeline:
+    """Replace the pipeline, e.g. with a MemorySink in tests."""
+    global pipeline, _client
+    pipeline.close()
+    pipeline = AnalyticsPipeline(sink)
+    _client = _QueuedClient(posthog, pipeline)
+    return pipeline
+
 
-def handle_callback(creds: AgentCreds) -> None:
+def handle_callback(creds: AgentCreds) -> CallbackHandler:
+    """A handler for one model call; cheap, as it only holds run state."""
     return CallbackHandler(
-        client=posthog,
+        client=_client,
         distinct_id=creds.user_email.lower(),
         privacy_mode=False  # optional
     )
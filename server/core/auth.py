@@ -1,13 +1,32 @@
+import asyncio
+import hashlib
 import os
-from dataclasses import dataclass
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
 from functools import lru_cache
 
 from fastapi import Request
-from workos import WorkOSClient
+from workos import AsyncWorkOSClient
 from workos.exceptions import AuthenticationException, BaseRequestException
-from workos.session import _get_jwks_client, jwt
+from workos.session import jwt
 from workos.types.user_management import User
 
+from . import metrics, tracing
+from .shared_state import get_shared_store
+from .ttl_cache import AsyncTTLCache
+
+# Verified sessions are reused until the token expires, capped at this age so
+# revoked users are picked up within a few minutes.
+TOKEN_CACHE_MAX_TTL = 300.0
+TOKEN_CACHE_SIZE = 4096
+USER_CACHE_TTL = 300.0
+USER_CACHE_SIZE = 1024
+# Signing keys are cached by kid; an unknown kid (key rotation) refetches.
+JWKS_LIFESPAN = 3600.0
+
+_TOKEN_NAMESPACE = "auth-token"
+
 
 @dataclass
 class AuthenticatedSession:
@@ -23,8 +42,20 @@ class AuthError(Exception):
         self.status_code = status_code
 
 
+_token_cache: OrderedDict[str, tuple[AuthenticatedSession,
+                                     float]] = OrderedDict()
+_user_cache = AsyncTTLCache("auth-user",
+                            ttl=USER_CACHE_TTL,
+                            max_entries=USER_CACHE_SIZE)
+
+TOKEN_CACHE_LOOKUPS = metrics.Counter(
+    "spartan_auth_token_cache_lookups_total",
+    "Verified-session cache lookups by result (hit, shared_hit, miss).",
+)
+
+
 @lru_cache(maxsize=1)
-def _get_workos_client() -> WorkOSClient:
+def _get_workos_client() -> AsyncWorkOSClient:
     api_key = os.getenv("WORKOS_API_KEY")
     client_id = os.getenv("WORKOS_CLIENT_ID")
     if not api_key or not client_id:
@@ -32,13 +63,22 @@ def _get_workos_client() -> WorkOSClient:
             "WorkOS is not configured. Set WORKOS_API_KEY and WORKOS_CLIENT_ID.",
             status_code=500,
         )
-    return WorkOSClient(
+    return AsyncWorkOSClient(
         api_key=api_key,
         client_id=client_id,
         jwt_leeway=60,  # 60s leeway for clock skew / expiration edge cases
     )
 
 
+@lru_cache(maxsize=1)
+def _get_jwks_client() -> jwt.PyJWKClient:
+    return jwt.PyJWKClient(
+        _get_workos_client().user_management.get_jwks_url(),
+        cache_keys=True,
+        lifespan=JWKS_LIFESPAN,
+    )
+
+
 def _extract_bearer_token(request: Request) -> str:
     authorization = request.headers.get("authorization", "")
     scheme, _, token = authorization.partition(" ")
@@ -54,17 +94,70 @@ def _is_jwt(token: str) -> bool:
     return token.count(".") == 2
 
 
-def _authenticate_with_access_token(access_token: str) -> AuthenticatedSession:
-    client = _get_workos_client()
-    jwks = _get_jwks_client(client.user_management.get_jwks_url())
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+async def _get_cached_session(key: str) -> AuthenticatedSession | None:
+    entry = _token_cache.get(key)
+    if entry is not None:
+        session, expires_at = entry
+        if expires_at > time.time():
+            _token_cache.move_to_end(key)
+            TOKEN_CACHE_LOOKUPS.inc(result="hit")
+            return session
+        del _token_cache[key]
+
+    shared = get_shared_store()
+    stored = (await shared.aget(_TOKEN_NAMESPACE, key)
+              if shared is not None else None)
+    if stored is None:
+        TOKEN_CACHE_LOOKUPS.inc(result="miss")
+        return None
+    session = AuthenticatedSession(user_id=stored["user_id"],
+                                   user=User.model_validate(stored["user"]))
+    _store_local_session(key, session, stored["expires_at"])
+    TOKEN_CACHE_LOOKUPS.inc(result="shared_hit")
+    return session
+
+
+def _store_local_session(key: str, session: AuthenticatedSession,
+                         expires_at: float) -> None:
+    _token_cache[key] = (session, expires_at)
+    _token_cache.move_to_end(key)
+    while len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+
+
+async def _cache_session(key: str, session: AuthenticatedSession,
+                         token_expires_at: float | None) -> None:
+    expires_at = time.time() + TOKEN_CACHE_MAX_TTL
+    if token_expires_at is not None:
+        expires_at = min(expires_at, token_expires_at)
+    if expires_at <= time.time():
+        return
+    _store_local_session(key, session, expires_at)
+    shared = get_shared_store()
+    if shared is not None:
+        await shared.aset(_TOKEN_NAMESPACE,
+                          key, {
+                              "user_id": session.user_id,
+                              "user": session.user.model_dump(mode="json"),
+                              "expires_at": expires_at,
+                          },
+                          ttl=expires_at - time.time())
+
+
+def _verify_access_token(access_token: str) -> dict:
+    """Verify the JWT signature and claims. May fetch JWKS, so run off-loop."""
     try:
-        signing_key = jwks.get_signing_key_from_jwt(access_token)
-        decoded = jwt.decode(
+        signing_key = _get_jwks_client().get_signing_key_from_jwt(access_token)
+        return jwt.decode(
             access_token,
             signing_key.key,
             algorithms=["RS256"],
             options={"verify_aud": False},
-            leeway=client.jwt_leeway,
+            leeway=_get_workos_client().jwt_leeway,
         )
     except jwt.exceptions.ExpiredSignatureError as exc:
         raise AuthError("Token expired. Please sign in again.",
@@ -75,24 +168,60 @@ def _authenticate_with_access_token(access_token: str) -> AuthenticatedSession:
         raise AuthError(f"Token verification failed: {exc}",
                         status_code=401) from exc
 
+
+async def _get_user(user_id: str) -> User:
+    """Return the WorkOS user, cached and de-duplicated across requests."""
+
+    async def fetch() -> dict:
+        user = await _get_workos_client().user_management.get_user(user_id)
+        return user.model_dump(mode="json")
+
+    try:
+        data = await _user_cache.get(user_id, fetch)
+    except BaseRequestException as exc:
+        raise AuthError(f"Authentication service error: {str(exc)}",
+                        status_code=502) from exc
+    return User.model_validate(data)
+
+
+async def _authenticate_with_access_token(
+        access_token: str) -> AuthenticatedSession:
+    key = _token_key(access_token)
+    session = await _get_cached_session(key)
+    if session is not None:
+        return session
+
+    decoded = await asyncio.to_thread(_verify_access_token, access_token)
+
     user_id = decoded.get("sub")
     if not user_id:
         raise AuthError("Invalid token: missing subject claim.",
                         status_code=401)
 
+    user = await _get_user(user_id)
+    session = AuthenticatedSession(user_id=user.id, user=user)
+    await _cache_session(key, session, decoded.get("exp"))
+    return session
+
+
+def _access_token_expiry(access_token: str) -> float | None:
+    """Read `exp` from a token WorkOS just issued to us; no verification needed."""
     try:
-        user = client.user_management.get_user(user_id)
-    except BaseRequestException as exc:
-        raise AuthError(f"Authentication service error: {str(exc)}",
-                        status_code=502) from exc
+        claims = jwt.decode(access_token, options={"verify_signature": False})
+    except jwt.exceptions.InvalidTokenError:
+        return None
+    return claims.get("exp")
 
-    return AuthenticatedSession(user_id=user.id, user=user)
 
+async def _authenticate_with_refresh_token(
+        refresh_token: str, request: Request) -> AuthenticatedSession:
+    key = _token_key(refresh_token)
+    session = await _get_cached_session(key)
+    if session is not None:
+        return session
 
-def _authenticate_with_refresh_token(refresh_token: str,
-                                     request: Request) -> AuthenticatedSession:
     try:
-        response = _get_workos_client(
+        response = await _get_workos_client(
         ).user_management.authenticate_with_refresh_token(
             refresh_token=refresh_token,
             user_agent=request.headers.get("user-agent"),
@@ -107,11 +236,21 @@ def _authenticate_with_refresh_token(refresh_token: str,
                         status_code=502) from exc
 
     user = response.user
-    return AuthenticatedSession(user_id=user.id, user=user)
+    session = AuthenticatedSession(user_id=user.id, user=user)
+    await _cache_session(key, session, _access_token_expiry(response.access_token))
+    return session
+
+
+def cache_stats() -> dict[str, int]:
+    """WorkOS user cache counters plus the verified-session cache size."""
+    return {
+        **asdict(_user_cache.stats), "token_cache_entries": len(_token_cache)
+    }
 
 
-def authenticate_request(request: Request) -> AuthenticatedSession:
+@tracing.traced("authenticate_request")
+async def authenticate_request(request: Request) -> AuthenticatedSession:
     token = _extract_bearer_token(request)
     if _is_jwt(token):
-        return _authenticate_with_access_token(token)
-    return _authenticate_with_refresh_token(token, request)
+        return await _authenticate_with_access_token(token)
+    return await _authenticate_with_refresh_token(token, request)
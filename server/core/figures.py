@@ -0,0 +1,26 @@
+"""Print-sized figures for images the agent moves into a project.
+
+The pipeline lives in spartan_shared.figures, shared with the sidecar; see
+that module for SPARTAN_FIGURE_OPTIMIZE and SPARTAN_FIGURE_DPI. This module
+only names the server's metric.
+"""
+from pathlib import Path
+
+from spartan_shared import figures
+from spartan_shared.figures import ENABLE_ENV  # noqa: F401
+
+from . import metrics
+
+FIGURE_BYTES_SAVED = metrics.Counter(
+    "spartan_figure_bytes_saved_total",
+    "Bytes saved by optimizing figures placed into projects.",
+)
+
+
+def optimize_for_project(source: Path,
+                         project_root: Path,
+                         sha256: str | None = None) -> Path | None:
+    return figures.optimize_for_project(source,
+                                        project_root,
+                                        sha256,
+                                        bytes_saved=FIGURE_BYTES_SAVED)
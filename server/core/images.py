@@ -0,0 +1,169 @@
+"""Attached-image preprocessing for vision input.
+
+An attachment is decoded, downscaled and re-encoded once per distinct file
+content; the resulting data URL is cached so every `call_model` iteration of a
+tool loop reuses it instead of re-reading and re-encoding the original.
+"""
+import base64
+import hashlib
+import io
+import mimetypes
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image, UnidentifiedImageError
+
+# Reject obviously oversized uploads before reading or decoding them.
+MAX_SOURCE_BYTES = 25 * 1024 * 1024
+MAX_SOURCE_PIXELS = 40_000_000
+
+# Vision providers downscale server-side anyway: OpenAI fits images into
+# 2048x2048 and then to 768px on the short side. Sending more is wasted upload.
+TARGET_MAX_EDGE = 2048
+TARGET_MAX_SHORT_EDGE = 768
+JPEG_QUALITY = 85
+
+_CACHE_SIZE = 32
+
+_MIME_FALLBACK = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+    ".svg": "image/svg+xml",
+}
+
+# Formats whose content is usually line art or text, kept lossless.
+_LOSSLESS_FORMATS = {"PNG", "GIF", "BMP"}
+
+
+class ImageRejectedError(ValueError):
+    """Raised when an attachment is too large to send to the model."""
+
+
+_lock = threading.Lock()
+_digest_by_stat: dict[tuple[str, int, int], str] = {}
+# Cached data URL per content digest, or the rejection for that content.
+_data_urls: OrderedDict[str, str | ImageRejectedError] = OrderedDict()
+
+
+def _guess_mime(path: Path) -> str:
+    mime, _ = mimetypes.guess_type(str(path))
+    if not mime or not mime.startswith("image/"):
+        mime = _MIME_FALLBACK.get(path.suffix.lower(), "image/png")
+    return mime
+
+
+def _target_size(width: int, height: int) -> tuple[int, int]:
+    """Return the provider-appropriate size for an image, never upscaling."""
+    scale = min(1.0, TARGET_MAX_EDGE / max(width, height))
+    scale = min(scale, TARGET_MAX_SHORT_EDGE / max(1, min(width, height)))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _normalize(raw: bytes, path: Path) -> tuple[bytes, str]:
+    """Downscale and re-encode `raw`; fall back to the original bytes."""
+    mime = _guess_mime(path)
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            width, height = img.size
+            if width * height > MAX_SOURCE_PIXELS:
+                raise ImageRejectedError(
+                    f"Image is too large ({width}x{height} pixels); "
+                    f"the limit is {MAX_SOURCE_PIXELS:,} pixels.")
+            source_format = img.format or ""
+            size = _target_size(width, height)
+            if size == (width, height) and source_format in ("PNG", "JPEG"):
+                return raw, mime
+
+            img.load()
+            if size != (width, height):
+                img = img.resize(size, Image.Resampling.LANCZOS)
+
+            out = io.BytesIO()
+            has_alpha = img.mode in ("RGBA", "LA", "PA") or (
+                img.mode == "P" and "transparency" in img.info)
+            if has_alpha or source_format in _LOSSLESS_FORMATS:
+                if img.mode not in ("RGB", "RGBA", "L", "LA"):
+                    img = img.convert("RGBA" if has_alpha else "RGB")
+                img.save(out, format="PNG", optimize=True)
+                encoded, encoded_mime = out.getvalue(), "image/png"
+            else:
+                img.convert("RGB").save(out,
+                                        format="JPEG",
+                                        quality=JPEG_QUALITY,
+                                        optimize=True)
+                encoded, encoded_mime = out.getvalue(), "image/jpeg"
+    except Image.DecompressionBombError as exc:
+        raise ImageRejectedError(f"Image is too large: {exc}") from exc
+    except (UnidentifiedImageError, OSError):
+        # Not a raster format Pillow understands (e.g. SVG); send as-is.
+        return raw, mime
+
+    if len(encoded) >= len(raw) and size == (width, height):
+        return raw, mime
+    return encoded, encoded_mime
+
+
+def _unwrap(entry: str | ImageRejectedError) -> str:
+    if isinstance(entry, ImageRejectedError):
+        raise ImageRejectedError(str(entry))
+    return entry
+
+
+def prepare_image_data_url(path: Path) -> str | None:
+    """Return a cached, provider-sized data URL for the image at `path`.
+
+    Returns None if the file cannot be read. Raises ImageRejectedError for
+    images that exceed the size limits.
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    if stat.st_size > MAX_SOURCE_BYTES:
+        raise ImageRejectedError(
+            f"Image is too large ({stat.st_size / (1024 * 1024):.1f} MB); "
+            f"the limit is {MAX_SOURCE_BYTES // (1024 * 1024)} MB.")
+
+    stat_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        digest = _digest_by_stat.get(stat_key)
+        cached = _data_urls.get(digest) if digest is not None else None
+        if cached is not None:
+            _data_urls.move_to_end(digest)
+    if cached is not None:
+        return _unwrap(cached)
+
+    try:
+        raw = path.read_bytes()
+    except OSError:
+        return None
+    digest = hashlib.sha256(raw).hexdigest()
+
+    with _lock:
+        _digest_by_stat[stat_key] = digest
+        cached = _data_urls.get(digest)
+        if cached is not None:
+            _data_urls.move_to_end(digest)
+    if cached is not None:
+        return _unwrap(cached)
+
+    try:
+        encoded, mime = _normalize(raw, path)
+        entry: str | ImageRejectedError = (
+            f"data:{mime};base64,{base64.b64encode(encoded).decode('ascii')}")
+    except ImageRejectedError as exc:
+        entry = exc
+
+    with _lock:
+        _data_urls[digest] = entry
+        _data_urls.move_to_end(digest)
+        while len(_data_urls) > _CACHE_SIZE:
+            evicted, _ = _data_urls.popitem(last=False)
+            for key in [k for k, v in _digest_by_stat.items() if v == evicted]:
+                del _digest_by_stat[key]
+    return _unwrap(entry)
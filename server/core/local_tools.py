@@ -1,37 +1,85 @@
+import asyncio
+import contextvars
+import os
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from langchain_core.tools import tool
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, tool
 
+from spartan_shared import images, outline, paging
+from spartan_shared.confine import resolve_under_root
 
-def _resolved_under_root(root: Path, relative: str) -> Path:
-    root_r = root.resolve()
-    candidate = (root_r / relative).resolve()
+from . import figures, tracing
+
+# Bounded pool for blocking tool work (file I/O, compiler subprocesses) so a
+# batch of tool calls runs concurrently without stalling the event loop.
+_TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=8,
+                                    thread_name_prefix="local-tool")
+
+# Access key meaning "the whole project tree".
+_ALL = "*"
+
+READ_MAX_LINES = paging.READ_MAX_LINES
+LIST_MAX_ENTRIES = paging.LIST_MAX_ENTRIES
+
+
+def _read_page(path: Path, offset: int, limit: int) -> str:
+    """Return a page of the file as text, ending with where to continue.
+
+    A file that fits in one page is returned verbatim.
+    """
     try:
-        candidate.relative_to(root_r)
+        page = paging.read_page(path, offset, limit)
     except ValueError as e:
-        raise ValueError(f"Path escapes project root: {relative!r}") from e
-    return candidate
+        return f"Error: {e}."
+    if (page["start_line"] == 0 and page["next_offset"] is None
+            and page["size"] <= paging.READ_MAX_BYTES):
+        return page["content"]
+
+    content = page["content"]
+    if not content.endswith("\n"):
+        content += "\n"
+    footer = (f"[Lines {page['start_line'] + 1}-{page['end_line']} of "
+              f"{page['total_lines']}; file size "
+              f"{paging.format_size(page['size'])}.")
+    if page["next_offset"] is not None:
+        footer += (f" More content follows: call read_file_tool with"
+                   f" offset={page['next_offset']} to continue. Read every"
+                   f" page before rewriting the whole file.]")
+    else:
+        footer += " End of file.]"
+    return content + footer
 
 
 def create_local_tools(folder_path: Path, attached_image_path: str | None):
     """Create tools bound to a specific folder path."""
 
     @tool
-    def read_file_tool(file_path: str) -> str:
+    def read_file_tool(file_path: str,
+                       offset: int = 0,
+                       limit: int = READ_MAX_LINES) -> str:
         """Read the contents of a file in the project directory.
 
+        Large files are returned in pages; the page ends with the offset to continue from.
+
         Args:
             file_path: Relative path to the file from the project root (e.g., 'main.tex' or 'refs.bib')
+            offset: Zero-based line to start reading from (default 0)
+            limit: Maximum number of lines to return (default and maximum 2000)
         """
-        full_path = folder_path / file_path
-        if not full_path.exists():
-            return f"Error: File '{file_path}' does not exist in the project directory."
-        if not full_path.is_file():
-            return f"Error: '{file_path}' is not a file."
         try:
-            return full_path.read_text()
+            full_path = resolve_under_root(folder_path, file_path)
+            if not full_path.exists():
+                return f"Error: File '{file_path}' does not exist in the project directory."
+            if not full_path.is_file():
+                return f"Error: '{file_path}' is not a file."
+            return _read_page(full_path, offset, limit)
+        except ValueError as e:
+            return str(e)
         except Exception as e:
             return f"Error reading file '{file_path}': {str(e)}"
 
@@ -43,11 +91,15 @@ def create_local_tools(folder_path: Path, attached_image_path: str | None):
             file_path: Relative path to the file from the project root (e.g., 'main.tex' or 'refs.bib')
             content: The complete content to write to the file
         """
-        full_path = folder_path / file_path
         try:
+            full_path = resolve_under_root(folder_path,
+                                           file_path,
+                                           for_write=True)
             full_path.parent.mkdir(parents=True, exist_ok=True)
             full_path.write_text(content)
             return f"Successfully updated '{file_path}'."
+        except ValueError as e:
+            return str(e)
         except Exception as e:
             return f"Error writing to file '{file_path}': {str(e)}"
 
@@ -59,7 +111,7 @@ def create_local_tools(folder_path: Path, attached_image_path: str | None):
             file_path: Relative path to the file from the project root
         """
         try:
-            path = _resolved_under_root(folder_path, file_path)
+            path = resolve_under_root(folder_path, file_path, for_write=True)
             if not path.exists():
                 return f"Error: File '{file_path}' does not exist in the project directory."
             if not path.is_file():
@@ -80,8 +132,8 @@ def create_local_tools(folder_path: Path, attached_image_path: str | None):
             to_path: New relative path for the file from the project root
         """
         try:
-            src = _resolved_under_root(folder_path, from_path)
-            dst = _resolved_under_root(folder_path, to_path)
+            src = resolve_under_root(folder_path, from_path, for_write=True)
+            dst = resolve_under_root(folder_path, to_path, for_write=True)
             if not src.exists():
                 return f"Error: File '{from_path}' does not exist in the project directory."
             if not src.is_file():
@@ -99,26 +151,54 @@ def create_local_tools(folder_path: Path, attached_image_path: str | None):
             return f"Error renaming file: {str(e)}"
 
     @tool
-    def list_files_tool(recursive: bool = True) -> str:
-        """List all files in the project directory.
+    def list_files_tool(recursive: bool = True,
+                        directory: str = "",
+                        cursor: str | None = None,
+                        limit: int = LIST_MAX_ENTRIES) -> str:
+        """List files in the project directory with their sizes.
+
+        Long listings start with a per-directory summary and are paged.
 
         Args:
-            recursive: If True, list files recursively in subdirectories. If False, only list files in the root directory.
+            recursive: If True, list files recursively in subdirectories. If False, only list files in the directory itself.
+            directory: Relative path of a folder to list instead of the project root (e.g., 'figures')
+            cursor: Continue after this path, as given at the end of the previous page
+            limit: Maximum number of files to return (default and maximum 200)
         """
-        if recursive:
-            files = [
-                str(p.relative_to(folder_path)) for p in folder_path.rglob("*")
-                if p.is_file()
-            ]
-        else:
-            files = [
-                str(p.relative_to(folder_path)) for p in folder_path.iterdir()
-                if p.is_file()
-            ]
-        if not files:
+        try:
+            page = paging.list_page(folder_path, recursive, directory,
+                                    cursor, limit)
+        except ValueError as e:
+            return str(e)
+        except FileNotFoundError:
+            return f"Error: Directory '{directory}' does not exist in the project directory."
+        except NotADirectoryError:
+            return f"Error: '{directory}' is not a directory."
+        if not page["total_files"]:
             return "No files found in the project directory."
-        file_list = "\n".join(f"  - {f}" for f in sorted(files))
-        return f"Files in project directory:\n{file_list}"
+        return paging.format_file_list(page, directory.strip("/"))
+
+    @tool
+    def project_outline_tool(file_path: str | None = None) -> str:
+        """Outline the project structure without reading whole files.
+
+        Lists sections, figures, tables, labels, citations, \\input targets and
+        bibliography entries with 1-based line ranges; pass offset=start-1 to
+        read_file_tool to read just that part.
+
+        Args:
+            file_path: Relative path of one .tex or .bib file to outline; omit for the whole project
+        """
+        try:
+            if file_path:
+                path = resolve_under_root(folder_path, file_path)
+                if not path.is_file():
+                    return f"Error: File '{file_path}' does not exist in the project directory."
+            return outline.project_outline(folder_path, file_path)
+        except ValueError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error outlining project: {str(e)}"
 
     @tool
     def compile_latex_tool() -> str:
@@ -137,11 +217,13 @@ def create_local_tools(folder_path: Path, attached_image_path: str | None):
             cmd = ["pdflatex", "-interaction=nonstopmode", "main.tex"]
 
         try:
-            result = subprocess.run(cmd,
-                                    cwd=str(folder_path),
-                                    capture_output=True,
-                                    text=True,
-                                    timeout=120)
+            with tracing.span("compile", compiler=compiler) as current:
+                result = subprocess.run(cmd,
+                                        cwd=str(folder_path),
+                                        capture_output=True,
+                                        text=True,
+                                        timeout=120)
+                current.set_attribute("returncode", result.returncode)
             if result.returncode == 0:
                 return "SUCCESS"
             return f"FAILED: {result.stderr}"
@@ -157,16 +239,13 @@ def create_local_tools(folder_path: Path, attached_image_path: str | None):
             return "Error: No image is currently attached."
         try:
             image_path = Path(attached_image_path)
-            figures_dir = folder_path / "figures"
-            figures_dir.mkdir(parents=True, exist_ok=True)
-            destination = figures_dir / image_path.name
-            counter = 1
-            stem, suffix = destination.stem, destination.suffix
-            while destination.exists():
-                destination = figures_dir / f"{stem}-{counter}{suffix}"
-                counter += 1
-            shutil.move(str(image_path), str(destination))
-            return f"Moved attached image to '{destination.relative_to(folder_path)}'."
+            destination = images.place_in_project(
+                image_path, folder_path, "figures",
+                figures.optimize_for_project)
+            # The attachment is the sidecar's hardlink to a shared blob, so
+            # only that name goes; the blob is the sidecar's to collect.
+            image_path.unlink()
+            return f"Moved attached image to '{destination.relative_to(folder_path.resolve())}'."
         except Exception as e:
             return f"Error moving attached image into project: {str(e)}"
 
@@ -176,6 +255,98 @@ def create_local_tools(folder_path: Path, attached_image_path: str | None):
         delete_file_tool,
         rename_file_tool,
         list_files_tool,
+        project_outline_tool,
         compile_latex_tool,
         move_attached_image_to_project_tool,
     ]
+
+
+def _access_key(relative: object) -> str:
+    return os.path.normpath(str(relative or "")).lstrip(os.sep)
+
+
+def _tool_call_access(tool_call: dict) -> tuple[set[str], set[str]]:
+    """Return the (read, write) access keys of a tool call."""
+    name = tool_call.get("name")
+    args = tool_call.get("args") or {}
+    if name == "read_file_tool":
+        return {_access_key(args.get("file_path"))}, set()
+    if name == "list_files_tool":
+        return {_ALL}, set()
+    if name == "project_outline_tool":
+        if args.get("file_path"):
+            return {_access_key(args.get("file_path"))}, set()
+        return {_ALL}, set()
+    if name in ("edit_file_tool", "delete_file_tool"):
+        return set(), {_access_key(args.get("file_path"))}
+    if name == "rename_file_tool":
+        return set(), {
+            _access_key(args.get("from_path")),
+            _access_key(args.get("to_path")),
+        }
+    # Compiling reads everything and writes outputs; moving the attachment
+    # picks its destination at run time. Both act as barriers.
+    return set(), {_ALL}
+
+
+def _overlaps(a: set[str], b: set[str]) -> bool:
+    if not a or not b:
+        return False
+    return _ALL in a or _ALL in b or not a.isdisjoint(b)
+
+
+def _conflicts(earlier: tuple[set[str], set[str]],
+               later: tuple[set[str], set[str]]) -> bool:
+    earlier_reads, earlier_writes = earlier
+    later_reads, later_writes = later
+    return (_overlaps(earlier_writes, later_reads | later_writes)
+            or _overlaps(earlier_reads, later_writes))
+
+
+async def run_tool_calls(tools: list[BaseTool], tool_calls: list[dict],
+                         config: RunnableConfig) -> list[ToolMessage]:
+    """Run a batch of tool calls concurrently, preserving conflicting order.
+
+    Calls that touch disjoint paths run in parallel on a bounded executor; a
+    call that reads or writes a path written by an earlier call in the batch
+    (or writes a path an earlier call reads) waits for that call first.
+    """
+    tools_by_name = {t.name: t for t in tools}
+    loop = asyncio.get_running_loop()
+    access = [_tool_call_access(tc) for tc in tool_calls]
+
+    async def run_one(tool_call: dict,
+                      depends_on: list[asyncio.Task]) -> ToolMessage:
+        if depends_on:
+            await asyncio.wait(depends_on)
+        name = tool_call["name"]
+        selected = tools_by_name.get(name)
+        if selected is None:
+            return ToolMessage(
+                content=f"Error: {name} is not a valid tool.",
+                tool_call_id=tool_call["id"],
+                name=name,
+                status="error",
+            )
+        try:
+            with tracing.span(f"tool.{name}"):
+                ctx = contextvars.copy_context()
+                return await loop.run_in_executor(
+                    _TOOL_EXECUTOR, ctx.run, selected.invoke, {
+                        **tool_call, "type": "tool_call"
+                    }, config)
+        except Exception as e:
+            return ToolMessage(
+                content=f"Error running {name}: {str(e)}",
+                tool_call_id=tool_call["id"],
+                name=name,
+                status="error",
+            )
+
+    tasks: list[asyncio.Task] = []
+    for i, tool_call in enumerate(tool_calls):
+        depends_on = [
+            tasks[j] for j in range(i) if _conflicts(access[j], access[i])
+        ]
+        tasks.append(asyncio.create_task(run_one(tool_call, depends_on)))
+    return list(await asyncio.gather(*tasks))
@@ -0,0 +1,14 @@
+"""The server's metrics, on the shared primitives in spartan_shared.metrics.
+
+The metric types and `render` are re-exported so modules keep using
+`from . import metrics`; each module defines its own series next to the
+code it measures.
+"""
+from spartan_shared.metrics import (DEFAULT_BUCKETS, Collector, Counter,
+                                    Gauge, Histogram, render, timed,
+                                    timed_call)
+
+__all__ = [
+    "DEFAULT_BUCKETS", "Collector", "Counter", "Gauge", "Histogram",
+    "render", "timed", "timed_call"
+]
@@ -0,0 +1,80 @@
+"""Provider-side prompt caching helpers and hit-rate tracking.
+
+The system prompt and tool schemas form a static prefix that is identical on
+every request. Providers with automatic prefix caching (OpenAI, DeepSeek, ...)
+reuse it as long as it stays byte-stable; providers that need explicit hints
+(Anthropic, Gemini via OpenRouter) get a `cache_control` breakpoint on the
+system block, which caches the tool definitions ahead of it as well.
+"""
+import threading
+from dataclasses import asdict, dataclass
+
+from langchain_core.messages import AIMessage, SystemMessage
+
+# Model id prefixes (OpenRouter naming) that honour `cache_control` blocks.
+_CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "google/gemini")
+
+
+@dataclass
+class PromptCacheStats:
+    requests: int = 0
+    requests_with_cache_hit: int = 0
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+
+_lock = threading.Lock()
+_stats: dict[str, PromptCacheStats] = {}
+
+
+def supports_cache_control(model: str | None) -> bool:
+    if not model:
+        return False
+    model = model.lower()
+    return model.startswith(_CACHE_CONTROL_MODEL_PREFIXES) or "claude" in model
+
+
+def build_system_message(prompt: str, model: str | None) -> SystemMessage:
+    """Return the static system message, with a cache breakpoint if supported."""
+    if supports_cache_control(model):
+        return SystemMessage(content=[{
+            "type": "text",
+            "text": prompt,
+            "cache_control": {
+                "type": "ephemeral"
+            },
+        }])
+    return SystemMessage(content=prompt)
+
+
+def record(model: str | None, message: AIMessage) -> None:
+    """Accumulate cache usage reported on a model response."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    cache_read = details.get("cache_read") or 0
+    cache_write = details.get("cache_creation") or 0
+    with _lock:
+        stats = _stats.setdefault(model or "unknown", PromptCacheStats())
+        stats.requests += 1
+        stats.input_tokens += usage.get("input_tokens") or 0
+        stats.cache_read_tokens += cache_read
+        stats.cache_write_tokens += cache_write
+        if cache_read:
+            stats.requests_with_cache_hit += 1
+
+
+def snapshot() -> dict[str, dict]:
+    """Return per-model cache counters and hit rates."""
+    with _lock:
+        out = {}
+        for model, stats in _stats.items():
+            data = asdict(stats)
+            data["request_hit_rate"] = (stats.requests_with_cache_hit /
+                                        stats.requests if stats.requests else
+                                        0.0)
+            data["token_hit_rate"] = (stats.cache_read_tokens /
+                                      stats.input_tokens
+                                      if stats.input_tokens else 0.0)
+            out[model] = data
+        return out
@@ -0,0 +1,63 @@
+"""Per-user token-bucket rate limiting.
+
+Buckets live in process memory, or in the shared SQLite store when several
+workers serve requests so a user cannot multiply their allowance by the
+worker count.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from .shared_state import get_shared_store
+
+
+class RateLimiter:
+    """Allow `capacity` requests in a burst, refilled at `rate` per second."""
+
+    def __init__(self,
+                 namespace: str,
+                 capacity: float,
+                 rate: float,
+                 max_keys: int = 10_000):
+        self.namespace = namespace
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def _take(self, bucket: tuple[float, float] | None,
+              now: float) -> tuple[tuple[float, float], float]:
+        """Return the updated (tokens, timestamp) and the retry-after delay."""
+        tokens, updated = bucket if bucket else (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            return (tokens - 1, now), 0.0
+        return (tokens, now), (1 - tokens) / self.rate
+
+    async def acquire(self, key: str) -> float:
+        """Take a token for `key`; return 0 if allowed, else seconds to wait."""
+        now = time.time()
+        shared = get_shared_store()
+        if shared is not None:
+            retry_after = 0.0
+
+            def update(current):
+                nonlocal retry_after
+                bucket, retry_after = self._take(
+                    tuple(current) if current else None, now)
+                return list(bucket)
+
+            await shared.aupdate(self.namespace,
+                                 key,
+                                 update,
+                                 ttl=self.capacity / self.rate)
+            return retry_after
+
+        with self._lock:
+            bucket, retry_after = self._take(self._buckets.get(key), now)
+            self._buckets[key] = bucket
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
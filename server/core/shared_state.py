@@ -0,0 +1,187 @@
+"""State shared between server worker processes.
+
+With a single worker everything stays in process memory. When several
+workers serve the same port (SPARTAN_SERVER_WORKERS > 1) or SPARTAN_STATE_DIR
+is set, caches live in a SQLite file under that directory so any worker can
+pick up any request. Thread checkpoints go to SQLite only with several
+workers; see `open_checkpointer`.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from platformdirs import user_state_path
+
+STATE_DIR_ENV = "SPARTAN_STATE_DIR"
+WORKERS_ENV = "SPARTAN_SERVER_WORKERS"
+
+
+def worker_count() -> int:
+    try:
+        return max(1, int(os.getenv(WORKERS_ENV, "1")))
+    except ValueError:
+        return 1
+
+
+def default_state_dir() -> Path:
+    return user_state_path(appname="spartan-write-server")
+
+
+def state_dir() -> Path | None:
+    """Return the shared state directory, or None for in-process state."""
+    configured = os.getenv(STATE_DIR_ENV)
+    if configured:
+        return Path(configured)
+    if worker_count() > 1:
+        return default_state_dir()
+    return None
+
+
+class SharedStore:
+    """Small JSON key-value store with per-entry expiry, backed by SQLite.
+
+    Safe to use from several threads and processes; each thread keeps its own
+    connection and the database runs in WAL mode. Calls block, for up to the
+    busy timeout while another worker holds the write lock, so request
+    handlers use the `a`-prefixed variants, which run them in a thread.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    PRIMARY KEY (namespace, key)
+                )""")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM entries "
+            "WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(namespace, key)
+            return None
+        return json.loads(value)
+
+    def set(self,
+            namespace: str,
+            key: str,
+            value: Any,
+            ttl: float | None = None) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), expires_at))
+
+    def update(self,
+               namespace: str,
+               key: str,
+               fn: Callable[[Any | None], Any],
+               ttl: float | None = None) -> Any:
+        """Atomically replace the value for `key` with `fn(current)`."""
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT value, expires_at FROM entries "
+                "WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+            current = None
+            if row is not None and (row[1] is None or row[1] > time.time()):
+                current = json.loads(row[0])
+            value = fn(current)
+            expires_at = time.time() + ttl if ttl is not None else None
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                         (namespace, key, json.dumps(value), expires_at))
+        return value
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?",
+                         (namespace, key))
+
+    async def aget(self, namespace: str, key: str) -> Any | None:
+        return await asyncio.to_thread(self.get, namespace, key)
+
+    async def aset(self,
+                   namespace: str,
+                   key: str,
+                   value: Any,
+                   ttl: float | None = None) -> None:
+        await asyncio.to_thread(self.set, namespace, key, value, ttl)
+
+    async def aupdate(self,
+                      namespace: str,
+                      key: str,
+                      fn: Callable[[Any | None], Any],
+                      ttl: float | None = None) -> Any:
+        return await asyncio.to_thread(self.update, namespace, key, fn, ttl)
+
+    async def adelete(self, namespace: str, key: str) -> None:
+        await asyncio.to_thread(self.delete, namespace, key)
+
+    def purge_expired(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?",
+                         (time.time(), ))
+
+
+@lru_cache(maxsize=1)
+def get_shared_store() -> SharedStore | None:
+    """Return the cross-process store, or None when state is in-process."""
+    directory = state_dir()
+    if directory is None:
+        return None
+    return SharedStore(directory / "shared.sqlite3")
+
+
+@asynccontextmanager
+async def open_checkpointer() -> AsyncIterator[BaseCheckpointSaver | None]:
+    """Yield a checkpointer shared by all workers, or None for in-memory.
+
+    Only with several workers. A single worker keeps a fresh in-memory
+    checkpointer per request, so each run starts from the messages the
+    client sends. With shared checkpoints a thread's state persists across
+    requests instead, and a run resumes from what is stored for the thread.
+    That is what lets an interrupted run resume on another worker.
+
+    Requires the langgraph-checkpoint-sqlite package.
+    """
+    directory = state_dir()
+    if directory is None or worker_count() == 1:
+        yield None
+        return
+
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    directory.mkdir(parents=True, exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(
+            str(directory / "checkpoints.sqlite3")) as saver:
+        await saver.setup()
+        yield saver
@@ -0,0 +1,102 @@
+"""Project snapshots pinned to a conversation thread.
+
+A snapshot is a compact text view of the project as it was when the thread
+started: the file tree, main.tex, the outline and the last compile's
+diagnostics. It goes to the model as a second system message right after the
+static prompt, so the agent can skip its opening list/read round-trips.
+
+The first snapshot seen for a thread is pinned and reused on every later turn,
+keeping that message byte-identical so providers cache it with the prefix.
+The CopilotKit frontend builds snapshots through the sidecar and forwards them
+as `project_snapshot` with a thread's first run only; the local /chat path
+builds one here with spartan_shared.snapshot, as the sidecar does. Snapshots
+are off unless SPARTAN_PROJECT_SNAPSHOT=1.
+"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from langchain_core.messages import SystemMessage
+
+from spartan_shared import snapshot as shared_snapshot
+
+from . import prompt_cache, tracing
+from .shared_state import get_shared_store
+
+ENABLE_ENV = "SPARTAN_PROJECT_SNAPSHOT"
+# Cap on a forwarded snapshot; the parts have their own budgets in
+# spartan_shared.snapshot.
+MAX_SNAPSHOT_BYTES = 48 * 1024
+PIN_CACHE_SIZE = 1024
+PIN_TTL = 24 * 60 * 60
+
+_NAMESPACE = "project-snapshot"
+
+SNAPSHOT_HEADER = (
+    "# Project snapshot\n"
+    "The project as it was when this conversation started. Use it instead of"
+    " listing files or reading main.tex again; files may have changed since,"
+    " so re-read a file before editing it.")
+
+_pinned: OrderedDict[str, str] = OrderedDict()
+_pinned_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.getenv(ENABLE_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+@tracing.traced("build_snapshot")
+def build_snapshot(root: Path) -> str | None:
+    """Snapshot a project on this machine, or None if it cannot be read."""
+    # pdflatex and latexmk leave main.log behind; tectonic keeps none.
+    log = root / "main.log"
+    last_compile = None
+    try:
+        if log.is_file():
+            last_compile = shared_snapshot.diagnostics(log.read_text(
+                errors="replace")) or "Succeeded without warnings."
+        return shared_snapshot.build_snapshot(root, last_compile)
+    except OSError:
+        return None
+
+
+async def pin(thread_id: str | None, snapshot: str | None) -> str | None:
+    """Return the snapshot pinned to a thread, pinning `snapshot` if none is."""
+    if not enabled():
+        return None
+    if not thread_id:
+        return snapshot
+    with _pinned_lock:
+        pinned = _pinned.get(thread_id)
+        if pinned is not None:
+            _pinned.move_to_end(thread_id)
+            return pinned
+
+    shared = get_shared_store()
+    if shared is not None:
+        pinned = await shared.aget(_NAMESPACE, thread_id)
+    if pinned is None:
+        if not snapshot:
+            return None
+        pinned = shared_snapshot.clip(snapshot, MAX_SNAPSHOT_BYTES)
+        if shared is not None:
+            # First writer wins, so concurrent workers agree on one snapshot.
+            pinned = await shared.aupdate(_NAMESPACE,
+                                          thread_id,
+                                          lambda current: current or pinned,
+                                          ttl=PIN_TTL)
+
+    with _pinned_lock:
+        _pinned[thread_id] = pinned
+        _pinned.move_to_end(thread_id)
+        while len(_pinned) > PIN_CACHE_SIZE:
+            _pinned.popitem(last=False)
+    return pinned
+
+
+def snapshot_message(snapshot: str, model: str | None) -> SystemMessage:
+    """Wrap a snapshot as a system message with its own cache breakpoint."""
+    return prompt_cache.build_system_message(
+        f"{SNAPSHOT_HEADER}\n\n{snapshot}", model)
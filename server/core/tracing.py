@@ -0,0 +1,177 @@
+"""Lightweight request tracing.
+
+Spans follow the OpenTelemetry data model (trace and span ids, parent, start
+and end in unix nanoseconds, attributes, status) without pulling in the SDK.
+The current span lives in a ContextVar, so nesting works across awaits and in
+executor threads that run under a copied context.
+
+Every finished span is observed in a per-phase latency histogram served on
+/metrics. Set SPARTAN_TRACE_EXPORT to "console" or "file:<path>" to also
+write spans as JSON lines.
+"""
+import functools
+import inspect
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, TextIO, TypeVar
+
+from . import metrics
+
+TRACE_EXPORT_ENV = "SPARTAN_TRACE_EXPORT"
+
+PHASE_SECONDS = metrics.Histogram(
+    "spartan_phase_duration_seconds",
+    "Duration of traced request phases (auth, graph build, model, tools, compile).",
+)
+PHASE_ERRORS = metrics.Counter(
+    "spartan_phase_errors_total",
+    "Traced phases that ended with an exception.",
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    start_time_unix_nano: int
+    end_time_unix_nano: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "OK"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+_current_span: ContextVar[Span | None] = ContextVar("spartan_current_span",
+                                                    default=None)
+
+
+class _JsonLinesExporter:
+
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+
+_exporter: _JsonLinesExporter | None = None
+_exporter_configured = False
+_exporter_lock = threading.Lock()
+
+
+def configure_exporter(target: str | None) -> None:
+    """Select where finished spans go: None, "console" or "file:<path>"."""
+    global _exporter, _exporter_configured
+    with _exporter_lock:
+        if not target:
+            _exporter = None
+        elif target == "console":
+            _exporter = _JsonLinesExporter(sys.stderr)
+        elif target.startswith("file:"):
+            path = target.removeprefix("file:")
+            _exporter = _JsonLinesExporter(
+                open(path, "a", encoding="utf-8", buffering=1))
+        else:
+            raise ValueError(f"Unsupported {TRACE_EXPORT_ENV} value: {target!r}")
+        _exporter_configured = True
+
+
+def set_exporter(exporter: Any) -> None:
+    """Send finished spans to any object with an `export(span)` method."""
+    global _exporter, _exporter_configured
+    with _exporter_lock:
+        _exporter = exporter
+        _exporter_configured = True
+
+
+def _get_exporter() -> _JsonLinesExporter | None:
+    if not _exporter_configured:
+        configure_exporter(os.getenv(TRACE_EXPORT_ENV))
+    return _exporter
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time a block as a child of the current span (or as a new trace)."""
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_span_id=parent.span_id if parent else None,
+        start_time_unix_nano=time.time_ns(),
+        attributes=attributes,
+    )
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = "ERROR"
+        current.set_attribute("exception.type", type(exc).__name__)
+        PHASE_ERRORS.inc(phase=name)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        current.end_time_unix_nano = current.start_time_unix_nano + int(
+            duration * 1e9)
+        _current_span.reset(token)
+        PHASE_SECONDS.observe(duration, phase=name)
+        exporter = _get_exporter()
+        if exporter is not None:
+            exporter.export(current)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator form of `span` for sync and async functions."""
+
+    def decorator(fn: F) -> F:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,144 @@
+"""Async TTL cache with single-flight fetches and stale-while-revalidate."""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+from .shared_state import SharedStore, get_shared_store
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    fetch_errors: int = 0
+
+
+class AsyncTTLCache:
+    """Cache results of async fetches per key.
+
+    - Within `ttl` seconds a cached value is returned as-is.
+    - Up to `stale_ttl` seconds after that, the stale value is returned
+      immediately and one background refresh is started.
+    - Concurrent misses for the same key share a single fetch.
+
+    Failed fetches are not cached. When workers share state, entries are
+    also read from and written to the shared store under `namespace`.
+    """
+
+    def __init__(self,
+                 namespace: str,
+                 ttl: float,
+                 stale_ttl: float = 0.0,
+                 max_entries: int = 1024):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    def _shared(self) -> SharedStore | None:
+        return get_shared_store()
+
+    async def _lookup(self, key: Hashable) -> tuple[Any, float] | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif (shared := self._shared()) is not None:
+            stored = await shared.aget(self.namespace, json.dumps(key))
+            if stored is not None:
+                entry = (stored["value"], stored["fetched_at"])
+                self._store_local(key, entry)
+        return entry
+
+    def _store_local(self, key: Hashable, entry: tuple[Any, float]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _store(self, key: Hashable, value: Any) -> None:
+        entry = (value, time.time())
+        self._store_local(key, entry)
+        if (shared := self._shared()) is not None:
+            await shared.aset(self.namespace,
+                              json.dumps(key), {
+                                  "value": value,
+                                  "fetched_at": entry[1]
+                              },
+                              ttl=self.ttl + self.stale_ttl)
+
+    def _start_fetch(self, key: Hashable,
+                     fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            return task
+
+        async def run():
+            try:
+                value = await fetch()
+                await self._store(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.get_running_loop().create_task(run())
+        task.add_done_callback(self._on_fetch_done)
+        self._inflight[key] = task
+        return task
+
+    def _on_fetch_done(self, task: asyncio.Task) -> None:
+        # Also marks the exception retrieved when nobody awaits the task.
+        if not task.cancelled() and task.exception() is not None:
+            self.stats.fetch_errors += 1
+
+    async def peek(self, key: Hashable) -> Any | None:
+        """Return a fresh or stale cached value without fetching."""
+        entry = await self._lookup(key)
+        if entry is None:
+            return None
+        value, fetched_at = entry
+        if time.time() - fetched_at >= self.ttl + self.stale_ttl:
+            return None
+        return value
+
+    def is_fresh(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and time.time() - entry[1] < self.ttl
+
+    def refresh(self, key: Hashable, fetch: Callable[[],
+                                                     Awaitable[Any]]) -> None:
+        """Start a background fetch for `key` unless one is running."""
+        self._start_fetch(key, fetch)
+
+    async def get(self, key: Hashable, fetch: Callable[[],
+                                                       Awaitable[Any]]) -> Any:
+        entry = await self._lookup(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                self.stats.hits += 1
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stats.stale_hits += 1
+                self.refresh(key, fetch)
+                return value
+
+        if key in self._inflight:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+        # Shield so one cancelled waiter does not cancel the shared fetch.
+        return await asyncio.shield(self._start_fetch(key, fetch))
+
+    async def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+        if (shared := self._shared()) is not None:
+            await shared.adelete(self.namespace, json.dumps(key))
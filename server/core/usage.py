@@ -1,4 +1,5 @@
 import json
+import math
 import os
 from datetime import date, datetime, timezone
 
@@ -8,6 +9,8 @@ from pydantic import BaseModel
 from workos.types.user_management import User
 
 from .models import AgentCreds
+from .rate_limit import RateLimiter
+from .ttl_cache import AsyncTTLCache
 
 CREDS = {
     'openai_api_key': os.getenv("OPENAI_API_KEY"),
@@ -19,6 +22,61 @@ DEFAULT_POSTHOG_USAGE_URL = (
     "https://us.posthog.com/api/environments/341888/endpoints/"
     "fetch-usage-info-for-user/run")
 
+# Usage dashboards poll the same (user, window) repeatedly; serve those from
+# memory and refresh in the background once an entry goes stale.
+USAGE_CACHE = AsyncTTLCache(
+    "usage-info",
+    ttl=float(os.getenv("USAGE_CACHE_TTL_SECONDS", "60")),
+    stale_ttl=float(os.getenv("USAGE_CACHE_STALE_SECONDS", "600")),
+)
+
+_http_client: httpx.AsyncClient | None = None
+
+# User turns per user: a burst of RATE_LIMIT_BURST, refilled at
+# RATE_LIMIT_PER_MINUTE. Keeps one user from saturating the shared model key.
+RATE_LIMITER = RateLimiter(
+    "rate-limit",
+    capacity=float(os.getenv("RATE_LIMIT_BURST", "30")),
+    rate=float(os.getenv("RATE_LIMIT_PER_MINUTE", "30")) / 60,
+)
+# Runs that continue an admitted turn (frontend tool results, interrupt
+# resumes) draw on a much larger bucket, so a long agent task is not cut off
+# mid-turn but continuations cannot stand in for unlimited new turns.
+CONTINUATION_LIMITER = RateLimiter(
+    "rate-limit-continuation",
+    capacity=float(os.getenv("RATE_LIMIT_CONTINUATION_BURST", "300")),
+    rate=float(os.getenv("RATE_LIMIT_CONTINUATION_PER_MINUTE", "300")) / 60,
+)
+
+
+def _parse_cost_limit(raw: str | None) -> float | None:
+    if not raw:
+        return None
+    try:
+        limit = float(raw)
+    except ValueError:
+        limit = math.nan
+    if not math.isfinite(limit) or limit <= 0:
+        raise ValueError(
+            f"DAILY_COST_LIMIT_USD must be a positive number, got {raw!r}")
+    return limit
+
+
+# Optional spend cap in USD, checked against cached usage data. Validated
+# here so a bad value fails startup rather than every agent run.
+DAILY_COST_LIMIT = _parse_cost_limit(os.getenv("DAILY_COST_LIMIT_USD"))
+# PostHog's n_days_window=1: spend in the 24 hours before the query.
+QUOTA_WINDOW_DAYS = 1
+
+
+class UsageLimitError(Exception):
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+        self.status_code = 429
+
 
 class UsageInfoRequest(BaseModel):
     user_id: str
@@ -74,25 +132,29 @@ def _reshape_posthog_usage_rows(body: dict) -> list[dict]:
     return out
 
 
-router = APIRouter()
+def _get_http_client() -> httpx.AsyncClient:
+    """Return a shared client so repeated PostHog calls reuse connections."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=60.0)
+    return _http_client
 
 
-@router.post("/usage-info")
-async def usage_info(request: UsageInfoRequest):
-    api_key = os.getenv("POSTHOG_READ_API_KEY_USER_USAGE_INFO")
-    if not api_key:
-        raise HTTPException(
-            status_code=503,
-            detail="POSTHOG_READ_API_KEY_USER_USAGE_INFO is not configured",
-        )
+def _usage_user_id(email: str) -> str:
+    """The id usage is tracked under: the email, lower-cased as analytics sends it.
+
+    /usage-info and the daily quota key the usage cache on it, so both share
+    one entry per user whatever the casing they were given.
+    """
+    return email.strip().lower()
 
-    raw = request.n_days_window if request.n_days_window is not None else 30
-    n_days = _effective_n_days_window(raw)
 
+async def _fetch_usage_rows(user_id: str, n_days: int) -> list[dict]:
+    api_key = os.getenv("POSTHOG_READ_API_KEY_USER_USAGE_INFO")
     url = os.getenv("POSTHOG_USAGE_ENDPOINT_URL", DEFAULT_POSTHOG_USAGE_URL)
     payload = {
         "variables": {
-            "user_id": request.user_id,
+            "user_id": user_id,
             "n_days_window": n_days,
         }
     }
@@ -102,8 +164,7 @@ async def usage_info(request: UsageInfoRequest):
     }
 
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            resp = await client.post(url, json=payload, headers=headers)
+        resp = await _get_http_client().post(url, json=payload, headers=headers)
     except httpx.RequestError as e:
         raise HTTPException(
             status_code=502,
@@ -122,15 +183,78 @@ async def usage_info(request: UsageInfoRequest):
     except Exception:
         data = {"raw": resp.text}
 
-    rows = _reshape_posthog_usage_rows(data) if isinstance(data, dict) else []
+    return _reshape_posthog_usage_rows(data) if isinstance(data, dict) else []
+
+
+router = APIRouter()
+
+
+@router.post("/usage-info")
+async def usage_info(request: UsageInfoRequest):
+    if not os.getenv("POSTHOG_READ_API_KEY_USER_USAGE_INFO"):
+        raise HTTPException(
+            status_code=503,
+            detail="POSTHOG_READ_API_KEY_USER_USAGE_INFO is not configured",
+        )
+
+    raw = request.n_days_window if request.n_days_window is not None else 30
+    n_days = _effective_n_days_window(raw)
+
+    user_id = _usage_user_id(request.user_id)
+    rows = await USAGE_CACHE.get((user_id, n_days),
+                                 lambda: _fetch_usage_rows(user_id, n_days))
     return {"success": True, "data": {"data": rows}}
 
 
-def validate_and_fetch_creds(user: User, thread_id: str):
+async def _check_daily_quota(user_id: str) -> None:
+    """Reject once the cost over the last QUOTA_WINDOW_DAYS reaches the cap.
+
+    Only cached usage is consulted so the check never waits on PostHog; a
+    missing or stale entry triggers a background refresh for later requests.
+    The window is rolling, so spend drops out of it as it ages; the earliest
+    a retry can pass is when the cached usage is next refreshed.
+    """
+    if DAILY_COST_LIMIT is None or not os.getenv(
+            "POSTHOG_READ_API_KEY_USER_USAGE_INFO"):
+        return
+    key = (user_id, QUOTA_WINDOW_DAYS)
+    rows = await USAGE_CACHE.peek(key)
+    if rows is None or not USAGE_CACHE.is_fresh(key):
+        USAGE_CACHE.refresh(
+            key, lambda: _fetch_usage_rows(user_id, QUOTA_WINDOW_DAYS))
+    if rows is None:
+        return
+    spent = sum(row["total_cost"] for row in rows)
+    if spent >= DAILY_COST_LIMIT:
+        raise UsageLimitError(
+            f"Usage limit of ${DAILY_COST_LIMIT:.2f} per 24 hours reached. "
+            "Try again later.",
+            retry_after=USAGE_CACHE.ttl,
+        )
+
+
+async def validate_and_fetch_creds(user: User,
+                                   thread_id: str,
+                                   new_turn: bool = True):
+    """Check limits for an agent run and return the credentials to use.
+
+    Only a run that starts a user turn takes a turn token and is checked
+    against the quota; a run continuing that turn is only held to the
+    continuation bucket, so a turn that was admitted can finish.
+    """
     if not user:
         raise ValueError("User is required to fetch credentials")
 
-    # TODO: Check usage limits for the user
+    user_id = _usage_user_id(user.email)
+    limiter = RATE_LIMITER if new_turn else CONTINUATION_LIMITER
+    retry_after = await limiter.acquire(user_id)
+    if retry_after > 0:
+        raise UsageLimitError(
+            "Too many requests. Please slow down.",
+            retry_after=retry_after,
+        )
+    if new_turn:
+        await _check_daily_quota(user_id)
 
     return AgentCreds(
         **CREDS,
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from core import analytics
+from core.analytics import AnalyticsPipeline, MemorySink
+from core.models import AgentCreds
+
+
+class BatchRecordingSink(MemorySink):
+
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes: list[int] = []
+
+    def send(self, events):
+        self.batch_sizes.append(len(events))
+        super().send(events)
+
+
+class BlockingSink(MemorySink):
+    """Holds the worker inside `send` until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def send(self, events):
+        self.entered.set()
+        self.release.wait(5)
+        super().send(events)
+
+
+class FailingSink:
+
+    def send(self, events):
+        raise ConnectionError("sink unavailable")
+
+
+def wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            pytest.fail("condition not met in time")
+        time.sleep(0.005)
+
+
+def event(i: int) -> tuple[str, dict]:
+    return "capture", {"event": "$ai_generation", "distinct_id": f"u{i}"}
+
+
+def test_events_are_sent_in_batches():
+    sink = BatchRecordingSink()
+    pipeline = AnalyticsPipeline(sink, batch_size=10, flush_interval=0.5)
+    try:
+        for i in range(25):
+            assert pipeline.enqueue(*event(i))
+        wait_for(lambda: pipeline.stats()["sent"] == 25)
+    finally:
+        pipeline.close()
+    assert sink.batch_sizes == [10, 10, 5]
+    assert sink.events == [event(i) for i in range(25)]
+    stats = pipeline.stats()
+    assert stats["enqueued"] == 25
+    assert stats["batches"] == 3
+    assert stats["dropped"] == 0
+
+
+def test_full_queue_drops_and_counts_instead_of_blocking():
+    sink = BlockingSink()
+    pipeline = AnalyticsPipeline(sink,
+                                 queue_size=5,
+                                 batch_size=1,
+                                 flush_interval=0.01)
+    try:
+        pipeline.enqueue(*event(0))
+        assert sink.entered.wait(5)  # the worker holds event 0 in send
+        accepted = [pipeline.enqueue(*event(i)) for i in range(1, 9)]
+        stats = pipeline.stats()
+    finally:
+        sink.release.set()
+        pipeline.close()
+
+    assert accepted == [True] * 5 + [False] * 3
+    assert stats["dropped"] == 3
+    assert stats["enqueued"] == 6
+    assert stats["queue_depth"] == 5
+    assert stats["queue_high_water"] == 5
+    assert len(sink.events) == 6
+
+
+def test_close_flushes_queued_events_without_waiting_for_the_interval():
+    sink = MemorySink()
+    pipeline = AnalyticsPipeline(sink, batch_size=100, flush_interval=30)
+    for i in range(3):
+        pipeline.enqueue(*event(i))
+    started = time.monotonic()
+    pipeline.close()
+    assert time.monotonic() - started < 2
+    assert sink.events == [event(i) for i in range(3)]
+    assert pipeline.stats()["sent"] == 3
+
+
+def test_sink_errors_are_counted_and_do_not_stop_the_worker():
+    pipeline = AnalyticsPipeline(FailingSink(),
+                                 batch_size=2,
+                                 flush_interval=0.01)
+    try:
+        for i in range(4):
+            pipeline.enqueue(*event(i))
+        wait_for(lambda: pipeline.stats()["failed"] == 4)
+    finally:
+        pipeline.close()
+    assert pipeline.stats()["sent"] == 0
+
+
+def test_each_call_gets_its_own_handler_on_the_shared_queue():
+    sink = MemorySink()
+    analytics.configure_pipeline(sink)
+    try:
+        creds = AgentCreds(openai_api_key="key",
+                           openai_api_base="http://localhost",
+                           openai_api_model="gpt-4o",
+                           user_email="Ada@Example.com",
+                           thread_id="thread-1")
+        first = analytics.handle_callback(creds)
+        second = analytics.handle_callback(creds)
+        assert first is not second
+        assert first._ph_client is second._ph_client
+        assert first._distinct_id == "ada@example.com"
+
+        first._ph_client.capture(event="$ai_trace", distinct_id="ada")
+        analytics.pipeline.close()
+        assert sink.events == [("capture", {
+            "event": "$ai_trace",
+            "distinct_id": "ada"
+        })]
+    finally:
+        analytics.configure_pipeline(analytics.PosthogSink(analytics.posthog))
@@ -0,0 +1,49 @@
+import os
+
+from core.local_tools import create_local_tools
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+def attach(tmp_path):
+    """An upload as the sidecar stores it: a hardlink to a shared blob."""
+    runtime = tmp_path / "runtime"
+    (runtime / "images").mkdir(parents=True)
+    blob = runtime / "images" / "blob"
+    blob.write_bytes(PNG)
+    upload = runtime / f"{'0' * 32}-plot.png"
+    os.link(blob, upload)
+    project = tmp_path / "project"
+    project.mkdir()
+    return blob, upload, project
+
+
+def move_tool(project, upload):
+    tools = create_local_tools(project, str(upload))
+    return next(t for t in tools
+                if t.name == "move_attached_image_to_project_tool")
+
+
+def test_moving_the_attachment_copies_out_of_the_blob(tmp_path):
+    blob, upload, project = attach(tmp_path)
+
+    result = move_tool(project, upload).invoke({})
+
+    assert result == "Moved attached image to 'figures/plot.png'."
+    figure = project / "figures" / "plot.png"
+    assert not upload.exists()
+    assert blob.stat().st_nlink == 1
+    assert not os.path.samefile(figure, blob)
+    figure.write_bytes(b"edited")
+    assert blob.read_bytes() == PNG
+
+
+def test_an_identical_figure_is_reused(tmp_path):
+    _, upload, project = attach(tmp_path)
+    (project / "figures").mkdir()
+    (project / "figures" / "existing.png").write_bytes(PNG)
+
+    result = move_tool(project, upload).invoke({})
+
+    assert result == "Moved attached image to 'figures/existing.png'."
+    assert os.listdir(project / "figures") == ["existing.png"]
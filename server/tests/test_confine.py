@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import pytest
+
+from spartan_shared import confine
+from spartan_shared.confine import resolve_under_root
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    (root / "figures").mkdir(parents=True)
+    (root / "figures" / "a.png").write_bytes(b"png")
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    confine._plain_dirs.clear()
+    return root, outside
+
+
+@pytest.mark.parametrize("relative", ["../x", "/etc/passwd", "a/../../x"])
+def test_lexical_escapes_are_rejected(project, relative):
+    root, _ = project
+    with pytest.raises(ValueError, match="escapes project root"):
+        resolve_under_root(root, relative)
+
+
+def test_symlink_out_of_the_project_is_rejected(project):
+    root, outside = project
+    os.symlink(outside, root / "link")
+    with pytest.raises(ValueError):
+        resolve_under_root(root, "link/x.tex")
+
+
+def swap_for_symlink(root, outside):
+    shutil.rmtree(root / "figures")
+    os.symlink(outside, root / "figures")
+
+
+def test_write_checks_ignore_directories_trusted_by_reads(project):
+    root, outside = project
+    assert resolve_under_root(root, "figures/a.png").parent.name == "figures"
+    swap_for_symlink(root, outside)
+
+    with pytest.raises(ValueError):
+        resolve_under_root(root, "figures/a.png", for_write=True)
+
+
+def test_reads_trust_plain_directories_until_the_ttl(project, monkeypatch):
+    root, outside = project
+    resolve_under_root(root, "figures/a.png")
+    swap_for_symlink(root, outside)
+
+    # The documented weakening: within DIR_CACHE_TTL a read passes once.
+    assert resolve_under_root(root, "figures/a.png") == (root.resolve() /
+                                                         "figures" / "a.png")
+    real_monotonic = confine.time.monotonic
+    monkeypatch.setattr(confine.time, "monotonic",
+                        lambda: real_monotonic() + confine.DIR_CACHE_TTL + 1)
+    with pytest.raises(ValueError):
+        resolve_under_root(root, "figures/a.png")
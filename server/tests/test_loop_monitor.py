@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from spartan_shared import loop_monitor
+from spartan_shared.metrics import Counter
+
+app = FastAPI()
+
+
+@app.get("/blocking")
+async def blocking():
+    time.sleep(0.3)
+    return {}
+
+
+@app.get("/awaiting")
+async def awaiting():
+    await asyncio.sleep(0.3)
+    return {}
+
+
+@pytest.fixture(autouse=True)
+def monitor_on(monkeypatch):
+    monkeypatch.setenv(loop_monitor.ENABLE_ENV, "1")
+    monkeypatch.setenv(loop_monitor.THRESHOLD_ENV, "50")
+
+
+def run_with_monitor(path: str) -> tuple[list[dict], Counter]:
+    blocks = Counter("test_loop_blocks_total", "Blocks seen by the test.")
+
+    async def run():
+        async with loop_monitor.monitor_from_env(app, blocks) as monitor:
+            # Let the heartbeat settle before the request.
+            await asyncio.sleep(0.05)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport,
+                                         base_url="http://test") as client:
+                response = await client.get(path)
+            assert response.status_code == 200
+            await asyncio.sleep(0.05)
+            return monitor.reports()
+
+    return asyncio.run(run()), blocks
+
+
+def test_sleep_in_a_coroutine_is_reported():
+    reports, blocks = run_with_monitor("/blocking")
+
+    assert [r["route"] for r in reports] == ["GET /blocking"]
+    assert reports[0]["duration"] >= 0.05
+    assert any("time.sleep" in line for line in reports[0]["stack"])
+    assert list(blocks.samples()) == [
+        'test_loop_blocks_total{route="GET /blocking"} 1.0'
+    ]
+
+
+def test_awaiting_is_not_reported():
+    reports, blocks = run_with_monitor("/awaiting")
+
+    assert reports == []
+    assert list(blocks.samples()) == []
+
+
+def test_monitor_is_off_without_the_flag(monkeypatch):
+    monkeypatch.delenv(loop_monitor.ENABLE_ENV)
+
+    async def run():
+        async with loop_monitor.monitor_from_env(app) as monitor:
+            return monitor
+
+    assert asyncio.run(run()) is None
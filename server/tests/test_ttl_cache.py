@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from core import ttl_cache
+from core.ttl_cache import AsyncTTLCache
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StubFetcher:
+    """Counts calls; each returns the next value, or raises once `fail` is set."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return {"call": self.calls}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ttl_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def in_process_state(monkeypatch):
+    monkeypatch.setattr(ttl_cache, "get_shared_store", lambda: None)
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = AsyncTTLCache("test", ttl=60)
+    fetch = StubFetcher(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*(cache.get("k", fetch) for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert fetch.calls == 1
+    assert results == [{"call": 1}] * 20
+    assert cache.stats.misses == 1
+    assert cache.stats.coalesced == 19
+
+
+def test_fresh_entry_is_served_until_ttl(clock):
+    cache = AsyncTTLCache("test", ttl=60)
+    fetch = StubFetcher()
+
+    async def run():
+        first = await cache.get("k", fetch)
+        clock.now += 59
+        cached = await cache.get("k", fetch)
+        clock.now += 2
+        refetched = await cache.get("k", fetch)
+        return first, cached, refetched
+
+    assert asyncio.run(run()) == ({"call": 1}, {"call": 1}, {"call": 2})
+    assert fetch.calls == 2
+    assert cache.stats.hits == 1
+
+
+def test_stale_entry_is_returned_while_refreshing(clock):
+    cache = AsyncTTLCache("test", ttl=60, stale_ttl=600)
+    fetch = StubFetcher(delay=0.01)
+
+    async def run():
+        await cache.get("k", fetch)
+        clock.now += 120
+        stale = await cache.get("k", fetch)
+        # A second stale read does not start another refresh.
+        again = await cache.get("k", fetch)
+        await asyncio.sleep(0.05)
+        refreshed = await cache.get("k", fetch)
+        return stale, again, refreshed
+
+    stale, again, refreshed = asyncio.run(run())
+    assert stale == again == {"call": 1}
+    assert refreshed == {"call": 2}
+    assert fetch.calls == 2
+    assert cache.stats.stale_hits == 2
+
+
+def test_entry_past_stale_window_is_fetched_inline(clock):
+    cache = AsyncTTLCache("test", ttl=60, stale_ttl=600)
+    fetch = StubFetcher()
+
+    async def run():
+        await cache.get("k", fetch)
+        clock.now += 661
+        return await cache.get("k", fetch)
+
+    assert asyncio.run(run()) == {"call": 2}
+    assert cache.stats.stale_hits == 0
+
+
+def test_failed_fetch_is_not_cached():
+    cache = AsyncTTLCache("test", ttl=60)
+    fetch = StubFetcher()
+    fetch.fail = True
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await cache.get("k", fetch)
+        fetch.fail = False
+        return await cache.get("k", fetch)
+
+    assert asyncio.run(run()) == {"call": 2}
+    assert cache.stats.fetch_errors == 1
+    assert cache.stats.misses == 2
+
+
+def test_failed_refresh_keeps_serving_stale_value(clock):
+    cache = AsyncTTLCache("test", ttl=60, stale_ttl=600)
+    fetch = StubFetcher()
+
+    async def run():
+        await cache.get("k", fetch)
+        clock.now += 120
+        fetch.fail = True
+        stale = await cache.get("k", fetch)
+        await asyncio.sleep(0.01)
+        return stale, await cache.peek("k")
+
+    assert asyncio.run(run()) == ({"call": 1}, {"call": 1})
+    assert cache.stats.fetch_errors == 1
+
+
+def test_cancelled_waiter_does_not_cancel_shared_fetch():
+    cache = AsyncTTLCache("test", ttl=60)
+    fetch = StubFetcher(delay=0.05)
+
+    async def run():
+        first = asyncio.create_task(cache.get("k", fetch))
+        second = asyncio.create_task(cache.get("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == {"call": 1}
+    assert fetch.calls == 1
+
+
+def test_entries_are_evicted_least_recently_used_first():
+    cache = AsyncTTLCache("test", ttl=60, max_entries=2)
+    fetch = StubFetcher()
+
+    async def run():
+        await cache.get("a", fetch)
+        await cache.get("b", fetch)
+        await cache.get("a", fetch)
+        await cache.get("c", fetch)
+        return await cache.peek("a"), await cache.peek("b")
+
+    assert asyncio.run(run()) == ({"call": 1}, None)
@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from core import ttl_cache, usage
+
+
+class FakePostHog:
+    """Stands in for the PostHog query endpoint, counting queries."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return httpx.Response(
+            200,
+            json={
+                "columns": ["user_id", "ai_model", "generations", "total_cost"],
+                "results": [["user_123", '"openai/gpt-4o"', self.calls, 0.25]],
+            })
+
+
+@pytest.fixture
+def posthog(monkeypatch):
+    fake = FakePostHog()
+    monkeypatch.setenv("POSTHOG_READ_API_KEY_USER_USAGE_INFO", "test-key")
+    monkeypatch.setattr(ttl_cache, "get_shared_store", lambda: None)
+    monkeypatch.setattr(
+        usage, "_http_client",
+        httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)))
+    monkeypatch.setattr(usage, "USAGE_CACHE",
+                        ttl_cache.AsyncTTLCache("usage-info", ttl=60))
+    return fake
+
+
+def test_identical_requests_reach_posthog_once(posthog):
+    app = FastAPI()
+    app.include_router(usage.router)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport,
+                                     base_url="http://test") as client:
+            payload = {"user_id": "user_123", "n_days_window": 7}
+            burst = await asyncio.gather(*(client.post("/usage-info",
+                                                       json=payload)
+                                           for _ in range(10)))
+            other_window = await client.post("/usage-info",
+                                             json={
+                                                 "user_id": "user_123",
+                                                 "n_days_window": 30
+                                             })
+            return burst, other_window
+
+    burst, other_window = asyncio.run(run())
+    assert all(r.status_code == 200 for r in burst)
+    assert {r.json()["data"]["data"][0]["generations"] for r in burst} == {1}
+    assert burst[0].json()["data"]["data"][0]["ai_model"] == "openai/gpt-4o"
+    assert other_window.json()["data"]["data"][0]["generations"] == 2
+    assert posthog.calls == 2
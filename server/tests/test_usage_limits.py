@@ -0,0 +1,148 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from ag_ui.core.types import RunAgentInput
+
+from api.server import _starts_user_turn
+from core import rate_limit, ttl_cache, usage
+from core.rate_limit import RateLimiter
+
+
+@pytest.fixture(autouse=True)
+def in_process_state(monkeypatch):
+    monkeypatch.setattr(rate_limit, "get_shared_store", lambda: None)
+    monkeypatch.setattr(ttl_cache, "get_shared_store", lambda: None)
+    monkeypatch.setattr(usage, "RATE_LIMITER",
+                        RateLimiter("test-turns", capacity=2, rate=1 / 60))
+    monkeypatch.setattr(usage, "CONTINUATION_LIMITER",
+                        RateLimiter("test-more", capacity=5, rate=1 / 60))
+    monkeypatch.setattr(
+        usage, "CREDS", {
+            "openai_api_key": "key",
+            "openai_api_base": "http://localhost",
+            "openai_api_model": "gpt-4o",
+        })
+
+
+USER = SimpleNamespace(email="Ada@Example.com")
+
+
+def run_input(messages: list[dict], forwarded_props=None) -> RunAgentInput:
+    return RunAgentInput(thread_id="t",
+                         run_id="r",
+                         state={},
+                         messages=messages,
+                         tools=[],
+                         context=[],
+                         forwarded_props=forwarded_props or {})
+
+
+@pytest.mark.parametrize("raw, expected", [(None, None), ("", None),
+                                           ("2.5", 2.5)])
+def test_cost_limit_parses(raw, expected):
+    assert usage._parse_cost_limit(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ["abc", "0", "-1", "nan", "inf"])
+def test_bad_cost_limit_is_rejected(raw):
+    with pytest.raises(ValueError, match="DAILY_COST_LIMIT_USD"):
+        usage._parse_cost_limit(raw)
+
+
+def test_continuations_do_not_use_turn_tokens():
+
+    async def run():
+        await usage.validate_and_fetch_creds(USER, "t")
+        for _ in range(5):
+            await usage.validate_and_fetch_creds(USER, "t", new_turn=False)
+        await usage.validate_and_fetch_creds(USER, "t")
+        with pytest.raises(usage.UsageLimitError) as turn_limited:
+            await usage.validate_and_fetch_creds(USER, "t")
+        with pytest.raises(usage.UsageLimitError) as continuation_limited:
+            await usage.validate_and_fetch_creds(USER, "t", new_turn=False)
+        return turn_limited.value, continuation_limited.value
+
+    turn_limited, continuation_limited = asyncio.run(run())
+    assert turn_limited.status_code == 429
+    assert 0 < turn_limited.retry_after <= 60
+    assert 0 < continuation_limited.retry_after <= 60
+
+
+def test_quota_checks_new_turns_against_the_rolling_window(monkeypatch):
+    cache = ttl_cache.AsyncTTLCache("test-usage", ttl=60)
+    monkeypatch.setattr(usage, "USAGE_CACHE", cache)
+    monkeypatch.setattr(usage, "DAILY_COST_LIMIT", 1.0)
+    monkeypatch.setenv("POSTHOG_READ_API_KEY_USER_USAGE_INFO", "test-key")
+
+    async def spent():
+        return [{"total_cost": 0.75}, {"total_cost": 0.5}]
+
+    async def run():
+        await cache.get(("ada@example.com", usage.QUOTA_WINDOW_DAYS), spent)
+        # A turn already under way is not cut off by the quota.
+        await usage.validate_and_fetch_creds(USER, "t", new_turn=False)
+        with pytest.raises(usage.UsageLimitError) as exc:
+            await usage.validate_and_fetch_creds(USER, "t")
+        return exc.value
+
+    limited = asyncio.run(run())
+    assert "per 24 hours" in limited.detail
+    assert limited.retry_after == cache.ttl
+
+
+def test_usage_info_and_quota_share_one_entry_per_user(monkeypatch):
+    cache = ttl_cache.AsyncTTLCache("test-usage", ttl=60)
+    monkeypatch.setattr(usage, "USAGE_CACHE", cache)
+    monkeypatch.setattr(usage, "DAILY_COST_LIMIT", 1.0)
+    monkeypatch.setenv("POSTHOG_READ_API_KEY_USER_USAGE_INFO", "test-key")
+    fetched = []
+
+    async def fetch(user_id, n_days):
+        fetched.append((user_id, n_days))
+        return [{"total_cost": 2.0}]
+
+    monkeypatch.setattr(usage, "_fetch_usage_rows", fetch)
+
+    async def run():
+        await usage.usage_info(
+            usage.UsageInfoRequest(user_id="ADA@example.com",
+                                   n_days_window=usage.QUOTA_WINDOW_DAYS))
+        with pytest.raises(usage.UsageLimitError):
+            await usage.validate_and_fetch_creds(USER, "t")
+
+    asyncio.run(run())
+    assert fetched == [("ada@example.com", usage.QUOTA_WINDOW_DAYS)]
+
+
+def test_user_message_starts_a_turn():
+    assert _starts_user_turn(
+        run_input([{
+            "id": "1",
+            "role": "user",
+            "content": "Fix the intro"
+        }]))
+
+
+def test_tool_result_and_resume_continue_a_turn():
+    assert not _starts_user_turn(
+        run_input([{
+            "id": "1",
+            "role": "user",
+            "content": "Fix the intro"
+        }, {
+            "id": "2",
+            "role": "tool",
+            "content": "done",
+            "toolCallId": "call-1"
+        }]))
+    assert not _starts_user_turn(
+        run_input([{
+            "id": "1",
+            "role": "user",
+            "content": "Fix the intro"
+        }], {"command": {
+            "resume": [{
+                "content": "done"
+            }]
+        }}))
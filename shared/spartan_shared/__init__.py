@@ -0,0 +1 @@
+"""Code shared by the Spartan Write server and sidecar."""
@@ -0,0 +1,133 @@
+"""Keep project-relative paths inside the project root.
+
+`resolve_under_root(root, relative)` returns the absolute path for a path
+from the project root, or raises ValueError if it would leave the root. It
+is on every file operation, so it avoids `Path.resolve()`, which makes
+several syscalls per component on each call:
+
+- Resolved roots are cached, since they are the same for every call.
+- The relative path is normalized lexically, and absolute paths or `..`
+  climbing above the root are rejected without touching the disk. The
+  normalized path is what gets returned, so `a/../b` means root/b whatever
+  `a` is.
+- Only a symlink along that path could still lead outside. Its components
+  are lstat'ed, and directories found to be plain are remembered for
+  DIR_CACHE_TTL seconds. Only a path that does contain a symlink is
+  resolved and checked against the root in full.
+
+Trusting a directory for DIR_CACHE_TTL is an accepted weakening for reads: a
+directory swapped for a symlink within that window can pass the check once.
+Writes, deletes and renames pass `for_write=True`, which lstats every
+component on each call, so they cannot be redirected through a directory
+swapped since an earlier check. Like any check-then-use, it still cannot stop
+a swap between the check and the write itself.
+
+The server's agent tools and the sidecar's file endpoints both use this
+module. The sidecar calls `forget` when it closes a project's workspace.
+"""
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+ROOT_CACHE_SIZE = 64
+DIR_CACHE_SIZE = 4096
+# How long a directory known not to be a symlink is trusted without a stat.
+DIR_CACHE_TTL = 5.0
+
+_lock = threading.Lock()
+_roots: OrderedDict[str, Path] = OrderedDict()
+# Absolute directory path -> monotonic time until which it is known plain.
+_plain_dirs: dict[str, float] = {}
+
+
+def resolved_root(root: Path) -> Path:
+    """Return `root` with symlinks resolved, cached per absolute root."""
+    if not root.is_absolute():
+        return root.resolve()
+    key = str(root)
+    with _lock:
+        cached = _roots.get(key)
+        if cached is not None:
+            _roots.move_to_end(key)
+            return cached
+    resolved = root.resolve()
+    with _lock:
+        _roots[key] = resolved
+        while len(_roots) > ROOT_CACHE_SIZE:
+            _roots.popitem(last=False)
+    return resolved
+
+
+def forget(root: Path) -> None:
+    """Drop what is cached about `root`, a resolved root that is closed."""
+    prefix = os.path.join(str(root), "")
+    with _lock:
+        for key in [k for k, v in _roots.items() if v == root]:
+            del _roots[key]
+        for path in [p for p in _plain_dirs if p.startswith(prefix)]:
+            del _plain_dirs[path]
+
+
+def _is_link(st: os.stat_result) -> bool:
+    # Windows junctions are reparse points but not S_ISLNK.
+    return stat.S_ISLNK(st.st_mode) or bool(getattr(st, "st_reparse_tag", 0))
+
+
+def _has_symlink(root: str, parts: list[str], trust_cache: bool) -> bool:
+    """Whether any existing component of root/parts is a symlink."""
+    now = time.monotonic()
+    path = root
+    for i, part in enumerate(parts):
+        path = os.path.join(path, part)
+        is_dir_component = i < len(parts) - 1
+        if is_dir_component and trust_cache:
+            with _lock:
+                trusted = _plain_dirs.get(path, 0.0) > now
+            if trusted:
+                continue
+        try:
+            st = os.lstat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            # Nothing below a missing component exists to redirect us.
+            return False
+        if _is_link(st):
+            return True
+        if is_dir_component and stat.S_ISDIR(st.st_mode):
+            with _lock:
+                if len(_plain_dirs) >= DIR_CACHE_SIZE:
+                    _plain_dirs.clear()
+                _plain_dirs[path] = now + DIR_CACHE_TTL
+    return False
+
+
+def resolve_under_root(root: Path,
+                       relative: str,
+                       for_write: bool = False) -> Path:
+    """Return absolute path for `relative` if it stays under `root`; else raise ValueError.
+
+    Pass for_write=True for paths about to be written, deleted or renamed, so
+    no directory is trusted from the DIR_CACHE_TTL cache.
+    """
+    root_r = resolved_root(root)
+    relative_s = os.fspath(relative)
+    if os.path.isabs(relative_s) or os.path.splitdrive(relative_s)[0]:
+        raise ValueError(f"Path escapes project root: {relative!r}")
+    normalized = os.path.normpath(relative_s)
+    if normalized == os.curdir:
+        return root_r
+    parts = normalized.split(os.sep)
+    if parts[0] == os.pardir:
+        raise ValueError(f"Path escapes project root: {relative!r}")
+
+    candidate = root_r / normalized
+    if not _has_symlink(str(root_r), parts, trust_cache=not for_write):
+        return candidate
+    resolved = candidate.resolve()
+    try:
+        resolved.relative_to(root_r)
+    except ValueError as e:
+        raise ValueError(f"Path escapes project root: {relative!r}") from e
+    return resolved
@@ -0,0 +1,172 @@
+"""Optional downsampling of images placed into a project as figures.
+
+Screenshots and photos are often far larger than they will ever print, and
+Tectonic embeds them at full size, which slows compiles and bloats main.pdf.
+When SPARTAN_FIGURE_OPTIMIZE=1 and Pillow is installed, an image moved into a
+project is resized to at most SPARTAN_FIGURE_DPI (default 300) at the
+document's column width, re-encoded without metadata, and converted to PNG or
+JPEG if Tectonic cannot include its format. Its printed size is unchanged:
+the DPI recorded in the file is scaled along with the pixels.
+
+Variants are cached by source hash and target width under the user cache
+dir, so an image is only processed once. Without Pillow, or when a variant
+would not be smaller, the original is used as before. The server uses this for
+the agent's attached images and the sidecar for images placed from the editor;
+each passes in its own metrics.
+"""
+import hashlib
+import io
+import os
+import re
+from pathlib import Path
+
+from platformdirs import user_cache_path
+
+from .metrics import Counter
+
+ENABLE_ENV = "SPARTAN_FIGURE_OPTIMIZE"
+DPI_ENV = "SPARTAN_FIGURE_DPI"
+DEFAULT_DPI = 300
+JPEG_QUALITY = 85
+# Images already at print size are re-encoded only when at least this large,
+# where stripped metadata and a better encoder are likely to pay off.
+REENCODE_MIN_BYTES = 512 * 1024
+
+# Printed widths in inches: \columnwidth of two-column layouts, and a
+# generous \textwidth for one-column documents.
+TWO_COLUMN_WIDTH_IN = 3.5
+ONE_COLUMN_WIDTH_IN = 6.5
+# Classes that set two columns unless told otherwise.
+_TWO_COLUMN_CLASSES = {"IEEEtran"}
+
+# Formats xdvipdfmx embeds directly; anything else has to be converted.
+_INCLUDABLE_FORMATS = {"PNG", "JPEG"}
+# Formats whose content is usually line art or text, kept lossless.
+_LOSSLESS_FORMATS = {"PNG", "GIF", "BMP", "TIFF"}
+
+_DOCUMENTCLASS = re.compile(
+    r"^[ \t]*\\documentclass\s*(?:\[([^\]]*)\])?\s*\{([^}]*)\}", re.M)
+
+
+def enabled() -> bool:
+    return os.getenv(ENABLE_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+def target_dpi() -> int:
+    try:
+        return max(72, int(os.getenv(DPI_ENV, DEFAULT_DPI)))
+    except ValueError:
+        return DEFAULT_DPI
+
+
+def column_width_inches(project_root: Path) -> float:
+    """Estimate how wide a figure can print, from main.tex's document class."""
+    try:
+        text = (project_root / "main.tex").read_text(encoding="utf-8",
+                                                     errors="replace")
+    except OSError:
+        return ONE_COLUMN_WIDTH_IN
+    match = _DOCUMENTCLASS.search(text)
+    if match is None:
+        return ONE_COLUMN_WIDTH_IN
+    options = {o.strip() for o in (match.group(1) or "").split(",")}
+    doc_class = match.group(2).strip()
+    if "onecolumn" in options:
+        return ONE_COLUMN_WIDTH_IN
+    if "twocolumn" in options or doc_class in _TWO_COLUMN_CLASSES:
+        return TWO_COLUMN_WIDTH_IN
+    return ONE_COLUMN_WIDTH_IN
+
+
+def _encode(raw: bytes, max_width: int) -> tuple[bytes, str] | None:
+    """Downscale and re-encode an image; None if it should be used as-is."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            source_format = img.format or ""
+            dpi = float(img.info.get("dpi", (72, 72))[0] or 72)
+            img = ImageOps.exif_transpose(img)
+            width, height = img.size
+            scale = min(1.0, max_width / width)
+            if (scale == 1.0 and source_format in _INCLUDABLE_FORMATS
+                    and len(raw) < REENCODE_MIN_BYTES):
+                return None
+            if scale < 1.0:
+                img = img.resize(
+                    (max(1, round(width * scale)), max(1, round(
+                        height * scale))), Image.Resampling.LANCZOS)
+
+            out = io.BytesIO()
+            save_dpi = (dpi * scale, dpi * scale)
+            has_alpha = img.mode in ("RGBA", "LA", "PA") or (
+                img.mode == "P" and "transparency" in img.info)
+            if has_alpha or source_format in _LOSSLESS_FORMATS:
+                if img.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+                    img = img.convert("RGBA" if has_alpha else "RGB")
+                img.save(out, format="PNG", optimize=True, dpi=save_dpi)
+                encoded, suffix = out.getvalue(), ".png"
+            else:
+                img.convert("RGB").save(out,
+                                        format="JPEG",
+                                        quality=JPEG_QUALITY,
+                                        optimize=True,
+                                        progressive=True,
+                                        dpi=save_dpi)
+                encoded, suffix = out.getvalue(), ".jpg"
+    except (Image.DecompressionBombError, UnidentifiedImageError, OSError):
+        return None
+
+    if len(encoded) >= len(raw) and source_format in _INCLUDABLE_FORMATS:
+        return None
+    return encoded, suffix
+
+
+def optimize_for_project(source: Path,
+                         project_root: Path,
+                         sha256: str | None = None,
+                         bytes_saved: Counter | None = None,
+                         lookups: Counter | None = None) -> Path | None:
+    """Return a cached, print-sized variant of `source`, or None to keep it.
+
+    The variant lives in the cache and is shared by every project, so callers
+    copy or clone it into the project, never hardlink it, and should use its
+    suffix, which may differ from the source's. Bytes saved are counted on
+    `bytes_saved` and cache hits and misses on `lookups` (cache="figures").
+    """
+    if not enabled():
+        return None
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return None
+
+    max_width = round(column_width_inches(project_root) * target_dpi())
+    if sha256 is None:
+        sha256 = hashlib.sha256(source.read_bytes()).hexdigest()
+    cache_dir = user_cache_path(appname="spartan-write") / "figures"
+    key = f"{sha256}-{max_width}"
+    for suffix in (".png", ".jpg", ".keep"):
+        cached = cache_dir / f"{key}{suffix}"
+        if cached.exists():
+            if lookups is not None:
+                lookups.inc(cache="figures", result="hit")
+            return None if suffix == ".keep" else cached
+    if lookups is not None:
+        lookups.inc(cache="figures", result="miss")
+
+    raw = source.read_bytes()
+    result = _encode(raw, max_width)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    if result is None:
+        # Remember that this image is best left alone.
+        (cache_dir / f"{key}.keep").touch()
+        return None
+    encoded, suffix = result
+    variant = cache_dir / f"{key}{suffix}"
+    tmp = variant.with_name(f"{variant.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(encoded)
+    tmp.replace(variant)
+    if bytes_saved is not None:
+        bytes_saved.inc(max(0, len(raw) - len(encoded)))
+    return variant
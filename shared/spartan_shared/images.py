@@ -0,0 +1,151 @@
+"""Placing uploaded images into a project.
+
+The sidecar keeps each uploaded image once, as a blob under the runtime dir,
+and hands out upload names that are hardlinks to it. Those must never end up
+inside a project: editing the project file in place would change the blob,
+and the blob's link count would never drop back to one for GC to free it. So
+`place_in_project` always gives the project its own copy (a copy-on-write
+clone where the filesystem supports one), reuses an identical file already in
+the target folder, and tells a different file with the same name apart by a
+hash suffix instead of probing for a free name. The sidecar uses it for
+images placed from the editor and the server for the agent's attached image.
+"""
+import hashlib
+import os
+import re
+import shutil
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+# Hashes remembered by file_sha256; keys carry the mtime, so edited files
+# leave stale entries that the LRU bound ages out.
+HASH_CACHE_SIZE = 4096
+
+_FICLONE = 0x40049409
+_UPLOAD_PREFIX = re.compile(r"^[0-9a-f]{32}-(.+)$")
+
+_hash_cache: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+_hash_cache_lock = threading.Lock()
+
+
+def original_filename(filename: str) -> str:
+    """Recover the original filename from an upload name."""
+    match = _UPLOAD_PREFIX.match(filename)
+    return match.group(1) if match else filename
+
+
+def file_sha256(path: Path) -> str:
+    """Hash a file, reusing the result while its mtime and size are unchanged."""
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    with _hash_cache_lock:
+        cached = _hash_cache.get(key)
+        if cached is not None:
+            _hash_cache.move_to_end(key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    with path.open("rb") as fp:
+        while chunk := fp.read(1024 * 1024):
+            digest.update(chunk)
+    sha = digest.hexdigest()
+    with _hash_cache_lock:
+        _hash_cache[key] = sha
+        while len(_hash_cache) > HASH_CACHE_SIZE:
+            _hash_cache.popitem(last=False)
+    return sha
+
+
+def forget(root: Path) -> None:
+    """Drop remembered hashes of files under `root`, e.g. once it is closed."""
+    prefix = os.path.join(str(root), "")
+    with _hash_cache_lock:
+        for key in [k for k in _hash_cache if k[0].startswith(prefix)]:
+            del _hash_cache[key]
+
+
+def find_identical(directory: Path, size: int, sha256: str) -> Path | None:
+    """Return a file in `directory` with the given content, if there is one."""
+    if not directory.is_dir():
+        return None
+    with os.scandir(directory) as it:
+        for entry in it:
+            if (entry.is_file() and entry.stat().st_size == size
+                    and file_sha256(Path(entry.path)) == sha256):
+                return Path(entry.path)
+    return None
+
+
+def clone_file(src: Path, dst: Path) -> bool:
+    """Copy-on-write clone of src to dst; False if the filesystem can't."""
+    try:
+        if sys.platform == "darwin":
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+        if sys.platform.startswith("linux"):
+            import fcntl
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+            return True
+    except (OSError, AttributeError):
+        pass
+    return False
+
+
+def clone_or_copy(src: Path, dst: Path) -> None:
+    """Give dst its own copy of src, sharing blocks only copy-on-write.
+
+    Never hardlinks, so editing dst in place cannot change src.
+    """
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        if not clone_file(src, tmp):
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def place_in_project(
+    upload: Path,
+    project_root: Path,
+    target_dir: str = "figures",
+    optimize: Callable[[Path, Path, str], Path | None] | None = None,
+) -> Path:
+    """Copy an uploaded image into `target_dir` and return the project file.
+
+    `optimize(source, project_root, sha256)` may return a print-sized variant
+    to place instead. The upload itself is left alone; callers remove their
+    handle to it once the image is placed.
+    """
+    project_root = project_root.resolve()
+    destination_dir = (project_root / target_dir).resolve()
+    destination_dir.mkdir(parents=True, exist_ok=True)
+
+    name = Path(original_filename(upload.name))
+    source = upload
+    sha256 = file_sha256(upload)
+    variant = optimize(source, project_root, sha256) if optimize else None
+    if variant is not None:
+        source = variant
+        name = name.with_suffix(variant.suffix)
+        sha256 = file_sha256(variant)
+
+    destination = find_identical(destination_dir, source.stat().st_size,
+                                 sha256)
+    if destination is None:
+        # No identical file is there, so a name clash means other content;
+        # a hash suffix keeps the names apart without probing.
+        destination = destination_dir / name.name
+        if destination.exists():
+            destination = destination_dir / (f"{name.stem}-{sha256[:8]}"
+                                             f"{name.suffix}")
+        # A copy, never a link: the source is the shared blob or figure
+        # cache entry, which in-place edits in the project must not reach.
+        clone_or_copy(source, destination)
+    return destination
@@ -0,0 +1,189 @@
+"""Debug-mode detector for code that blocks the event loop.
+
+Enable with SPARTAN_LOOP_MONITOR=1. A heartbeat task ticks on the loop while a
+watchdog thread checks it; once the loop has not ticked for longer than
+SPARTAN_LOOP_BLOCK_MS (default 100), the watchdog captures the loop thread's
+stack. Each report is attributed to the route whose endpoint is on that stack.
+
+Reports are logged, counted on the `blocks` counter the app passes in and kept
+in memory, so a test can run requests with the monitor on and assert
+`app.state.loop_monitor.reports()` is empty.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from types import CodeType, FrameType
+from typing import TYPE_CHECKING, AsyncIterator
+
+from .metrics import Counter
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+ENABLE_ENV = "SPARTAN_LOOP_MONITOR"
+THRESHOLD_ENV = "SPARTAN_LOOP_BLOCK_MS"
+DEFAULT_THRESHOLD_MS = 100.0
+MAX_REPORTS = 100
+
+
+@dataclass
+class BlockReport:
+    route: str | None
+    started_at: float
+    duration: float
+    stack: list[str]
+    finished: bool = False
+
+
+def enabled() -> bool:
+    return os.getenv(ENABLE_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+def _threshold_from_env() -> float:
+    try:
+        return float(os.getenv(THRESHOLD_ENV,
+                               str(DEFAULT_THRESHOLD_MS))) / 1000
+    except ValueError:
+        return DEFAULT_THRESHOLD_MS / 1000
+
+
+def routes_by_code(app: "FastAPI") -> dict[CodeType, str]:
+    """Map each endpoint's code object to a "METHOD /path" label."""
+    out: dict[CodeType, str] = {}
+    for route in app.routes:
+        endpoint = getattr(route, "endpoint", None)
+        code = getattr(endpoint, "__code__", None)
+        if code is None:
+            continue
+        methods = ",".join(sorted(getattr(route, "methods", None) or ()))
+        # Endpoints bound to several paths keep the first (shortest) label.
+        out.setdefault(code, f"{methods} {route.path}".strip())
+    return out
+
+
+class LoopMonitor:
+
+    def __init__(self,
+                 threshold: float,
+                 routes: dict[CodeType, str] | None = None,
+                 max_reports: int = MAX_REPORTS,
+                 blocks: Counter | None = None):
+        self.threshold = threshold
+        self.routes = routes or {}
+        self.blocks = blocks
+        self._interval = max(threshold / 4, 0.005)
+        self._reports: deque[BlockReport] = deque(maxlen=max_reports)
+        self._active: BlockReport | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._heartbeat_task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start monitoring the running loop; call from inside it."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(
+            self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch,
+                                          name="loop-monitor",
+                                          daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            self._watchdog.join(1.0)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            now = time.monotonic()
+            with self._lock:
+                if self._active is not None:
+                    self._active.duration = now - self._last_beat
+                    self._active.finished = True
+                    self._active = None
+                self._last_beat = now
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self._interval):
+            with self._lock:
+                stalled = time.monotonic() - self._last_beat
+                if stalled <= self.threshold + self._interval:
+                    continue
+                if self._active is not None:
+                    self._active.duration = stalled
+                    continue
+                report = self._capture(stalled)
+                self._active = report
+                self._reports.append(report)
+            if self.blocks is not None:
+                self.blocks.inc(route=report.route or "unknown")
+            logger.warning("Event loop blocked for over %.0f ms in %s:\n%s",
+                           stalled * 1000, report.route or "unknown route",
+                           "".join(report.stack))
+
+    def _capture(self, stalled: float) -> BlockReport:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        return BlockReport(
+            route=self._route_for(frame),
+            started_at=time.time() - stalled,
+            duration=stalled,
+            stack=traceback.format_stack(frame) if frame else [],
+        )
+
+    def _route_for(self, frame: FrameType | None) -> str | None:
+        while frame is not None:
+            route = self.routes.get(frame.f_code)
+            if route is not None:
+                return route
+            frame = frame.f_back
+        return None
+
+    def reports(self) -> list[dict]:
+        with self._lock:
+            return [asdict(r) for r in self._reports]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reports.clear()
+
+
+@asynccontextmanager
+async def monitor_from_env(
+        app: "FastAPI",
+        blocks: Counter | None = None
+) -> AsyncIterator[LoopMonitor | None]:
+    """Run a LoopMonitor for the app's lifetime when the debug flag is set.
+
+    Each block is counted on `blocks`, labelled by route.
+    """
+    if not enabled():
+        yield None
+        return
+    monitor = LoopMonitor(_threshold_from_env(),
+                          routes_by_code(app),
+                          blocks=blocks)
+    monitor.start()
+    try:
+        yield monitor
+    finally:
+        await monitor.stop()
@@ -0,0 +1,205 @@
+"""Minimal in-process metrics rendered in the Prometheus text format.
+
+Counters, gauges and histograms are plain Python objects guarded by a lock;
+collectors turn stats kept elsewhere into samples at scrape time. Updating a
+metric costs a dict lookup under an uncontended lock, cheap enough for every
+request and file operation.
+
+The server and the sidecar each run their own registry, in their own
+process; their core/metrics.py re-exports these types and defines the
+series that are theirs.
+"""
+import asyncio
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0, 30.0, 60.0, 120.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+_registry: list["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _label_key(labels: dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def samples(self) -> Iterable[str]:
+        return ()
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self,
+                 name: str,
+                 help: str,
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (bucket counts, sum, count)
+        self._values: dict[Labels, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(k, list(c), s, n) for k, (c, s, n) in self._values.items()]
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (f"{self.name}_bucket"
+                       f"{_format_labels(labels, ('le', _format_value(bound)))}"
+                       f" {cumulative}")
+            yield (f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))}"
+                   f" {count}")
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(labels)} {count}"
+
+
+class Collector(_Metric):
+    """Gauge-like metric whose samples are produced by `fn` at scrape time."""
+
+    def __init__(self,
+                 name: str,
+                 help: str,
+                 fn: Callable[[], Iterable[tuple[dict[str, object], float]]],
+                 kind: str = "gauge"):
+        super().__init__(name, help)
+        self.kind = kind
+        self._fn = fn
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._fn():
+            yield (f"{self.name}{_format_labels(_label_key(labels))} "
+                   f"{_format_value(value)}")
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: object) -> Iterator[None]:
+    """Observe the duration of a block, whether or not it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+def timed_call(histogram: Histogram, **labels: object) -> Callable[[F], F]:
+    """Decorator form of `timed` for plain functions."""
+
+    def decorator(fn: F) -> F:
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(histogram, **labels):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+async def sample_event_loop_lag(lag: Histogram,
+                                lag_max: Gauge,
+                                interval: float = 0.5) -> None:
+    """Run forever, recording how far each wake-up overshoots `interval`.
+
+    Each lag is observed on `lag`, and the largest so far set on `lag_max`.
+    """
+    worst = 0.0
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        late = max(0.0, time.perf_counter() - start - interval)
+        lag.observe(late)
+        if late > worst:
+            worst = late
+            lag_max.set(worst)
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(m.render() for m in metrics) + "\n"
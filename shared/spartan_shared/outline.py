@@ -0,0 +1,290 @@
+"""Structural outline of a LaTeX project.
+
+Each .tex and .bib file is parsed into sections, figures, tables, labels,
+citations, \\input targets and bibliography entries with their line ranges.
+Parses are cached per file and reused until its mtime or size changes, so
+asking for the outline again after an edit only re-parses the edited file.
+`forget` drops a project's parses when the sidecar closes its workspace.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+CACHE_SIZE = 512
+# Caps that keep the rendered tree compact on very large projects.
+MAX_BIB_ENTRIES_SHOWN = 100
+MAX_LABELS_SHOWN = 50
+MAX_CITATIONS_SHOWN = 50
+
+_SECTION_LEVELS = {
+    "part": 0,
+    "chapter": 1,
+    "section": 2,
+    "subsection": 3,
+    "subsubsection": 4,
+    "paragraph": 5,
+}
+# One level of nested braces is enough for titles like \section{The \LaTeX{} way}.
+_BRACED = r"\{((?:[^{}]|\{[^{}]*\})*)\}"
+_COMMENT_RE = re.compile(r"(?<!\\)%.*")
+_SECTION_RE = re.compile(
+    r"\\(part|chapter|section|subsection|subsubsection|paragraph)\*?"
+    r"\s*(?:\[[^\]]*\])?\s*" + _BRACED)
+_BEGIN_RE = re.compile(
+    r"\\begin\{(figure\*?|table\*?|wrapfigure|sidewaysfigure|sidewaystable)\}")
+_END_RE = re.compile(
+    r"\\end\{(figure\*?|table\*?|wrapfigure|sidewaysfigure|sidewaystable)\}")
+_CAPTION_RE = re.compile(r"\\caption(?:\[[^\]]*\])?\s*" + _BRACED)
+_LABEL_RE = re.compile(r"\\label\{([^}]*)\}")
+_GRAPHICS_RE = re.compile(r"\\includegraphics(?:\[[^\]]*\])?\{([^}]*)\}")
+_CITE_RE = re.compile(
+    r"\\[a-zA-Z]*cite[a-zA-Z]*\*?(?:\[[^\]]*\]){0,2}\{([^}]*)\}")
+_INPUT_RE = re.compile(r"\\(input|include|subfile|bibliography|addbibresource)"
+                       r"\{([^}]*)\}")
+_BIB_ENTRY_RE = re.compile(r"^\s*@(\w+)\s*[{(]\s*([^,\s]*)")
+_BIB_SKIPPED_TYPES = {"comment", "string", "preamble"}
+
+
+@dataclass
+class OutlineItem:
+    kind: str
+    title: str
+    start: int
+    end: int
+    level: int = 0
+    label: str | None = None
+    graphics: list[str] = field(default_factory=list)
+
+
+@dataclass
+class FileOutline:
+    path: str
+    lines: int
+    size: int
+    items: list[OutlineItem] = field(default_factory=list)
+    labels: list[tuple[str, int]] = field(default_factory=list)
+    citations: dict[str, list[int]] = field(default_factory=dict)
+
+
+def _collapse(text: str) -> str:
+    return " ".join(text.split())
+
+
+def parse_tex(text: str, path: str, size: int) -> FileOutline:
+    lines = text.splitlines()
+    outline = FileOutline(path=path, lines=len(lines), size=size)
+    sections: list[OutlineItem] = []
+    open_float: OutlineItem | None = None
+    # The item a following \label{} names, until another item starts.
+    labelable: OutlineItem | None = None
+
+    for lineno, raw in enumerate(lines, start=1):
+        line = _COMMENT_RE.sub("", raw)
+        if "\\" not in line:
+            continue
+        for m in _SECTION_RE.finditer(line):
+            item = OutlineItem(kind=m.group(1),
+                               title=_collapse(m.group(2)),
+                               start=lineno,
+                               end=lineno,
+                               level=_SECTION_LEVELS[m.group(1)])
+            sections.append(item)
+            outline.items.append(item)
+            labelable = item
+        if (m := _BEGIN_RE.search(line)) and open_float is None:
+            kind = "table" if "table" in m.group(1) else "figure"
+            open_float = OutlineItem(kind=kind,
+                                     title="",
+                                     start=lineno,
+                                     end=lineno)
+            outline.items.append(open_float)
+            labelable = open_float
+        if open_float is not None:
+            if m := _CAPTION_RE.search(line):
+                open_float.title = _collapse(m.group(1))
+            open_float.graphics.extend(
+                g.strip() for g in _GRAPHICS_RE.findall(line))
+        for m in _LABEL_RE.finditer(line):
+            # A heading's label sits on its line or opens the next one; any
+            # other label belongs to an equation, list item, etc.
+            if (labelable is not None and labelable.label is None
+                    and (labelable is open_float or lineno == labelable.start
+                         or (lineno == labelable.start + 1
+                             and line.lstrip().startswith("\\label")))):
+                labelable.label = m.group(1)
+                if labelable is not open_float:
+                    labelable = None
+            else:
+                outline.labels.append((m.group(1), lineno))
+        for m in _CITE_RE.finditer(line):
+            for key in m.group(1).split(","):
+                if key := key.strip():
+                    outline.citations.setdefault(key, []).append(lineno)
+        for m in _INPUT_RE.finditer(line):
+            outline.items.append(
+                OutlineItem(kind=m.group(1),
+                            title=m.group(2).strip(),
+                            start=lineno,
+                            end=lineno))
+        if open_float is not None and _END_RE.search(line):
+            open_float.end = lineno
+            open_float = None
+            labelable = None
+
+    if open_float is not None:
+        open_float.end = len(lines)
+    # A section runs until the next section at the same or a higher level.
+    for i, item in enumerate(sections):
+        item.end = len(lines)
+        for later in sections[i + 1:]:
+            if later.level <= item.level:
+                item.end = later.start - 1
+                break
+    return outline
+
+
+def parse_bib(text: str, path: str, size: int) -> FileOutline:
+    lines = text.splitlines()
+    outline = FileOutline(path=path, lines=len(lines), size=size)
+    current: OutlineItem | None = None
+    for lineno, line in enumerate(lines, start=1):
+        m = _BIB_ENTRY_RE.match(line)
+        if m is None:
+            continue
+        if current is not None:
+            current.end = lineno - 1
+            current = None
+        if m.group(1).lower() in _BIB_SKIPPED_TYPES:
+            continue
+        current = OutlineItem(kind="bibentry",
+                              title=m.group(1).lower(),
+                              start=lineno,
+                              end=len(lines),
+                              label=m.group(2))
+        outline.items.append(current)
+    return outline
+
+
+_cache: OrderedDict[str, tuple[int, int, FileOutline]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def outline_file(root: Path, relative: str) -> FileOutline:
+    """Return the parsed outline of one file, re-parsing only if it changed."""
+    path = root / relative
+    stat = path.stat()
+    key = str(path.resolve())
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns,
+                                                 stat.st_size):
+            _cache.move_to_end(key)
+            return cached[2]
+
+    text = path.read_text(encoding="utf-8", errors="replace")
+    parse = parse_bib if path.suffix.lower() == ".bib" else parse_tex
+    outline = parse(text, relative, stat.st_size)
+    with _cache_lock:
+        _cache[key] = (stat.st_mtime_ns, stat.st_size, outline)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return outline
+
+
+def forget(root: Path) -> None:
+    """Drop the cached parses of files under `root`, e.g. once it is closed."""
+    prefix = os.path.join(str(root), "")
+    with _cache_lock:
+        for key in [k for k in _cache if k.startswith(prefix)]:
+            del _cache[key]
+
+
+def source_files(root: Path) -> list[str]:
+    """Relative paths of .tex and .bib files, main.tex first."""
+    found: list[str] = []
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(Path(entry.path))
+                elif entry.name.lower().endswith((".tex", ".bib")):
+                    found.append(
+                        Path(entry.path).relative_to(root).as_posix())
+    return sorted(found, key=lambda p: (p != "main.tex", p.endswith(".bib"), p))
+
+
+def _format_items(outline: FileOutline) -> list[str]:
+    out: list[str] = []
+    levels = [i.level for i in outline.items if i.kind in _SECTION_LEVELS]
+    # Indent relative to the file's top heading, so a sections/ file that
+    # starts at \subsection is not pushed to the right.
+    base = min(levels, default=0)
+    depth = 0
+    for item in outline.items:
+        if item.kind in _SECTION_LEVELS:
+            depth = item.level - base + 1
+            indent = "  " * depth
+            text = f"{indent}L{item.start}-{item.end} \\{item.kind} {item.title}"
+        elif item.kind in ("figure", "table"):
+            indent = "  " * (depth + 1)
+            title = f' "{item.title}"' if item.title else ""
+            text = f"{indent}L{item.start}-{item.end} {item.kind}{title}"
+            if item.graphics:
+                text += " " + ", ".join(item.graphics)
+        else:
+            indent = "  " * (depth + 1)
+            text = f"{indent}L{item.start} \\{item.kind}{{{item.title}}}"
+        if item.label:
+            text += f" [{item.label}]"
+        out.append(text)
+    return out
+
+
+def format_outline(outlines: list[FileOutline]) -> str:
+    """Render outlines as a compact, indented tree."""
+    out: list[str] = []
+    for outline in outlines:
+        if outline.path.lower().endswith(".bib"):
+            out.append(f"{outline.path} ({outline.lines} lines): "
+                       f"{len(outline.items)} entries")
+            shown = outline.items[:MAX_BIB_ENTRIES_SHOWN]
+            if shown:
+                out.append("  " + ", ".join(f"{i.label} L{i.start}-{i.end}"
+                                            for i in shown))
+            if len(outline.items) > len(shown):
+                out.append(f"  ... {len(outline.items) - len(shown)} more"
+                           " entries")
+            continue
+
+        out.append(f"{outline.path} ({outline.lines} lines)")
+        out.extend(_format_items(outline))
+        if outline.labels:
+            shown = outline.labels[:MAX_LABELS_SHOWN]
+            more = len(outline.labels) - len(shown)
+            out.append("  other labels: " +
+                       ", ".join(f"{label} L{lineno}"
+                                 for label, lineno in shown) +
+                       (f", ... {more} more" if more else ""))
+        if outline.citations:
+            keys = list(outline.citations.items())
+            shown = keys[:MAX_CITATIONS_SHOWN]
+            more = len(keys) - len(shown)
+            out.append("  cites: " + ", ".join(
+                f"{key} L{','.join(map(str, lines))}"
+                for key, lines in shown) + (f", ... {more} more" if more else ""))
+    return "\n".join(out)
+
+
+def project_outline(root: Path, relative: str | None = None) -> str:
+    """Outline one file, or every .tex/.bib file in the project."""
+    files = [relative] if relative else source_files(root)
+    if not files:
+        return "No .tex or .bib files found in the project directory."
+    return format_outline([outline_file(root, f) for f in files])
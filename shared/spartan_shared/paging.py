@@ -0,0 +1,165 @@
+"""Paged file reads and listings for the agent.
+
+One large file or folder must not flood the model's context window, so reads
+and listings are returned a page at a time within fixed budgets. The server's
+agent tools and both apps' project snapshots render listings as text with
+`format_file_list`; the sidecar's /files endpoints return pages as JSON.
+"""
+import bisect
+import os
+from pathlib import Path
+
+from .confine import resolve_under_root
+
+READ_MAX_LINES = 2000
+READ_MAX_BYTES = 64 * 1024
+LIST_MAX_ENTRIES = 200
+
+
+def format_size(size: float) -> str:
+    if size < 1024:
+        return f"{int(size)} B"
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if size < 1024 or unit == "GB":
+            break
+    return f"{size:.1f} {unit}"
+
+
+def read_page(path: Path,
+              offset: int = 0,
+              limit: int = READ_MAX_LINES) -> dict:
+    """Read up to `limit` lines from line `offset`, within READ_MAX_BYTES."""
+    text = path.read_text(encoding="utf-8")
+    lines = text.splitlines(keepends=True)
+    total = len(lines)
+    offset = max(0, offset)
+    limit = max(1, min(limit, READ_MAX_LINES))
+    if offset >= total and total:
+        raise ValueError(
+            f"offset {offset} is past the end of the file ({total} lines)")
+
+    page: list[str] = []
+    used = 0
+    end = offset
+    for line in lines[offset:offset + limit]:
+        size = len(line.encode("utf-8"))
+        if used + size > READ_MAX_BYTES:
+            if not page:
+                # A single line over the budget: send its head only.
+                page.append(
+                    line.encode("utf-8")[:READ_MAX_BYTES].decode(
+                        "utf-8", errors="ignore") + "\n[line truncated]\n")
+                end += 1
+            break
+        page.append(line)
+        used += size
+        end += 1
+
+    return {
+        "content": "".join(page),
+        "start_line": offset,
+        "end_line": end,
+        "total_lines": total,
+        "size": path.stat().st_size,
+        "next_offset": end if end < total else None,
+    }
+
+
+def file_entries(root: Path, directory: str = "",
+                 recursive: bool = True) -> list[tuple[str, int]]:
+    """Sorted (relative path, size) pairs for files under `directory`.
+
+    Raises FileNotFoundError or NotADirectoryError if `directory` is missing
+    or names a file.
+    """
+    entries: list[tuple[str, int]] = []
+    pending = [root / directory if directory else root]
+    while pending:
+        with os.scandir(pending.pop()) as it:
+            for entry in it:
+                if entry.is_file():
+                    rel = Path(entry.path).relative_to(root).as_posix()
+                    entries.append((rel, entry.stat().st_size))
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    pending.append(Path(entry.path))
+    entries.sort()
+    return entries
+
+
+def list_page(root: Path,
+              recursive: bool = True,
+              directory: str = "",
+              cursor: str | None = None,
+              limit: int = LIST_MAX_ENTRIES,
+              entries: list[tuple[str, int]] | None = None) -> dict:
+    """List files with sizes, one page at a time, sorted by path.
+
+    The first page of a listing that needs several pages also summarizes
+    file counts and sizes per directory. `entries` is the sorted
+    (path, size) listing when the caller already has one, e.g. from the
+    sidecar's workspace index; otherwise the directory is scanned.
+    """
+    if directory:
+        resolve_under_root(root, directory)
+    directory = directory.strip("/")
+    if entries is None:
+        entries = file_entries(root, directory, recursive)
+
+    limit = max(1, min(limit, LIST_MAX_ENTRIES))
+    start = bisect.bisect_right(entries,
+                                (cursor, float("inf"))) if cursor else 0
+    page = entries[start:start + limit]
+    has_more = start + limit < len(entries)
+
+    directories: dict[str, list[int]] = {}
+    if start == 0 and has_more:
+        prefix_len = len(directory) + 1 if directory else 0
+        for rel, size in entries:
+            head, sep, _ = rel[prefix_len:].partition("/")
+            stats = directories.setdefault(head + "/" if sep else "./",
+                                           [0, 0])
+            stats[0] += 1
+            stats[1] += size
+
+    return {
+        "files": [rel for rel, _ in page],
+        "entries": [{"path": rel, "size": size} for rel, size in page],
+        "start": start,
+        "total_files": len(entries),
+        "total_bytes": sum(size for _, size in entries),
+        "directories": [{
+            "path": name,
+            "files": count,
+            "bytes": size
+        } for name, (count, size) in sorted(directories.items())],
+        "next_cursor": page[-1][0] if has_more else None,
+    }
+
+
+def format_file_list(page: dict, directory: str = "") -> str:
+    """Render a `list_page` result as text for the model.
+
+    Outline first: totals, the directory summary when there is one, then the
+    page, and the cursor to continue from.
+    """
+    where = f"'{directory}'" if directory else "project directory"
+    lines = [(f"Files in {where}: {page['total_files']} files, "
+              f"{format_size(page['total_bytes'])}")]
+    if page["directories"]:
+        lines.append("Directories:")
+        lines.extend(f"  - {d['path']} ({d['files']} files, "
+                     f"{format_size(d['bytes'])})"
+                     for d in page["directories"])
+    start = page["start"]
+    if start > 0 or page["next_cursor"] is not None:
+        lines.append(f"Showing files {start + 1}-"
+                     f"{start + len(page['entries'])}:")
+    lines.extend(f"  - {e['path']} ({format_size(e['size'])})"
+                 for e in page["entries"])
+    if page["next_cursor"] is not None:
+        lines.append(
+            f"[More files follow: call list_files_tool with"
+            f" cursor='{page['next_cursor']}' to continue, or pass directory"
+            f" to list one folder.]")
+    return "\n".join(lines)
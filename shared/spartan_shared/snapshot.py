@@ -0,0 +1,76 @@
+"""Compact text snapshot of a project for the agent's first turn.
+
+The snapshot holds the file tree, main.tex, the outline and the diagnostics
+of the last compile, each clipped to a budget so the whole stays at a few
+thousand tokens. The sidecar builds it for `GET /snapshot` from its own
+compile results; the server builds it for /chat from main.log. Both pass in
+the last compile's text, since only they know where it comes from.
+"""
+import re
+from pathlib import Path
+
+from . import paging
+from .outline import project_outline
+
+MAIN_TEX_MAX_BYTES = 16 * 1024
+OUTLINE_MAX_BYTES = 12 * 1024
+FILES_SHOWN = 100
+DIAGNOSTICS_MAX_LINES = 40
+
+_DIAGNOSTIC_RE = re.compile(r"^!|error|warning|undefined|overfull|underfull",
+                            re.IGNORECASE)
+
+
+def clip(text: str, max_bytes: int) -> str:
+    """Cut `text` at the last line break within `max_bytes`, noting the cut."""
+    data = text.encode("utf-8")
+    if len(data) <= max_bytes:
+        return text
+    head = data[:max_bytes].decode("utf-8", errors="ignore")
+    head = head[:head.rfind("\n") + 1] or head
+    return head + f"[... truncated at {max_bytes // 1024} KB]\n"
+
+
+def diagnostics(log: str) -> str:
+    """Keep the error and warning lines of compiler output."""
+    lines = [
+        line.rstrip() for line in log.splitlines()
+        if _DIAGNOSTIC_RE.search(line)
+    ]
+    more = len(lines) - DIAGNOSTICS_MAX_LINES
+    lines = lines[:DIAGNOSTICS_MAX_LINES]
+    if more > 0:
+        lines.append(f"... {more} more")
+    return "\n".join(lines)
+
+
+def format_snapshot(files: str, main_tex: str | None, outline_text: str,
+                    last_compile: str | None) -> str:
+    parts = ["## Files", files]
+    if main_tex is not None:
+        parts += [
+            "## main.tex", "```latex\n" +
+            clip(main_tex, MAIN_TEX_MAX_BYTES).rstrip("\n") + "\n```"
+        ]
+    parts += ["## Outline", clip(outline_text, OUTLINE_MAX_BYTES).rstrip()]
+    parts += ["## Last compile", last_compile or "Not compiled yet."]
+    return "\n\n".join(parts)
+
+
+def build_snapshot(
+        root: Path,
+        last_compile: str | None,
+        entries: list[tuple[str, int]] | None = None) -> str | None:
+    """Snapshot a project, or None when it has no files.
+
+    `entries` is the sorted (path, size) listing when the caller already has
+    one, as for paging.list_page.
+    """
+    page = paging.list_page(root, limit=FILES_SHOWN, entries=entries)
+    if not page["total_files"]:
+        return None
+    main = root / "main.tex"
+    main_tex = (main.read_text(encoding="utf-8", errors="replace")
+                if main.is_file() else None)
+    return format_snapshot(paging.format_file_list(page), main_tex,
+                           project_outline(root), last_compile)
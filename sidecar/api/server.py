@@ -1,19 +1,25 @@
+import asyncio
 import base64
+from contextlib import asynccontextmanager
+import errno
 import os
 from pathlib import Path
 import sys
 import threading
 import time
 
-import httpx
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import (FileResponse, PlainTextResponse, Response,
+                               StreamingResponse)
+from starlette.routing import Match
 from pydantic import BaseModel
 
 from platformdirs import user_documents_dir
 
 from core import __version__, compiler
+from core import loop_monitor
+from core import metrics
 from core import project
 from core import settings
 
@@ -31,6 +37,8 @@ def _start_parent_watcher():
             current_parent = os.getppid()
             # On Unix, when parent dies, ppid becomes 1 (init/launchd)
             if current_parent != parent_pid or current_parent == 1:
+                # os._exit skips atexit, so write pending settings first.
+                settings.store.flush()
                 os._exit(0)
 
     thread = threading.Thread(target=watcher, daemon=True)
@@ -58,6 +66,17 @@ class UpdateConfigRequest(BaseModel):
     workos_refresh_token: str | None = None
 
 
+class HistorySnapshotRequest(BaseModel):
+    dir: str
+    label: str = ""
+
+
+class RestoreHistoryRequest(BaseModel):
+    dir: str
+    snapshot_id: str
+    paths: list[str] | None = None
+
+
 class UpdateFileContentRequest(BaseModel):
     content: str
 
@@ -94,9 +113,70 @@ class UsageInfoRequest(BaseModel):
 
 
 SPARTAN_SERVER_URL = os.getenv("SPARTAN_SERVER_URL", "http://127.0.0.1:8767")
+IMPORT_GC_INTERVAL = 60 * 60
 
+REQUEST_SECONDS = metrics.Histogram(
+    "spartan_sidecar_http_request_duration_seconds",
+    "Request latency by route, method and status code.",
+)
+REQUESTS_IN_FLIGHT = metrics.Gauge(
+    "spartan_sidecar_http_requests_in_flight",
+    "Requests being handled or waiting, by route (queue depth).",
+)
+PDF_BYTES_SERVED = metrics.Counter(
+    "spartan_sidecar_pdf_bytes_served_total",
+    "Bytes of compiled PDF returned by /pdf.",
+)
 
-app = FastAPI(title="Spartain Write - Sidecar")
+
+async def _gc_imports_periodically() -> None:
+    """Drop imports left unfinished for archive.IMPORT_TTL, once an hour."""
+    while True:
+        try:
+            # project.archive is first imported here, in the worker thread.
+            await asyncio.to_thread(lambda: project.archive.gc_imports())
+        except OSError:
+            pass
+        await asyncio.sleep(IMPORT_GC_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    lag_sampler = asyncio.create_task(metrics.sample_event_loop_lag())
+    image_gc = asyncio.create_task(project.image_store.gc_periodically())
+    import_gc = asyncio.create_task(_gc_imports_periodically())
+    try:
+        async with loop_monitor.monitor_from_env(app) as monitor:
+            app.state.loop_monitor = monitor
+            yield
+    finally:
+        lag_sampler.cancel()
+        image_gc.cancel()
+        import_gc.cancel()
+        settings.store.flush()
+
+
+app = FastAPI(title="Spartain Write - Sidecar", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    # Label by route template so unknown paths do not create new series.
+    route = next((r.path for r in app.router.routes
+                  if r.matches(request.scope)[0] == Match.FULL), "unmatched")
+    REQUESTS_IN_FLIGHT.inc(route=route)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec(route=route)
+        REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                route=route,
+                                method=request.method,
+                                status=status)
 
 
 @app.get("/health")
@@ -104,8 +184,41 @@ async def health():
     return {"status": "ok", "version": __version__}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(),
+                             media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/loop-blocks")
+async def loop_blocks():
+    monitor = app.state.loop_monitor
+    return {
+        "success": True,
+        "data": {
+            "enabled": monitor is not None,
+            "threshold_ms": monitor.threshold * 1000 if monitor else None,
+            "reports": monitor.reports() if monitor else [],
+        },
+    }
+
+
+@app.get("/debug/workspaces")
+async def debug_workspaces():
+    """Open projects, most recently used first, with their index sizes."""
+    return {
+        "success": True,
+        "data": {
+            "workspaces": project.workspace.workspaces.stats()
+        },
+    }
+
+
 @app.post("/usage-info")
 async def usage_info_proxy(request: UsageInfoRequest):
+    # Imported here: httpx is the heaviest import and only this route needs it.
+    import httpx
+
     body = request.model_dump(exclude_none=True)
     url = f"{SPARTAN_SERVER_URL.rstrip('/')}/usage-info"
     try:
@@ -153,6 +266,7 @@ async def init_project(request: InitRequest):
     try:
         dir_path = Path(request.dir)
         project.create.create_project(dir_path, request.template)
+        project.workspace.workspaces.invalidate(request.dir)
         return {
             "success": True,
             "data": {
@@ -193,18 +307,8 @@ async def compile_project(request: CompileRequest):
 @app.post("/upload-image")
 async def upload_image(request: UploadImageRequest):
     try:
-        original_filename, saved_filename, path, image_bytes = project.image.store_uploaded_image(
-            request.selected_path)
-
-        return {
-            "success": True,
-            "data": {
-                "original_filename": original_filename,
-                "saved_filename": saved_filename,
-                "path": path,
-                "image_bytes": image_bytes,
-            },
-        }
+        upload = project.image.store_uploaded_image(request.selected_path)
+        return {"success": True, "data": upload}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
@@ -219,20 +323,9 @@ async def upload_image_data(request: UploadImageDataRequest):
         raw = base64.b64decode(request.image_base64, validate=True)
         if len(raw) > 25 * 1024 * 1024:
             raise ValueError("Image exceeds maximum size (25MB)")
-        original_filename, saved_filename, path, image_bytes = (
-            project.image.store_uploaded_image_bytes(
-                request.original_filename, raw
-            )
-        )
-        return {
-            "success": True,
-            "data": {
-                "original_filename": original_filename,
-                "saved_filename": saved_filename,
-                "path": path,
-                "image_bytes": image_bytes,
-            },
-        }
+        upload = project.image.store_uploaded_image_bytes(
+            request.original_filename, raw)
+        return {"success": True, "data": upload}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
@@ -241,6 +334,36 @@ async def upload_image_data(request: UploadImageDataRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/upload-image-stream")
+async def upload_image_stream(request: Request,
+                              filename: str = Query(default="image")):
+    """Store a raw-body image upload without buffering it in memory."""
+    try:
+        writer = project.image.UploadWriter(filename)
+        try:
+            async for chunk in request.stream():
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return {"success": True, "data": writer.finish()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/uploaded-image/{handle}")
+async def get_uploaded_image(handle: str):
+    try:
+        path = project.image.get_uploaded_image_path(handle)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # Handles are unique per upload, so the content never changes.
+    return FileResponse(path,
+                        headers={"Cache-Control": "private, max-age=3600"})
+
+
 @app.delete("/upload-image")
 async def delete_uploaded_image(request: RemoveUploadedImageRequest):
     try:
@@ -262,10 +385,11 @@ async def delete_uploaded_image(request: RemoveUploadedImageRequest):
 
 @app.post("/move-image-to-project")
 async def move_image_to_project(request: MoveImageToProjectRequest):
+    workspace = _workspace(request.project_dir)
     try:
         moved_path = project.image.move_uploaded_image_to_project(
-            request.uploaded_path, Path(request.project_dir),
-            request.target_dir)
+            request.uploaded_path, workspace.root, request.target_dir)
+        workspace.invalidate(moved_path)
         return {"success": True, "data": {"moved_path": moved_path}}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -273,32 +397,112 @@ async def move_image_to_project(request: MoveImageToProjectRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _workspace(dir: str) -> "project.workspace.Workspace":
+    """The project's open workspace; 404 if the directory does not exist.
+
+    Call it outside an endpoint's try block, so the 404 is not turned into
+    a 500 by its catch-all.
+    """
+    try:
+        return project.workspace.workspaces.get(dir)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @app.get("/files")
-async def list_files(dir: str = Query(...)):
+async def list_files(
+        dir: str = Query(...),
+        detail: bool = Query(default=False),
+        recursive: bool = Query(default=True),
+        directory: str = Query(default=""),
+        cursor: str | None = Query(default=None),
+        limit: int = Query(default=project.read.LIST_MAX_ENTRIES),
+):
+    workspace = _workspace(dir)
     try:
-        dir_path = Path(dir)
-        files = project.read.list_files(dir_path)
-        return {"success": True, "data": {"files": files}}
+        if not detail:
+            return {"success": True, "data": {"files": workspace.files()}}
+        page = project.read.list_file_page(
+            workspace.root, recursive, directory, cursor, limit,
+            workspace.entries(directory, recursive))
+        return {"success": True, "data": page}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/files/content")
-async def get_file_content(dir: str = Query(...), file: str = Query(...)):
+async def get_file_content(
+        dir: str = Query(...),
+        file: str = Query(...),
+        offset: int | None = Query(default=None),
+        limit: int | None = Query(default=None),
+):
+    workspace = _workspace(dir)
     try:
-        file_path = Path(dir) / file
+        file_path = workspace.resolve(file)
         if not file_path.exists():
             raise HTTPException(status_code=404,
                                 detail=f"File not found: {file}")
         if not file_path.is_file():
             raise HTTPException(status_code=400,
                                 detail=f"Path is not a file: {file}")
-        content = project.read.read_file(file_path)
-        return {"success": True, "data": {"content": content, "file": file}}
+        if offset is None and limit is None:
+            content = project.read.read_file(file_path)
+            return {
+                "success": True,
+                "data": {
+                    "content": content,
+                    "file": file
+                }
+            }
+        page = project.read.read_file_page(
+            file_path, offset or 0, limit or project.read.READ_MAX_LINES)
+        return {"success": True, "data": {**page, "file": file}}
     except HTTPException:
         raise
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"File not found: {file}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/outline")
+async def get_outline(dir: str = Query(...),
+                      file: str | None = Query(default=None)):
+    # Imported here, like core.project's modules, to keep it off startup.
+    from spartan_shared.outline import project_outline
+    workspace = _workspace(dir)
+    try:
+        if file:
+            file_path = workspace.resolve(file)
+            if not file_path.is_file():
+                raise HTTPException(status_code=404,
+                                    detail=f"File not found: {file}")
+        outline = project_outline(workspace.root, file)
+        return {"success": True, "data": {"outline": outline}}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/snapshot")
+async def get_snapshot(dir: str = Query(...)):
+    workspace = _workspace(dir)
+    try:
+        snapshot = project.snapshot.build_snapshot(workspace.root,
+                                                   workspace.entries())
+        return {"success": True, "data": {"snapshot": snapshot}}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -309,18 +513,24 @@ async def update_file_content(
         file: str = Query(...),
         request: UpdateFileContentRequest = None,
 ):
+    workspace = _workspace(dir)
     try:
-        file_path = Path(dir) / file
+        file_path = workspace.resolve(file, for_write=True)
         project.edit.edit_file(file_path, request.content)
+        workspace.invalidate(file)
         return {"success": True, "data": {"message": f"File updated: {file}"}}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.delete("/files/content")
 async def delete_file_content(dir: str = Query(...), file: str = Query(...)):
+    workspace = _workspace(dir)
     try:
-        project.fs_ops.delete_file(Path(dir), file)
+        project.fs_ops.delete_file(workspace.root, file)
+        workspace.invalidate(file)
         return {"success": True, "data": {"message": f"File deleted: {file}"}}
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -332,9 +542,12 @@ async def delete_file_content(dir: str = Query(...), file: str = Query(...)):
 
 @app.post("/files/rename")
 async def rename_file(request: RenameFileRequest):
+    workspace = _workspace(request.dir)
     try:
-        project.fs_ops.rename_file(Path(request.dir), request.from_path,
+        project.fs_ops.rename_file(workspace.root, request.from_path,
                                    request.to_path)
+        workspace.invalidate(request.from_path)
+        workspace.invalidate(request.to_path)
         return {
             "success": True,
             "data": {
@@ -357,6 +570,7 @@ async def get_pdf(dir: str = Query(...)):
         if not pdf_path.exists():
             raise HTTPException(status_code=404, detail="main.pdf not found")
         pdf_bytes = pdf_path.read_bytes()
+        PDF_BYTES_SERVED.inc(len(pdf_bytes))
         return Response(content=pdf_bytes, media_type="application/pdf")
     except HTTPException:
         raise
@@ -364,6 +578,144 @@ async def get_pdf(dir: str = Query(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/history")
+async def list_history(dir: str = Query(...)):
+    try:
+        snapshots = await asyncio.to_thread(project.history.list_snapshots,
+                                            Path(dir))
+        return {"success": True, "data": {"snapshots": snapshots}}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/history")
+async def take_history_snapshot(request: HistorySnapshotRequest):
+    try:
+        snapshot = await asyncio.to_thread(project.history.take_snapshot,
+                                           Path(request.dir), request.label)
+        return {"success": True, "data": snapshot}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/history/diff")
+async def diff_history(dir: str = Query(...),
+                       from_id: str = Query(..., alias="from"),
+                       to_id: str | None = Query(default=None, alias="to"),
+                       path: str | None = Query(default=None)):
+    """Changed paths between snapshots, or one file's unified diff.
+
+    Without `to`, compares against the current files.
+    """
+    try:
+        if path is None:
+            data = await asyncio.to_thread(project.history.diff, Path(dir),
+                                           from_id, to_id)
+        else:
+            data = {
+                "diff":
+                await asyncio.to_thread(project.history.file_diff, Path(dir),
+                                        path, from_id, to_id)
+            }
+        return {"success": True, "data": data}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/history/restore")
+async def restore_history(request: RestoreHistoryRequest):
+    try:
+        data = await asyncio.to_thread(project.history.restore,
+                                       Path(request.dir), request.snapshot_id,
+                                       request.paths)
+        project.workspace.workspaces.invalidate(request.dir)
+        return {"success": True, "data": data}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/export")
+async def export_project(dir: str = Query(...),
+                         offset: int = Query(default=0, ge=0),
+                         etag: str | None = Query(default=None)):
+    """Stream the project as a tar.gz; resume with the etag and a byte offset."""
+    try:
+        dir_path = Path(dir)
+        entries = await asyncio.to_thread(project.archive.export_entries,
+                                          dir_path)
+        current = project.archive.archive_etag(entries)
+        if etag is not None and etag != current:
+            raise HTTPException(
+                status_code=409,
+                detail="Project changed since the export started")
+        return StreamingResponse(
+            project.archive.iter_export(dir_path, entries, offset),
+            media_type="application/gzip",
+            headers={
+                "ETag": f'"{current}"',
+                "Content-Disposition":
+                f'attachment; filename="{dir_path.name}.tar.gz"',
+            })
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/import")
+async def import_status(id: str = Query(...)):
+    try:
+        received = project.archive.import_received(id)
+        return {"success": True, "data": {"received": received}}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/import")
+async def import_project(request: Request,
+                         dir: str = Query(...),
+                         id: str = Query(...),
+                         offset: int = Query(default=0, ge=0),
+                         complete: bool = Query(default=False)):
+    """Append a piece of an archive; extract it once `complete` is set."""
+    try:
+        upload = project.archive.ImportUpload(id, offset)
+        try:
+            async for chunk in request.stream():
+                upload.write(chunk)
+        finally:
+            upload.close()
+        data = {"received": upload.received, "complete": complete}
+        if complete:
+            data.update(await asyncio.to_thread(
+                project.archive.extract_import, id, Path(dir)))
+            project.workspace.workspaces.invalidate(dir)
+        return {"success": True, "data": data}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OSError as e:
+        if e.errno == errno.ENOSPC:
+            # What was staged is kept; the client can resume later.
+            raise HTTPException(status_code=507, detail=e.strerror)
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/config")
 async def get_config(key: str | None = Query(default=None)):
     try:
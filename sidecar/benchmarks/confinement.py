@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Measure project-root confinement checks per second.
+
+Compares spartan_shared.confine.resolve_under_root with the check it replaced,
+which resolved the root and the candidate path on every call, for a file at
+the root, a file a few directories deep, and a file reached through a
+symlinked directory (which still takes the resolve() fallback).
+
+Usage:
+    uv run python benchmarks/confinement.py [--seconds 1.0]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from spartan_shared.confine import resolve_under_root  # noqa: E402
+
+
+def resolve_every_time(root: Path, relative: str) -> Path:
+    """The previous check: two full resolve() calls per path."""
+    root_r = root.resolve()
+    candidate = (root_r / relative).resolve()
+    try:
+        candidate.relative_to(root_r)
+    except ValueError as e:
+        raise ValueError(f"Path escapes project root: {relative!r}") from e
+    return candidate
+
+
+def build_project(root: Path) -> None:
+    deep = root / "chapters" / "part1" / "sections"
+    deep.mkdir(parents=True)
+    (root / "main.tex").write_text("\\documentclass{article}\n")
+    (deep / "intro.tex").write_text("\\section{Intro}\n")
+    os.symlink(root / "chapters", root / "linked")
+
+
+def ops_per_second(check, root: Path, relative: str, seconds: float) -> float:
+    calls = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            check(root, relative)
+        calls += 100
+    return calls / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=1.0,
+                        help="time spent on each case")
+    args = parser.parse_args()
+
+    cases = [
+        ("root file", "main.tex"),
+        ("nested file", "chapters/part1/sections/intro.tex"),
+        ("via symlink", "linked/part1/sections/intro.tex"),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        # A root reached through a symlink, like /tmp on macOS.
+        real = Path(tmp) / "real"
+        real.mkdir()
+        build_project(real)
+        root = Path(tmp) / "project"
+        os.symlink(real, root)
+
+        for label, relative in cases:
+            assert (resolve_under_root(root, relative)
+                    == resolve_every_time(root, relative))
+            before = ops_per_second(resolve_every_time, root, relative,
+                                    args.seconds)
+            after = ops_per_second(resolve_under_root, root, relative,
+                                   args.seconds)
+            print(f"{label:12s} resolve {before:>10,.0f}/s   "
+                  f"confine {after:>10,.0f}/s   x{after / before:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Measure what the figure pipeline saves in figure bytes, compile time and PDF
+size.
+
+Builds two copies of a project from a template, each with the same generated
+figures (camera-sized photos as JPEG and large screenshots as PNG), moves the
+images in through the upload path once with SPARTAN_FIGURE_OPTIMIZE off and
+once with it on, and compiles both with Tectonic. Without a Tectonic binary
+(see core.compiler.compile_project for where it is looked up) the compiles
+fail and only the figure sizes and placement times are reported.
+
+Needs Pillow (`uv sync --extra figures`).
+
+Usage:
+    uv run python benchmarks/figures.py [--template ieee-two] [--figures 4]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from core import compiler, project  # noqa: E402
+from core.project import figures  # noqa: E402
+
+
+def photo(seed: int) -> Image.Image:
+    """A 4000x3000 image with smooth gradients and sensor-like noise."""
+    rng = random.Random(seed)
+    img = Image.linear_gradient("L").resize((4000, 3000)).convert("RGB")
+    noise = Image.effect_noise((4000, 3000), 24).convert("RGB")
+    tint = Image.new("RGB", (4000, 3000),
+                     tuple(rng.randrange(256) for _ in range(3)))
+    return Image.blend(Image.blend(img, tint, 0.4), noise, 0.15)
+
+
+def screenshot(seed: int) -> Image.Image:
+    """A 3000x2000 image of flat panels, text and an embedded photo."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (3000, 2000), "white")
+    img.paste(photo(seed).resize((1400, 1000)), (1500, 900))
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rng.randrange(3000), rng.randrange(2000)
+        draw.rectangle((x, y, x + rng.randrange(400), y + rng.randrange(200)),
+                       fill=tuple(rng.randrange(256) for _ in range(3)))
+    for row in range(0, 2000, 24):
+        draw.text((40, row), "lorem ipsum dolor sit amet " * 8, fill="black")
+    return img
+
+
+def make_figures(count: int, dest: Path) -> list[Path]:
+    paths = []
+    for i in range(count):
+        if i % 2 == 0:
+            path = dest / f"photo-{i}.jpg"
+            photo(i).save(path, quality=95)
+        else:
+            path = dest / f"screenshot-{i}.png"
+            screenshot(i).save(path)
+        paths.append(path)
+    return paths
+
+
+def build_project(root: Path, template: str, sources: list[Path],
+                  optimize: bool) -> tuple[Path, float]:
+    project.create.create_project(root, template)
+    os.environ[figures.ENABLE_ENV] = "1" if optimize else "0"
+    started = time.perf_counter()
+    placed = []
+    for source in sources:
+        upload = project.image.store_uploaded_image(str(source))
+        placed.append(
+            project.image.move_uploaded_image_to_project(upload["path"], root))
+    elapsed = time.perf_counter() - started
+
+    includes = "\n".join(
+        "\\begin{figure}[t]\\centering"
+        f"\\includegraphics[width=\\columnwidth]{{{rel}}}"
+        "\\end{figure}" for rel in placed)
+    main = root / "main.tex"
+    text = main.read_text(encoding="utf-8")
+    main.write_text(text.replace("\\end{document}",
+                                 f"{includes}\n\\end{{document}}"),
+                    encoding="utf-8")
+    return root, elapsed
+
+
+def figure_bytes(root: Path) -> int:
+    return sum(p.stat().st_size for p in (root / "figures").iterdir())
+
+
+def compile_seconds(root: Path, runs: int) -> tuple[float, int] | None:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = compiler.compile_project(root, timeout=300)
+        times.append(time.perf_counter() - started)
+        if not result.success:
+            print(f"  compile failed: {result.stderr.strip()[:200]}")
+            return None
+    return statistics.median(times), (root / "main.pdf").stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--template", default="ieee-two")
+    parser.add_argument("--figures", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "sources").mkdir()
+        sources = make_figures(args.figures, tmp / "sources")
+        for label, optimize in (("original", False), ("optimized", True)):
+            root, elapsed = build_project(tmp / label, args.template, sources,
+                                          optimize)
+            print(f"{label}: figures {figure_bytes(root) / 1e6:.1f} MB, "
+                  f"placed in {elapsed * 1000:.0f} ms")
+            compiled = compile_seconds(root, args.runs)
+            if compiled is not None:
+                seconds, pdf_bytes = compiled
+                print(f"  compile median {seconds:.2f} s, "
+                      f"main.pdf {pdf_bytes / 1e6:.1f} MB")
+
+        # A second placement of the same images comes from the variant cache.
+        _, cached = build_project(tmp / "cached", args.template, sources,
+                                  True)
+        print(f"optimized again (cached variants): {cached * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
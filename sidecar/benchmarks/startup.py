@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Measure sidecar cold start: time from launch to the first healthy /health.
+
+Each run starts a fresh sidecar process, polls /health until it answers 200,
+records the elapsed time and stops the process. By default the sidecar runs
+from source with the current interpreter; pass --binary to time a PyInstaller
+build instead (e.g. the one-file sidecar in frontend/src-tauri/bin or the
+one-dir build from `build.py --onedir`).
+
+Also reports how long `import api.server` takes on its own, which is the part
+lazy imports can shrink.
+
+Usage:
+    uv run python benchmarks/startup.py [--runs 10] [--binary PATH]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+SIDECAR_DIR = Path(__file__).resolve().parent.parent
+HEALTH_URL = "http://127.0.0.1:8768/health"
+
+
+def healthy() -> bool:
+    try:
+        with urllib.request.urlopen(HEALTH_URL, timeout=0.5) as resp:
+            return resp.status == 200
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return False
+
+
+def time_to_healthy(cmd: list[str], timeout: float) -> float:
+    if healthy():
+        raise RuntimeError(f"Something is already serving {HEALTH_URL}")
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd,
+                            cwd=SIDECAR_DIR,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+    try:
+        while not healthy():
+            if proc.poll() is not None:
+                raise RuntimeError(
+                    f"Sidecar exited with code {proc.returncode}")
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"No healthy /health after {timeout}s")
+            time.sleep(0.005)
+        return time.perf_counter() - start
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def import_seconds() -> float:
+    out = subprocess.run(
+        [
+            sys.executable, "-c",
+            "import time; s = time.perf_counter(); import api.server; "
+            "print(time.perf_counter() - s)"
+        ],
+        cwd=SIDECAR_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={
+            **os.environ, "PYTHONDONTWRITEBYTECODE": "1"
+        },
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--binary", type=Path, default=None)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    if args.binary:
+        cmd = [str(args.binary.resolve())]
+        label = args.binary.name
+    else:
+        cmd = [sys.executable, "-c", "from api.server import main; main()"]
+        label = "source"
+
+    # The first launch warms the OS file cache and is reported separately.
+    first = time_to_healthy(cmd, args.timeout)
+    runs = [time_to_healthy(cmd, args.timeout) for _ in range(args.runs)]
+    print(f"{label}: first {first * 1000:.0f} ms, "
+          f"median {statistics.median(runs) * 1000:.0f} ms, "
+          f"min {min(runs) * 1000:.0f} ms, "
+          f"max {max(runs) * 1000:.0f} ms over {len(runs)} runs")
+    if not args.binary:
+        imports = [import_seconds() for _ in range(min(args.runs, 5))]
+        print(f"import api.server: median "
+              f"{statistics.median(imports) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
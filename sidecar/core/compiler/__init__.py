@@ -1,3 +1,3 @@
-from .compile import compile_project, CompileResult
+from .compile import compile_project, last_result, CompileResult
 
-__all__ = ["compile_project", "CompileResult"]
+__all__ = ["compile_project", "last_result", "CompileResult"]
@@ -4,6 +4,23 @@ from pathlib import Path
 from dataclasses import dataclass
 import subprocess
 import platform
+import threading
+import time
+
+from core import metrics
+
+COMPILES = metrics.Counter(
+    "spartan_sidecar_compiles_total",
+    "Compilations by result (success, failure, timeout, error).",
+)
+COMPILE_SECONDS = metrics.Histogram(
+    "spartan_sidecar_compile_duration_seconds",
+    "Wall time of Tectonic compilations.",
+)
+COMPILES_IN_FLIGHT = metrics.Gauge(
+    "spartan_sidecar_compiles_in_flight",
+    "Compilations currently running.",
+)
 
 
 @dataclass
@@ -15,6 +32,17 @@ class CompileResult:
     stderr: str
 
 
+# Latest result per project directory, for snapshots of the project state.
+_last_results: dict[str, CompileResult] = {}
+_last_results_lock = threading.Lock()
+
+
+def last_result(dir: Path) -> CompileResult | None:
+    """Return the latest compilation result for a project, if any."""
+    with _last_results_lock:
+        return _last_results.get(str(dir.resolve()))
+
+
 def _validate_main_tex(dir: Path) -> None:
     """Validate that main.tex exists in the directory."""
     main_tex = dir / "main.tex"
@@ -121,6 +149,10 @@ def compile_project(
     main_tex = dir / "main.tex"
     pdf_path = dir / "main.pdf"
 
+    COMPILES_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    outcome = "error"
+    compiled: CompileResult | None = None
     try:
         result = _run_tectonic(
             tectonic_path=tectonic_bin,
@@ -132,24 +164,36 @@ def compile_project(
         )
 
         success = result.returncode == 0
-        return CompileResult(
+        outcome = "success" if success else "failure"
+        compiled = CompileResult(
             success=success,
             pdf_path=pdf_path if success and pdf_path.exists() else None,
             stdout=result.stdout,
             stderr=result.stderr,
         )
+        return compiled
 
     except subprocess.TimeoutExpired as e:
-        return CompileResult(
+        outcome = "timeout"
+        compiled = CompileResult(
             success=False,
             pdf_path=None,
             stdout=e.stdout if e.stdout else "",
             stderr=f"Compilation timed out after {timeout} seconds",
         )
+        return compiled
     except Exception as e:
-        return CompileResult(
+        compiled = CompileResult(
             success=False,
             pdf_path=None,
             stdout="",
             stderr=str(e),
         )
+        return compiled
+    finally:
+        COMPILES_IN_FLIGHT.dec()
+        COMPILES.inc(result=outcome)
+        COMPILE_SECONDS.observe(time.perf_counter() - started)
+        if compiled is not None:
+            with _last_results_lock:
+                _last_results[str(dir.resolve())] = compiled
@@ -0,0 +1,23 @@
+"""Debug-mode detector for code that blocks the event loop.
+
+The monitor itself lives in spartan_shared.loop_monitor; this module only
+names the metric blocks are counted on. See that module for the
+SPARTAN_LOOP_MONITOR and SPARTAN_LOOP_BLOCK_MS settings.
+"""
+from contextlib import AbstractAsyncContextManager
+
+from fastapi import FastAPI
+from spartan_shared import loop_monitor
+from spartan_shared.loop_monitor import LoopMonitor
+
+from core import metrics
+
+LOOP_BLOCKS = metrics.Counter(
+    "spartan_sidecar_event_loop_blocks_total",
+    "Times the event loop was blocked past the threshold, by route.",
+)
+
+
+def monitor_from_env(
+        app: FastAPI) -> AbstractAsyncContextManager[LoopMonitor | None]:
+    return loop_monitor.monitor_from_env(app, blocks=LOOP_BLOCKS)
@@ -0,0 +1,44 @@
+"""The sidecar's metrics, on the shared primitives in spartan_shared.metrics.
+
+The metric types, `timed`/`timed_call` and `render` are re-exported, so
+modules keep using `from core import metrics`; this module adds the series
+several sidecar modules share.
+"""
+from spartan_shared import metrics as _shared
+from spartan_shared.metrics import (DEFAULT_BUCKETS, Collector, Counter,
+                                    Gauge, Histogram, render, timed,
+                                    timed_call)
+
+__all__ = [
+    "DEFAULT_BUCKETS", "Collector", "Counter", "Gauge", "Histogram",
+    "render", "timed", "timed_call", "CACHE_LOOKUPS", "FILE_IO_SECONDS",
+    "EVENT_LOOP_LAG", "EVENT_LOOP_LAG_MAX", "sample_event_loop_lag"
+]
+
+CACHE_LOOKUPS = Counter(
+    "spartan_sidecar_cache_lookups_total",
+    "Lookups in sidecar caches by cache name and result (hit, miss).",
+)
+
+FILE_IO_SECONDS = Histogram(
+    "spartan_sidecar_file_io_seconds",
+    "Latency of project file operations by op.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+             1.0),
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "spartan_sidecar_event_loop_lag_seconds",
+    "How late the event loop ran a periodic timer.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_LAG_MAX = Gauge(
+    "spartan_sidecar_event_loop_lag_max_seconds",
+    "Largest event loop lag seen since start.",
+)
+
+
+async def sample_event_loop_lag(interval: float = 0.5) -> None:
+    """Run forever, recording event loop lag on the sidecar's metrics."""
+    await _shared.sample_event_loop_lag(EVENT_LOOP_LAG, EVENT_LOOP_LAG_MAX,
+                                        interval)
@@ -1,3 +1,21 @@
-from . import create, read, edit, image, fs_ops
+"""Project files: creation, reading and editing, images, history, archives.
 
-__all__ = ["create", "read", "edit", "image", "fs_ops"]
+Submodules are imported on first use, e.g. `project.archive` on the first
+export, so starting the sidecar only pays for what a session actually uses.
+build.py bundles them all explicitly, since the frozen build cannot see these
+imports.
+"""
+import importlib
+
+__all__ = [
+    "archive", "create", "read", "edit", "figures", "history", "image",
+    "image_store", "fs_ops", "snapshot", "template_pack", "workspace"
+]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        # Importing a submodule also sets it on the package, so this runs
+        # once per name.
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
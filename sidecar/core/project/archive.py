@@ -0,0 +1,304 @@
+"""Single-file project archives for moving a project between machines.
+
+An export is a gzip-compressed tar whose first member, MANIFEST_NAME, lists
+every file with its size and SHA-256. Entries are sorted and their metadata
+normalized, so exporting an unchanged project twice gives the same bytes;
+the etag is a hash of the manifest, and an interrupted download resumes at a
+byte offset by regenerating the stream and skipping what was already sent.
+Build intermediates and dot-directories are left out.
+
+An import is uploaded in pieces to a staging file, keyed by a client-chosen
+id, and continues from the bytes already received after an interruption.
+Staging files live under the user data dir, not the runtime dir, which may be
+a tmpfs cleared on logout; one left untouched for IMPORT_TTL is removed by
+`gc_imports`. An import may not grow past SPARTAN_IMPORT_MAX_BYTES (default
+2 GiB), nor fill the disk to less than IMPORT_MIN_FREE_BYTES.
+Once complete, the archive is extracted one file at a time and each file is
+checked against the manifest. Files already in place with the right hash are
+not rewritten, so a retried import only does the remaining work.
+
+Both directions hold one chunk in memory at a time.
+"""
+import errno
+import hashlib
+import json
+import os
+import re
+import shutil
+import tarfile
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from platformdirs import user_data_path
+
+from core.metrics import FILE_IO_SECONDS, timed_call
+from spartan_shared.confine import resolve_under_root
+from spartan_shared.images import file_sha256
+
+MANIFEST_NAME = ".spartan-export.json"
+MANIFEST_VERSION = 1
+CHUNK_BYTES = 1024 * 1024
+# Files LaTeX tools regenerate on every compile.
+EXCLUDED_SUFFIXES = (".aux", ".log", ".out", ".toc", ".lof", ".lot", ".fls",
+                     ".fdb_latexmk", ".synctex", ".synctex.gz", ".xdv", ".bcf",
+                     ".blg", ".run.xml", ".nav", ".snm", ".vrb")
+
+MAX_BYTES_ENV = "SPARTAN_IMPORT_MAX_BYTES"
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Room left on the disk after staging or extracting an import.
+IMPORT_MIN_FREE_BYTES = 512 * 1024 * 1024
+# A paused import is kept this long after its last piece arrived.
+IMPORT_TTL = 7 * 24 * 60 * 60
+
+_UPLOAD_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def _excluded(relative: str) -> bool:
+    return relative.endswith(EXCLUDED_SUFFIXES)
+
+
+def export_entries(root: Path) -> list[dict]:
+    """List the files an export of `root` contains, in archive order."""
+    if not root.is_dir():
+        raise FileNotFoundError(f"Directory not found: {root}")
+    entries = []
+    for current, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        base = Path(current)
+        for name in sorted(files):
+            path = base / name
+            relative = path.relative_to(root).as_posix()
+            if _excluded(relative) or not path.is_file():
+                continue
+            stat = path.stat()
+            entries.append({
+                "path": relative,
+                "size": stat.st_size,
+                "mtime": int(stat.st_mtime),
+                "sha256": file_sha256(path),
+            })
+    return entries
+
+
+def _manifest_bytes(entries: list[dict]) -> bytes:
+    manifest = {"version": MANIFEST_VERSION, "files": entries}
+    return json.dumps(manifest, sort_keys=True,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def archive_etag(entries: list[dict]) -> str:
+    return hashlib.sha256(_manifest_bytes(entries)).hexdigest()
+
+
+def _tar_header(name: str, size: int, mtime: int) -> bytes:
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = mtime
+    info.mode = 0o644
+    return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+
+def _padding(size: int) -> bytes:
+    return b"\0" * (-size % tarfile.BLOCKSIZE)
+
+
+def _tar_stream(root: Path, entries: list[dict]) -> Iterator[bytes]:
+    manifest = _manifest_bytes(entries)
+    yield _tar_header(MANIFEST_NAME, len(manifest), 0)
+    yield manifest + _padding(len(manifest))
+    for entry in entries:
+        yield _tar_header(entry["path"], entry["size"], entry["mtime"])
+        remaining = entry["size"]
+        with (root / entry["path"]).open("rb") as fp:
+            while remaining:
+                chunk = fp.read(min(CHUNK_BYTES, remaining))
+                if not chunk:
+                    raise RuntimeError(
+                        f"File changed during export: {entry['path']}")
+                remaining -= len(chunk)
+                yield chunk
+        yield _padding(entry["size"])
+    yield b"\0" * (2 * tarfile.BLOCKSIZE)
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    # zlib's gzip wrapper writes no timestamp or name, unlike the gzip module.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def iter_export(root: Path,
+                entries: list[dict],
+                offset: int = 0) -> Iterator[bytes]:
+    """Yield the compressed archive of `entries`, starting at byte `offset`."""
+    for chunk in _gzip(_tar_stream(root, entries)):
+        if offset >= len(chunk):
+            offset -= len(chunk)
+            continue
+        yield chunk[offset:]
+        offset = 0
+
+
+def max_import_bytes() -> int:
+    try:
+        return max(1, int(os.getenv(MAX_BYTES_ENV, DEFAULT_MAX_BYTES)))
+    except ValueError:
+        return DEFAULT_MAX_BYTES
+
+
+def imports_dir() -> Path:
+    return user_data_path(appname="spartan-write") / "imports"
+
+
+def _staging_path(upload_id: str) -> Path:
+    if not _UPLOAD_ID_PATTERN.match(upload_id):
+        raise ValueError(f"Invalid import id: {upload_id!r}")
+    staging = imports_dir()
+    staging.mkdir(parents=True, exist_ok=True)
+    return staging / f"{upload_id}.part"
+
+
+def _room(directory: Path) -> int:
+    """Bytes that can be written to `directory`'s disk, keeping the margin."""
+    return shutil.disk_usage(directory).free - IMPORT_MIN_FREE_BYTES
+
+
+def gc_imports(now: float | None = None) -> int:
+    """Remove staged imports nothing has written to for IMPORT_TTL."""
+    now = time.time() if now is None else now
+    staging = imports_dir()
+    if not staging.is_dir():
+        return 0
+    removed = 0
+    with os.scandir(staging) as it:
+        for entry in it:
+            if (entry.is_file(follow_symlinks=False)
+                    and now - entry.stat().st_mtime > IMPORT_TTL):
+                Path(entry.path).unlink(missing_ok=True)
+                removed += 1
+    return removed
+
+
+def import_received(upload_id: str) -> int:
+    """Bytes of an import already staged, i.e. where to resume."""
+    try:
+        return _staging_path(upload_id).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+class ImportUpload:
+    """Append one piece of an import archive at a known offset.
+
+    A piece that takes the import past max_import_bytes() deletes it, since
+    it can never complete; one that would leave too little free disk raises
+    but keeps what was staged, so the import can resume once there is room.
+    """
+
+    def __init__(self, upload_id: str, offset: int):
+        self.path = _staging_path(upload_id)
+        received = import_received(upload_id)
+        if offset != received:
+            raise ValueError(
+                f"Import {upload_id} has {received} bytes, not {offset}")
+        self._max_bytes = max_import_bytes()
+        # Re-measured only once this piece has used up the room seen here.
+        self._room = _room(self.path.parent)
+        self._file = self.path.open("ab")
+        self.received = received
+
+    def write(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        if self.received + len(chunk) > self._max_bytes:
+            self.close()
+            self.path.unlink(missing_ok=True)
+            raise ValueError(
+                f"Import exceeds maximum size ({self._max_bytes} bytes)")
+        if len(chunk) > self._room:
+            self._room = _room(self.path.parent)
+            if len(chunk) > self._room:
+                raise OSError(errno.ENOSPC,
+                              "Not enough free disk space for the import")
+        self._file.write(chunk)
+        self._room -= len(chunk)
+        self.received += len(chunk)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _extract_member(tar: tarfile.TarFile, member: tarfile.TarInfo,
+                    target: Path, expected: dict) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    try:
+        source = tar.extractfile(member)
+        with tmp.open("wb") as fp:
+            while chunk := source.read(CHUNK_BYTES):
+                digest.update(chunk)
+                fp.write(chunk)
+        if digest.hexdigest() != expected["sha256"]:
+            raise ValueError(f"Checksum mismatch for {member.name}")
+        os.utime(tmp, (expected["mtime"], expected["mtime"]))
+        os.replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+@timed_call(FILE_IO_SECONDS, op="import")
+def extract_import(upload_id: str, root: Path) -> dict:
+    """Extract a fully staged import into `root` and remove the staging file."""
+    archive = _staging_path(upload_id)
+    if not archive.exists():
+        raise FileNotFoundError(f"No staged import: {upload_id}")
+    root.mkdir(parents=True, exist_ok=True)
+    written = skipped = 0
+    try:
+        with tarfile.open(archive, mode="r|gz") as tar:
+            first = tar.next()
+            if first is None or first.name != MANIFEST_NAME:
+                raise ValueError("Not a project archive: manifest missing")
+            manifest = json.loads(tar.extractfile(first).read())
+            if manifest.get("version") != MANIFEST_VERSION:
+                raise ValueError("Unsupported project archive version")
+            expected = {entry["path"]: entry for entry in manifest["files"]}
+            needed = sum(entry["size"] for entry in manifest["files"])
+            if needed > _room(root):
+                # Not the archive's fault: keep it so the import can retry.
+                raise OSError(
+                    errno.ENOSPC,
+                    f"Not enough free disk space to extract {needed} bytes")
+            while (member := tar.next()) is not None:
+                entry = expected.get(member.name)
+                if entry is None or not member.isfile():
+                    raise ValueError(
+                        f"Unexpected archive entry: {member.name}")
+                target = resolve_under_root(root,
+                                            member.name,
+                                            for_write=True)
+                if (target.is_file()
+                        and target.stat().st_size == entry["size"]
+                        and file_sha256(target) == entry["sha256"]):
+                    skipped += 1
+                    continue
+                _extract_member(tar, member, target, entry)
+                written += 1
+    except (tarfile.TarError, EOFError, zlib.error) as e:
+        archive.unlink(missing_ok=True)
+        raise ValueError(f"Corrupt project archive: {e}") from e
+    except ValueError:
+        # A bad archive will not get better; let the client start over.
+        archive.unlink(missing_ok=True)
+        raise
+    archive.unlink()
+    return {"files": written, "skipped": skipped}
@@ -1,82 +1,160 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import importlib.resources
+import hashlib
 import json
-from typing import Dict, Any
+import os
 import sys
+import threading
+from typing import Dict, Any
 
+from platformdirs import user_cache_path
 
-def load_manifest() -> Dict[str, Any]:
-    try:
-        manifest_path = importlib.resources.files(
-            "core.project.templates") / "manifest.json"
+from core.metrics import CACHE_LOOKUPS, FILE_IO_SECONDS, timed_call
+from spartan_shared.images import clone_file
+from .template_pack import PACK_NAME, TemplatePack
 
-        if not manifest_path.exists():
-            raise FileNotFoundError("manifest.json not found")
+# Files at least this large are cloned from a shared cached copy when the
+# filesystem supports it, instead of written out again for every project.
+LINK_MIN_BYTES = 64 * 1024
+# Hardlinks share one inode between projects, so an in-place write to one
+# copy shows in all of them. edit_file breaks the link first, but other tools
+# may not; hence opt-in.
+HARDLINK_ENV = "SPARTAN_TEMPLATE_HARDLINKS"
 
-        return json.loads(manifest_path.read_text(encoding='utf-8'))
-    except (AttributeError, ModuleNotFoundError, TypeError) as e:
-        if getattr(sys, 'frozen', False):
-            base_path = Path(sys._MEIPASS)
-            manifest_path = base_path / "core" / "project" / "templates" / "manifest.json"
-        else:
-            base_path = Path(__file__).parent
-            manifest_path = base_path / "templates" / "manifest.json"
+_write_pool = ThreadPoolExecutor(max_workers=8,
+                                 thread_name_prefix="template-write")
+_cache_lock = threading.Lock()
+_pack: TemplatePack | None = None
+_pack_checked = False
+_manifest: Dict[str, Any] | None = None
+# template id -> relative path -> (sha256, bytes)
+_templates: Dict[str, Dict[str, tuple[str, bytes]]] = {}
+
+
+def _package_dir() -> Path:
+    if getattr(sys, 'frozen', False):
+        # PyInstaller extracts data files under sys._MEIPASS
+        return Path(sys._MEIPASS) / "core" / "project"
+    return Path(__file__).parent
+
+
+def _get_pack() -> TemplatePack | None:
+    """Return the bundled template pack, or None in a source checkout."""
+    global _pack, _pack_checked
+    if not _pack_checked:
+        path = _package_dir() / PACK_NAME
+        _pack = TemplatePack(path) if path.exists() else None
+        _pack_checked = True
+    return _pack
 
-        if not manifest_path.exists():
-            raise FileNotFoundError("manifest.json not found") from e
 
-        return json.loads(manifest_path.read_text(encoding='utf-8'))
+def load_manifest() -> Dict[str, Any]:
+    global _manifest
+    with _cache_lock:
+        if _manifest is not None:
+            CACHE_LOOKUPS.inc(cache="template_manifest", result="hit")
+            return _manifest
+        CACHE_LOOKUPS.inc(cache="template_manifest", result="miss")
+        pack = _get_pack()
+        if pack is not None:
+            _manifest = pack.manifest
+        else:
+            manifest_path = _package_dir() / "templates" / "manifest.json"
+            if not manifest_path.exists():
+                raise FileNotFoundError("manifest.json not found")
+            _manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        return _manifest
 
 
-def _collect_template_files(template_root: Path) -> Dict[str, bytes]:
-    """Map posix relative paths (from template root) to raw file bytes."""
-    files: Dict[str, bytes] = {}
+def _collect_template_files(
+        template_root: Path) -> Dict[str, tuple[str, bytes]]:
+    """Map posix relative paths (from template root) to (sha256, bytes)."""
+    files: Dict[str, tuple[str, bytes]] = {}
     for file_path in template_root.rglob("*"):
         if file_path.is_file():
             rel = file_path.relative_to(template_root)
-            files[rel.as_posix()] = file_path.read_bytes()
+            data = file_path.read_bytes()
+            files[rel.as_posix()] = (hashlib.sha256(data).hexdigest(), data)
     return files
 
 
-def load_template(template: str) -> Dict[str, bytes]:
-    try:
-        template_ref = importlib.resources.files(
-            "core.project.templates") / template
-
-        template_path = Path(template_ref)
-
-        if not template_path.exists():
-            raise FileNotFoundError(f"Template '{template}' not found")
-
-        return _collect_template_files(template_path)
-    except (AttributeError, ModuleNotFoundError, TypeError) as e:
-        # Fallback for frozen PyInstaller or development
-        if getattr(sys, 'frozen', False):
-            # PyInstaller extracts to sys._MEIPASS
-            base_path = Path(sys._MEIPASS)
+def _template_entries(template: str) -> Dict[str, tuple[str, bytes]]:
+    """Return a template's files, reading them only on first use."""
+    with _cache_lock:
+        cached = _templates.get(template)
+        if cached is not None:
+            CACHE_LOOKUPS.inc(cache="templates", result="hit")
+            return cached
+        CACHE_LOOKUPS.inc(cache="templates", result="miss")
+        pack = _get_pack()
+        if pack is not None:
+            digests = pack.files(template)
+            blobs = pack.read_blobs(set(digests.values()))
+            files = {rel: (d, blobs[d]) for rel, d in digests.items()}
         else:
-            # Development: relative to this file
-            base_path = Path(__file__).parent
-        template_path = base_path / "core" / "project" / "templates" / template if getattr(
-            sys, 'frozen', False) else base_path / "templates" / template
+            template_path = _package_dir() / "templates" / template
+            if not template_path.is_dir():
+                raise FileNotFoundError(f"Template '{template}' not found")
+            files = _collect_template_files(template_path)
+        _templates[template] = files
+        return files
 
-        if not template_path.exists():
-            raise FileNotFoundError(f"Template '{template}' not found") from e
 
-        return _collect_template_files(template_path)
+def load_template(template: str) -> Dict[str, bytes]:
+    return {
+        rel: data
+        for rel, (_, data) in _template_entries(template).items()
+    }
 
 
+def _shared_copy(digest: str, data: bytes) -> Path | None:
+    """Return an on-disk copy of a large template file to clone or link from."""
+    path = user_cache_path(appname="spartan-write") / "template-blobs" / digest
+    try:
+        if path.exists() and path.stat().st_size == len(data):
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{digest}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+        return path
+    except OSError:
+        return None
+
+
+def _write_file(target: Path, digest: str, data: bytes) -> None:
+    if len(data) >= LINK_MIN_BYTES:
+        shared = _shared_copy(digest, data)
+        if shared is not None:
+            # Never write through an existing link into the shared copy.
+            target.unlink(missing_ok=True)
+            if clone_file(shared, target):
+                return
+            if os.getenv(HARDLINK_ENV) == "1":
+                try:
+                    target.unlink(missing_ok=True)
+                    os.link(shared, target)
+                    return
+                except OSError:
+                    pass
+    target.write_bytes(data)
+
+
+@timed_call(FILE_IO_SECONDS, op="create")
 def create_project(path: Path, template: str) -> None:
     # click.echo(
     #     f"+ Creating a new LaTeX project using the {template} template...")
 
-    template_files = load_template(template)
+    template_files = _template_entries(template)
 
     path.mkdir(parents=True, exist_ok=True)
-    for relative_path, content in template_files.items():
-        target_path = path / relative_path
-        target_path.parent.mkdir(parents=True, exist_ok=True)
-        target_path.write_bytes(content)
-        # click.echo(f"  + Created {filename}")
+    for parent in {(path / rel).parent for rel in template_files}:
+        parent.mkdir(parents=True, exist_ok=True)
+    futures = [
+        _write_pool.submit(_write_file, path / rel, digest, data)
+        for rel, (digest, data) in template_files.items()
+    ]
+    for future in futures:
+        future.result()
 
     # click.echo(f"+ Project initialized successfully!")
@@ -1,5 +1,11 @@
 from pathlib import Path
 
+from core.metrics import FILE_IO_SECONDS, timed_call
 
+
+@timed_call(FILE_IO_SECONDS, op="write")
 def edit_file(path: Path, content: str) -> None:
+    if path.exists() and path.stat().st_nlink > 1:
+        # Hardlinked template file: give this project its own copy.
+        path.unlink()
     path.write_text(content, encoding='utf-8')
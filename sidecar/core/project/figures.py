@@ -0,0 +1,27 @@
+"""Print-sized figures for images placed into a project from the editor.
+
+The pipeline lives in spartan_shared.figures, shared with the server; see
+that module for SPARTAN_FIGURE_OPTIMIZE and SPARTAN_FIGURE_DPI. This module
+only names the sidecar's metrics.
+"""
+from pathlib import Path
+
+from spartan_shared import figures
+from spartan_shared.figures import ENABLE_ENV  # noqa: F401
+
+from core import metrics
+
+FIGURE_BYTES_SAVED = metrics.Counter(
+    "spartan_sidecar_figure_bytes_saved_total",
+    "Bytes saved by optimizing figures placed into projects.",
+)
+
+
+def optimize_for_project(source: Path,
+                         project_root: Path,
+                         sha256: str | None = None) -> Path | None:
+    return figures.optimize_for_project(source,
+                                        project_root,
+                                        sha256,
+                                        bytes_saved=FIGURE_BYTES_SAVED,
+                                        lookups=metrics.CACHE_LOOKUPS)
@@ -1,19 +1,12 @@
 from pathlib import Path
 
-
-def _resolved_under_root(root: Path, relative: str) -> Path:
-    """Return absolute path for `relative` if it stays under `root`; else raise ValueError."""
-    root_r = root.resolve()
-    candidate = (root_r / relative).resolve()
-    try:
-        candidate.relative_to(root_r)
-    except ValueError as e:
-        raise ValueError(f"Path escapes project root: {relative!r}") from e
-    return candidate
+from core.metrics import FILE_IO_SECONDS, timed_call
+from spartan_shared.confine import resolve_under_root
 
 
+@timed_call(FILE_IO_SECONDS, op="delete")
 def delete_file(root: Path, relative: str) -> None:
-    path = _resolved_under_root(root, relative)
+    path = resolve_under_root(root, relative, for_write=True)
     if not path.exists():
         raise FileNotFoundError(f"File not found: {relative}")
     if not path.is_file():
@@ -21,9 +14,10 @@ def delete_file(root: Path, relative: str) -> None:
     path.unlink()
 
 
+@timed_call(FILE_IO_SECONDS, op="rename")
 def rename_file(root: Path, from_relative: str, to_relative: str) -> None:
-    src = _resolved_under_root(root, from_relative)
-    dst = _resolved_under_root(root, to_relative)
+    src = resolve_under_root(root, from_relative, for_write=True)
+    dst = resolve_under_root(root, to_relative, for_write=True)
     if not src.exists():
         raise FileNotFoundError(f"File not found: {from_relative}")
     if not src.is_file():
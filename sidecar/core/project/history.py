@@ -0,0 +1,339 @@
+"""Local version history of a project's files.
+
+A snapshot is a JSON manifest mapping each file to the SHA-256 of its
+content; contents live once in a blob store shared by all projects, under
+the user data dir. Each project keeps a stat index (path -> mtime, size,
+hash), so taking a snapshot stats every file but only hashes and stores the
+ones that changed since the last snapshot, and a snapshot identical to the
+previous one is not written at all.
+
+The frontend takes one when a project opens, which pays for the first full
+copy off the chat path, and one before every agent turn, so a bad agent edit
+can be undone with `restore`. Snapshots are never taken on the edit path itself.
+Build outputs and dot-directories are not tracked. The oldest snapshots are
+pruned beyond MAX_SNAPSHOTS per project, and blobs no snapshot uses any more
+are deleted then.
+"""
+import difflib
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from platformdirs import user_data_path
+
+from core.metrics import FILE_IO_SECONDS, timed_call
+from .archive import EXCLUDED_SUFFIXES
+from spartan_shared.confine import resolve_under_root
+
+MAX_SNAPSHOTS = 200
+# Pruning runs once this many snapshots over the limit have piled up, since
+# collecting unreferenced blobs reads every project's manifests.
+PRUNE_BATCH = 20
+# Blobs younger than this are never collected, so a snapshot that is still
+# being written cannot lose them.
+BLOB_GRACE = 60 * 60
+DIFF_MAX_BYTES = 1024 * 1024
+# Compile outputs; regenerated from the sources, and large.
+_UNTRACKED_FILES = {"main.pdf", "main.synctex.gz"}
+
+_locks: dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _history_root() -> Path:
+    return user_data_path(appname="spartan-write") / "history"
+
+
+def _blob_path(sha256: str) -> Path:
+    return _history_root() / "blobs" / sha256[:2] / sha256
+
+
+def _project_dir(root: Path) -> Path:
+    key = hashlib.sha256(str(root.resolve()).encode("utf-8")).hexdigest()
+    return _history_root() / "projects" / key[:32]
+
+
+def _lock_for(root: Path) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(str(root.resolve()), threading.Lock())
+
+
+def _write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def _tracked_files(root: Path):
+    for current, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        base = Path(current)
+        for name in files:
+            path = base / name
+            relative = path.relative_to(root).as_posix()
+            if (relative in _UNTRACKED_FILES
+                    or relative.endswith(EXCLUDED_SUFFIXES)):
+                continue
+            yield relative, path
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fp:
+        while chunk := fp.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store_blob(path: Path) -> str:
+    """Copy a file into the blob store if needed and return its hash."""
+    sha256 = _file_sha256(path)
+    blob = _blob_path(sha256)
+    if blob.exists():
+        # Fresh mtime keeps _collect_blobs away until the manifest is written.
+        os.utime(blob)
+        return sha256
+    tmp = _history_root() / "blobs" / f".{uuid.uuid4().hex}.tmp"
+    tmp.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    try:
+        with path.open("rb") as src, tmp.open("wb") as dst:
+            while chunk := src.read(1024 * 1024):
+                digest.update(chunk)
+                dst.write(chunk)
+        # Hash what was copied, in case the file changed since.
+        sha256 = digest.hexdigest()
+        blob = _blob_path(sha256)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, blob)
+        return sha256
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _current_files(root: Path, index: dict) -> dict[str, str]:
+    """Hash the working tree, reusing index entries whose stat is unchanged.
+
+    Updates `index` in place.
+    """
+    files = {}
+    seen = set()
+    for relative, path in _tracked_files(root):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        cached = index.get(relative)
+        if cached is not None and cached[:2] == stamp:
+            sha256 = cached[2]
+        else:
+            sha256 = _store_blob(path)
+            index[relative] = stamp + [sha256]
+        files[relative] = sha256
+        seen.add(relative)
+    for relative in set(index) - seen:
+        del index[relative]
+    return files
+
+
+def _indexed_files(root: Path, project_dir: Path) -> dict[str, str]:
+    index = _read_json(project_dir / "index.json") or {}
+    before = dict(index)
+    files = _current_files(root, index)
+    if index != before:
+        _write_json(project_dir / "index.json", index)
+    return files
+
+
+def _snapshot_ids(project_dir: Path) -> list[str]:
+    snapshots = project_dir / "snapshots"
+    if not snapshots.is_dir():
+        return []
+    return sorted(p.stem for p in snapshots.glob("*.json"))
+
+
+def _load_snapshot(project_dir: Path, snapshot_id: str) -> dict:
+    if "/" in snapshot_id or "\\" in snapshot_id or snapshot_id.startswith("."):
+        raise ValueError(f"Invalid snapshot id: {snapshot_id!r}")
+    snapshot = _read_json(project_dir / "snapshots" / f"{snapshot_id}.json")
+    if snapshot is None:
+        raise FileNotFoundError(f"Snapshot not found: {snapshot_id}")
+    return snapshot
+
+
+def _summary(snapshot: dict) -> dict:
+    return {k: v for k, v in snapshot.items() if k != "files"}
+
+
+def _collect_blobs() -> None:
+    """Delete blobs no snapshot or index of any project refers to."""
+    referenced = set()
+    for project_dir in (_history_root() / "projects").iterdir():
+        index = _read_json(project_dir / "index.json") or {}
+        referenced.update(entry[2] for entry in index.values())
+        for snapshot_id in _snapshot_ids(project_dir):
+            referenced.update(
+                _load_snapshot(project_dir, snapshot_id)["files"].values())
+    cutoff = time.time() - BLOB_GRACE
+    for blob in (_history_root() / "blobs").glob("??/*"):
+        if blob.name not in referenced and blob.stat().st_mtime < cutoff:
+            blob.unlink(missing_ok=True)
+
+
+def _prune(project_dir: Path) -> None:
+    ids = _snapshot_ids(project_dir)
+    if len(ids) <= MAX_SNAPSHOTS + PRUNE_BATCH:
+        return
+    for snapshot_id in ids[:-MAX_SNAPSHOTS]:
+        (project_dir / "snapshots" / f"{snapshot_id}.json").unlink()
+    _collect_blobs()
+
+
+@timed_call(FILE_IO_SECONDS, op="snapshot")
+def take_snapshot(root: Path, label: str = "") -> dict:
+    """Record the project's current files; returns the snapshot summary.
+
+    If nothing changed since the latest snapshot, that one is returned.
+    """
+    if not root.is_dir():
+        raise FileNotFoundError(f"Directory not found: {root}")
+    project_dir = _project_dir(root)
+    with _lock_for(root):
+        files = _indexed_files(root, project_dir)
+
+        ids = _snapshot_ids(project_dir)
+        parent = _load_snapshot(project_dir, ids[-1]) if ids else None
+        if parent is not None and parent["files"] == files:
+            return _summary(parent)
+
+        previous = parent["files"] if parent else {}
+        changed = {rel for rel, sha in files.items() if previous.get(rel) != sha}
+        changed.update(set(previous) - set(files))
+        snapshot = {
+            "id": f"{time.time_ns() // 1_000_000:013d}-{uuid.uuid4().hex[:6]}",
+            "created": time.time(),
+            "label": label,
+            "parent": parent["id"] if parent else None,
+            "file_count": len(files),
+            "changed": len(changed),
+            "files": files,
+        }
+        _write_json(project_dir / "snapshots" / f"{snapshot['id']}.json",
+                    snapshot)
+        _prune(project_dir)
+        return _summary(snapshot)
+
+
+def list_snapshots(root: Path) -> list[dict]:
+    """Snapshot summaries, newest first."""
+    project_dir = _project_dir(root)
+    return [
+        _summary(_load_snapshot(project_dir, snapshot_id))
+        for snapshot_id in reversed(_snapshot_ids(project_dir))
+    ]
+
+
+def _files_at(root: Path, snapshot_id: str | None) -> dict[str, str]:
+    """Files of a snapshot, or of the working tree when the id is None."""
+    project_dir = _project_dir(root)
+    if snapshot_id is not None:
+        return _load_snapshot(project_dir, snapshot_id)["files"]
+    with _lock_for(root):
+        return _indexed_files(root, project_dir)
+
+
+def diff(root: Path, from_id: str, to_id: str | None = None) -> dict:
+    """Added, removed and modified paths between two snapshots.
+
+    `to_id` of None compares against the current files.
+    """
+    before = _files_at(root, from_id)
+    after = _files_at(root, to_id)
+    return {
+        "added": sorted(set(after) - set(before)),
+        "removed": sorted(set(before) - set(after)),
+        "modified": sorted(p for p in set(before) & set(after)
+                           if before[p] != after[p]),
+    }
+
+
+def _blob_text(sha256: str | None) -> list[str] | None:
+    if sha256 is None:
+        return []
+    blob = _blob_path(sha256)
+    if blob.stat().st_size > DIFF_MAX_BYTES:
+        return None
+    try:
+        return blob.read_text(encoding="utf-8").splitlines(keepends=True)
+    except UnicodeDecodeError:
+        return None
+
+
+def file_diff(root: Path,
+              relative: str,
+              from_id: str,
+              to_id: str | None = None) -> str:
+    """Unified diff of one file between two snapshots (or the current files)."""
+    before = _files_at(root, from_id).get(relative)
+    after = _files_at(root, to_id).get(relative)
+    if before is None and after is None:
+        raise FileNotFoundError(f"File not found in either version: {relative}")
+    old, new = _blob_text(before), _blob_text(after)
+    if old is None or new is None:
+        return "" if before == after else f"Binary file {relative} differs\n"
+    return "".join(
+        difflib.unified_diff(old,
+                             new,
+                             fromfile=f"{from_id}/{relative}",
+                             tofile=f"{to_id or 'current'}/{relative}"))
+
+
+@timed_call(FILE_IO_SECONDS, op="restore")
+def restore(root: Path,
+            snapshot_id: str,
+            paths: list[str] | None = None) -> dict:
+    """Bring files back to a snapshot; all of them unless `paths` is given.
+
+    The current state is snapshotted first, so a restore can be undone.
+    Returns the safety snapshot id and the paths that were written/removed.
+    """
+    target = _load_snapshot(_project_dir(root), snapshot_id)["files"]
+    safety = take_snapshot(root, f"Before restoring {snapshot_id}")
+    current = _load_snapshot(_project_dir(root), safety["id"])["files"]
+    wanted = set(target) | set(current) if paths is None else set(paths)
+
+    written, removed = [], []
+    with _lock_for(root):
+        for relative in sorted(wanted):
+            sha256 = target.get(relative)
+            destination = resolve_under_root(root, relative, for_write=True)
+            if sha256 is None:
+                if relative in current:
+                    destination.unlink(missing_ok=True)
+                    removed.append(relative)
+                continue
+            if current.get(relative) == sha256:
+                continue
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            tmp = destination.with_name(
+                f".{destination.name}.{uuid.uuid4().hex}.tmp")
+            shutil.copyfile(_blob_path(sha256), tmp)
+            os.replace(tmp, destination)
+            written.append(relative)
+    return {"safety_snapshot": safety["id"], "written": written,
+            "removed": removed}
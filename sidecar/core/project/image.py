@@ -1,13 +1,73 @@
 import base64
-import re
-import shutil
-import uuid
+import hashlib
 from pathlib import Path
+from urllib.parse import quote
 
 from platformdirs import user_runtime_path
 
-
-_UUID_PREFIX_PATTERN = re.compile(r"^[0-9a-f]{32}-(.+)$")
+from spartan_shared import images
+
+from . import figures, image_store
+
+
+UPLOAD_MAX_BYTES = 25 * 1024 * 1024
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadWriter:
+    """Write an upload to the runtime dir chunk by chunk, hashing as it goes.
+
+    Nothing is held in memory beyond the current chunk. An upload that goes
+    over max_bytes is deleted and rejected with ValueError. Finished uploads
+    go into the content-addressed image store, so identical images share one
+    file.
+    """
+
+    def __init__(self,
+                 original_filename: str,
+                 max_bytes: int | None = UPLOAD_MAX_BYTES):
+        self.original_filename = Path(original_filename).name or "image"
+        self.path = image_store.incoming_path()
+        self.size = 0
+        self._max_bytes = max_bytes
+        self._hash = hashlib.sha256()
+        self._file = self.path.open("wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self._max_bytes is not None and self.size > self._max_bytes:
+            self.abort()
+            raise ValueError(
+                f"Image exceeds maximum size ({self._max_bytes // (1024 * 1024)}MB)"
+            )
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def finish(self) -> dict:
+        self._file.close()
+        if self.size == 0:
+            self.abort()
+            raise ValueError("Uploaded image is empty")
+        sha256 = self._hash.hexdigest()
+        named = image_store.ingest(self.path, sha256, self.original_filename)
+        return uploaded_image_info(named, self.size, sha256)
+
+    def abort(self) -> None:
+        self._file.close()
+        self.path.unlink(missing_ok=True)
+
+
+def uploaded_image_info(path: Path, size: int, sha256: str) -> dict:
+    """Describe a stored upload; `handle` names it in later requests."""
+    return {
+        "original_filename": images.original_filename(path.name),
+        "saved_filename": path.name,
+        "path": str(path),
+        "handle": path.name,
+        "size": size,
+        "sha256": sha256,
+        "thumbnail_url": f"/uploaded-image/{quote(path.name)}",
+    }
 
 
 def _resolve_uploaded_image_path(uploaded_path: str) -> Path:
@@ -25,37 +85,36 @@ def _resolve_uploaded_image_path(uploaded_path: str) -> Path:
     return image_path
 
 
-def _get_original_filename(filename: str) -> str:
-    """Recover original filename from runtime-uploaded image filename."""
-    match = _UUID_PREFIX_PATTERN.match(filename)
-    return match.group(1) if match else filename
-
-
-def store_uploaded_image(selected_path: str) -> tuple[str, str, str, str]:
+def store_uploaded_image(selected_path: str) -> dict:
     """Store a selected local image file in the app runtime temp dir."""
     source = Path(selected_path)
     if not source.exists() or not source.is_file():
         raise ValueError(f"Invalid image path: {selected_path}")
 
-    with source.open("rb") as source_file:
-        image_bytes = source_file.read()
+    writer = UploadWriter(source.name, max_bytes=None)
+    try:
+        with source.open("rb") as source_file:
+            while chunk := source_file.read(_COPY_CHUNK_BYTES):
+                writer.write(chunk)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.finish()
 
-    return store_uploaded_image_bytes(source.name, image_bytes)
 
-
-def store_uploaded_image_bytes(
-    original_filename: str, image_bytes: bytes
-) -> tuple[str, str, str, str]:
+def store_uploaded_image_bytes(original_filename: str,
+                               image_bytes: bytes) -> dict:
     """Store raw image bytes in the app runtime temp dir."""
-    temp_dir = user_runtime_path(appname="spartan-write", ensure_exists=True)
-    safe_name = Path(original_filename).name or "image"
-    file_path = temp_dir / f"{uuid.uuid4().hex}-{safe_name}"
+    writer = UploadWriter(original_filename)
+    writer.write(image_bytes)
+    return writer.finish()
 
-    with file_path.open("wb") as destination:
-        destination.write(image_bytes)
 
-    image_bytes_b64 = base64.b64encode(image_bytes).decode("ascii")
-    return safe_name, file_path.name, str(file_path), image_bytes_b64
+def get_uploaded_image_path(handle: str) -> Path:
+    """Resolve an upload handle to its file in the runtime dir."""
+    runtime_dir = user_runtime_path(appname="spartan-write",
+                                    ensure_exists=True)
+    return _resolve_uploaded_image_path(str(runtime_dir / Path(handle).name))
 
 
 def get_uploaded_image_bytes_b64(uploaded_path: str) -> str:
@@ -71,19 +130,11 @@ def move_uploaded_image_to_project(
     """Move uploaded image into project target directory and return relative path."""
     image_path = _resolve_uploaded_image_path(uploaded_path)
     project_root = project_root.resolve()
-    destination_dir = (project_root / target_dir).resolve()
-    destination_dir.mkdir(parents=True, exist_ok=True)
-
-    original_name = _get_original_filename(image_path.name)
-    stem = Path(original_name).stem
-    suffix = Path(original_name).suffix
-    destination = destination_dir / original_name
-    counter = 1
-    while destination.exists():
-        destination = destination_dir / f"{stem}-{counter}{suffix}"
-        counter += 1
-
-    shutil.move(str(image_path), str(destination))
+    destination = images.place_in_project(image_path, project_root,
+                                          target_dir,
+                                          figures.optimize_for_project)
+    # Only this upload name goes; the blob stays for other names and GC.
+    image_path.unlink()
     return str(destination.relative_to(project_root))
 
 
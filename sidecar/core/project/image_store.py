@@ -0,0 +1,131 @@
+"""Content-addressed store for uploaded images.
+
+Each distinct image is kept once, as images/<sha256> under the runtime dir.
+An upload is exposed as "<first 32 hex of the hash>-<original name>" next to
+it, a hardlink to that blob, so attaching the same screenshot again returns
+the same file instead of a new copy. Only the blob and its upload names share
+an inode: images moved into a project are cloned or copied from the blob
+(spartan_shared.images), so editing them in place cannot change the blob or
+another project, and an identical file already in the target folder is
+reused.
+
+`gc` removes uploads that were never used and blobs nothing links to any
+more; the sidecar runs it periodically in the background.
+"""
+import asyncio
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from platformdirs import user_runtime_path
+
+from core import metrics
+
+UPLOAD_TTL = 24 * 60 * 60
+# Blobs and partial uploads younger than this are never collected, so GC
+# cannot race an upload that is still being linked.
+GC_GRACE = 60 * 60
+GC_INTERVAL = 10 * 60
+
+IMAGE_GC_REMOVED = metrics.Counter(
+    "spartan_sidecar_image_gc_removed_total",
+    "Files removed by the upload garbage collector, by kind.",
+)
+
+
+def runtime_dir() -> Path:
+    return user_runtime_path(appname="spartan-write", ensure_exists=True)
+
+
+def blobs_dir() -> Path:
+    return runtime_dir() / "images"
+
+
+def incoming_path() -> Path:
+    """Fresh path for an upload that is still being written."""
+    incoming = runtime_dir() / ".incoming"
+    incoming.mkdir(parents=True, exist_ok=True)
+    return incoming / f"{uuid.uuid4().hex}.part"
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """Hardlink a blob to one of its upload names, copying if that fails.
+
+    For files inside the store only; project files use images.clone_or_copy.
+    """
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError:
+        # Different filesystem or no hardlink support.
+        tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+
+
+def ingest(part: Path, sha256: str, original_filename: str) -> Path:
+    """Move a fully written upload into the store and return its named path."""
+    blobs = blobs_dir()
+    blobs.mkdir(parents=True, exist_ok=True)
+    blob = blobs / sha256
+    if blob.exists():
+        part.unlink()
+        # Fresh mtime keeps GC away from a blob that is about to be linked.
+        # Only upload names share its inode, so no project file is touched.
+        os.utime(blob)
+        metrics.CACHE_LOOKUPS.inc(cache="images", result="hit")
+    else:
+        os.replace(part, blob)
+        metrics.CACHE_LOOKUPS.inc(cache="images", result="miss")
+
+    named = runtime_dir() / f"{sha256[:32]}-{original_filename}"
+    try:
+        link_or_copy(blob, named)
+    except FileExistsError:
+        # Same image under the same name: reuse it, and keep it from GC.
+        os.utime(named)
+    return named
+
+
+def gc(now: float | None = None) -> int:
+    """Remove stale uploads, orphaned blobs and abandoned partial uploads."""
+    now = time.time() if now is None else now
+    removed = 0
+    root = runtime_dir()
+    targets = [(root, "upload", UPLOAD_TTL),
+               (root / ".incoming", "partial", GC_GRACE)]
+    for directory, kind, ttl in targets:
+        if not directory.is_dir():
+            continue
+        with os.scandir(directory) as it:
+            for entry in it:
+                if (entry.is_file(follow_symlinks=False)
+                        and now - entry.stat().st_mtime > ttl):
+                    Path(entry.path).unlink(missing_ok=True)
+                    IMAGE_GC_REMOVED.inc(kind=kind)
+                    removed += 1
+
+    blobs = blobs_dir()
+    if blobs.is_dir():
+        with os.scandir(blobs) as it:
+            for entry in it:
+                stat = entry.stat(follow_symlinks=False)
+                # A link count of 1 means no upload name shares it any more.
+                if stat.st_nlink == 1 and now - stat.st_mtime > GC_GRACE:
+                    Path(entry.path).unlink(missing_ok=True)
+                    IMAGE_GC_REMOVED.inc(kind="blob")
+                    removed += 1
+    return removed
+
+
+async def gc_periodically(interval: float = GC_INTERVAL) -> None:
+    """Run `gc` off the event loop every `interval` seconds."""
+    while True:
+        try:
+            await asyncio.to_thread(gc)
+        except OSError:
+            pass
+        await asyncio.sleep(interval)
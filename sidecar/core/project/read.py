@@ -1,10 +1,18 @@
 from pathlib import Path
 
+from core.metrics import FILE_IO_SECONDS, timed_call
+from spartan_shared import paging
+# Page budgets for agent tool reads, shared with the server's local tools.
+from spartan_shared.paging import (  # noqa: F401
+    LIST_MAX_ENTRIES, READ_MAX_BYTES, READ_MAX_LINES)
 
+
+@timed_call(FILE_IO_SECONDS, op="read")
 def read_file(path: Path) -> str:
     return path.read_text(encoding='utf-8')
 
 
+@timed_call(FILE_IO_SECONDS, op="list")
 def list_files(folder_path: Path, recursive: bool = True) -> list[str]:
     """List all files in the directory, optionally recursively."""
     files = []
@@ -18,3 +26,26 @@ def list_files(folder_path: Path, recursive: bool = True) -> list[str]:
             if file_path.is_file():
                 files.append(file_path.name)
     return sorted(files)
+
+
+@timed_call(FILE_IO_SECONDS, op="read")
+def read_file_page(path: Path,
+                   offset: int = 0,
+                   limit: int = READ_MAX_LINES) -> dict:
+    """Read up to `limit` lines from line `offset`, within READ_MAX_BYTES."""
+    return paging.read_page(path, offset, limit)
+
+
+@timed_call(FILE_IO_SECONDS, op="list")
+def list_file_page(folder_path: Path,
+                   recursive: bool = True,
+                   directory: str = "",
+                   cursor: str | None = None,
+                   limit: int = LIST_MAX_ENTRIES,
+                   entries: list[tuple[str, int]] | None = None) -> dict:
+    """List files with sizes, one page at a time; see paging.list_page.
+
+    `entries` is the project's workspace index when the caller has it.
+    """
+    return paging.list_page(folder_path, recursive, directory, cursor, limit,
+                            entries)
@@ -0,0 +1,29 @@
+"""Compact text snapshot of a project for the agent's first turn.
+
+The snapshot itself is built by spartan_shared.snapshot, shared with the
+server; this module supplies the diagnostics of the last compile run by this
+sidecar. The frontend forwards the snapshot to the server when a conversation
+starts, which pins it to the thread and sends it after the system prompt.
+"""
+from pathlib import Path
+
+from core import compiler
+from spartan_shared import snapshot
+
+
+def _last_compile(dir: Path) -> str | None:
+    result = compiler.last_result(dir)
+    if result is None:
+        return None
+    status = "Succeeded" if result.success else "Failed"
+    found = snapshot.diagnostics(result.stderr)
+    return f"{status}.\n{found}" if found else f"{status} without warnings."
+
+
+def build_snapshot(dir: Path,
+                   entries: list[tuple[str, int]] | None = None) -> str | None:
+    """Snapshot a project, or None when it has no files.
+
+    `entries` is the project's workspace index when the caller has it.
+    """
+    return snapshot.build_snapshot(dir, _last_compile(dir), entries)
@@ -0,0 +1,78 @@
+"""Single-file archive of the project templates.
+
+The pack is an uncompressed zip holding `index.json` (the manifest plus, per
+template, a map of relative path to content hash) and one `blobs/<sha256>`
+entry per distinct file, so class files shared by several templates (e.g.
+IEEEtran.cls) are stored once. build.py writes it into the build directory
+and bundles it next to this module; a source checkout has no pack and reads
+the templates/ directory instead.
+
+Usage:
+    uv run python -m core.project.template_pack DEST
+"""
+import hashlib
+import json
+import sys
+import zipfile
+from pathlib import Path
+
+PACK_NAME = "templates.pack"
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+
+def _template_files(template_root: Path) -> dict[str, Path]:
+    return {
+        p.relative_to(template_root).as_posix(): p
+        for p in sorted(template_root.rglob("*")) if p.is_file()
+    }
+
+
+def pack_templates(dest: Path, src: Path = TEMPLATES_DIR) -> Path:
+    """Write every template listed in src/manifest.json into one pack."""
+    manifest = json.loads((src / "manifest.json").read_text(encoding="utf-8"))
+    index: dict = {"manifest": manifest, "templates": {}}
+    blobs: dict[str, bytes] = {}
+    for entry in manifest["templates"]:
+        files = {}
+        for rel, path in _template_files(src / entry["id"]).items():
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            blobs.setdefault(digest, data)
+            files[rel] = digest
+        index["templates"][entry["id"]] = files
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_suffix(".tmp")
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as zf:
+        zf.writestr("index.json", json.dumps(index, indent=1))
+        for digest, data in blobs.items():
+            zf.writestr(f"blobs/{digest}", data)
+    tmp.replace(dest)
+    return dest
+
+
+class TemplatePack:
+    """Read access to a pack; blobs are read on demand."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with zipfile.ZipFile(path) as zf:
+            index = json.loads(zf.read("index.json"))
+        self.manifest: dict = index["manifest"]
+        self.templates: dict[str, dict[str, str]] = index["templates"]
+
+    def files(self, template: str) -> dict[str, str]:
+        """Relative path -> sha256 for one template."""
+        if template not in self.templates:
+            raise FileNotFoundError(f"Template '{template}' not found")
+        return self.templates[template]
+
+    def read_blobs(self, digests: set[str]) -> dict[str, bytes]:
+        with zipfile.ZipFile(self.path) as zf:
+            return {d: zf.read(f"blobs/{d}") for d in digests}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(__doc__.strip().splitlines()[-1].strip())
+    print(f"+ Packed templates into {pack_templates(Path(sys.argv[1]))}")
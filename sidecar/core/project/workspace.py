@@ -0,0 +1,314 @@
+"""Open projects and the state the sidecar keeps warm for them.
+
+Endpoints get a project `dir` on every call. `workspaces.get(dir)` returns
+that project's Workspace and opens it on first use. Workspaces are keyed by
+the resolved root, so "/proj", "/proj/" and a symlink to it share one. A
+workspace holds the resolved root, resolves project-relative paths under it
+(`resolve`, through confine's checks) and keeps an index of the project's
+files. The index stays current
+by re-listing only directories whose mtime changed, which stands in for a
+file watcher without an OS notification API, and through `invalidate` calls
+from the sidecar's own writes.
+
+A workspace also owns the project's entries in the shared per-file caches:
+outline parses, file hashes and confine's trusted directories. Closing it
+drops them along with the index.
+
+Recently used workspaces stay resident. Beyond MAX_OPEN workspaces, or
+beyond MEMORY_BUDGET bytes of estimated index size, the least recently used
+ones are closed. The budget is checked when a workspace opens and whenever a
+refresh grows an index. Switching back to a closed project just rebuilds its
+index.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from core import metrics
+from spartan_shared import confine, images, outline
+from spartan_shared.confine import resolve_under_root, resolved_root
+
+MAX_OPEN = 8
+MEMORY_BUDGET = 32 * 1024 * 1024
+# Rough per-entry overhead of an indexed str, on top of its characters.
+_ENTRY_OVERHEAD = 80
+
+WORKSPACE_EVICTIONS = metrics.Counter(
+    "spartan_sidecar_workspace_evictions_total",
+    "Workspaces closed to stay within the open-project limits, by reason.",
+)
+
+
+class Workspace:
+    """One open project: its resolved root and a live index of its files."""
+
+    def __init__(self,
+                 root: Path,
+                 on_grow: Callable[[], None] | None = None):
+        self.root = resolved_root(root)
+        if not self.root.is_dir():
+            raise FileNotFoundError(f"Directory not found: {root}")
+        self.opened_at = time.time()
+        self.last_used = self.opened_at
+        self._lock = threading.Lock()
+        # Directory (relative posix path, "" for the root) -> its mtime, the
+        # names of the files directly in it, and of its subdirectories.
+        self._dirs: dict[str, tuple[int, set[str], set[str]]] = {}
+        self._sorted: list[str] | None = None
+        self._bytes = 0
+        # Called, without the lock, after a refresh grows the index.
+        self._on_grow = on_grow
+
+    def _list(self, rel_dir: str) -> bool:
+        """Index the direct contents of one directory; False if it is gone."""
+        path = os.path.join(self.root, rel_dir) if rel_dir else str(self.root)
+        try:
+            # mtime first, so a change during the listing is seen next time.
+            mtime = os.stat(path).st_mtime_ns
+            files, subdirs = set(), set()
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_file():
+                        files.add(entry.name)
+                    elif entry.is_dir(follow_symlinks=False):
+                        subdirs.add(entry.name)
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        self._dirs[rel_dir] = (mtime, files, subdirs)
+        return True
+
+    def _scan(self, rel_dir: str) -> None:
+        """Index one directory and everything below it."""
+        pending = [rel_dir]
+        while pending:
+            current = pending.pop()
+            if self._list(current):
+                pending.extend(f"{current}/{name}" if current else name
+                               for name in self._dirs[current][2])
+
+    def _drop(self, rel_dir: str) -> None:
+        prefix = f"{rel_dir}/"
+        for rel in [d for d in self._dirs if d == rel_dir or d.startswith(prefix)]:
+            del self._dirs[rel]
+
+    def _refresh(self) -> bool:
+        """Bring the index up to date; True if its estimated size grew."""
+        changed = not self._dirs
+        if changed:
+            self._scan("")
+        else:
+            for rel_dir, (mtime, _, old_subdirs) in list(self._dirs.items()):
+                if rel_dir not in self._dirs:
+                    continue  # dropped along with a parent in this pass
+                try:
+                    current = os.stat(os.path.join(self.root, rel_dir)
+                                      if rel_dir else self.root).st_mtime_ns
+                except FileNotFoundError:
+                    current = None
+                if current == mtime:
+                    continue
+                changed = True
+                if current is None or not self._list(rel_dir):
+                    self._drop(rel_dir)
+                    continue
+                # Only this directory is re-listed; subdirectories that came
+                # or went are indexed or dropped as a whole.
+                subdirs = self._dirs[rel_dir][2]
+                for name in subdirs - old_subdirs:
+                    self._scan(f"{rel_dir}/{name}" if rel_dir else name)
+                for name in old_subdirs - subdirs:
+                    self._drop(f"{rel_dir}/{name}" if rel_dir else name)
+        if changed:
+            self._sorted = sorted(
+                f"{rel_dir}/{name}" if rel_dir else name
+                for rel_dir, (_, files, _) in self._dirs.items()
+                for name in files)
+            before = self._bytes
+            self._bytes = sum(
+                len(rel) + _ENTRY_OVERHEAD for rel in self._sorted) + sum(
+                    len(rel) + _ENTRY_OVERHEAD for rel in self._dirs)
+            return self._bytes > before
+        return False
+
+    def resolve(self, relative: str, for_write: bool = False) -> Path:
+        """Absolute path of `relative`; ValueError if it leaves the project.
+
+        for_write is passed on to confine.resolve_under_root.
+        """
+        return resolve_under_root(self.root, relative, for_write)
+
+    def files(self) -> list[str]:
+        """All files in the project as sorted relative posix paths."""
+        with self._lock:
+            self.last_used = time.time()
+            grew = self._refresh()
+            files = self._sorted
+        if grew and self._on_grow is not None:
+            self._on_grow()
+        return files
+
+    def entries(self,
+                directory: str = "",
+                recursive: bool = True) -> list[tuple[str, int]]:
+        """(path, size) for files under `directory`, sorted by path.
+
+        Sizes are read fresh, since in-place edits do not touch the index.
+        """
+        directory = directory.strip("/")
+        with self._lock:
+            self.last_used = time.time()
+            grew = self._refresh()
+            known = not directory or directory in self._dirs
+            files = self._sorted
+        if grew and self._on_grow is not None:
+            self._on_grow()
+        if not known:
+            raise FileNotFoundError(f"Directory not found: {directory}")
+        prefix = f"{directory}/" if directory else ""
+        start = bisect.bisect_left(files, prefix)
+        root = str(self.root)
+        result = []
+        for rel in files[start:]:
+            if not rel.startswith(prefix):
+                break
+            if not recursive and "/" in rel[len(prefix):]:
+                continue
+            try:
+                result.append((rel, os.stat(os.path.join(root, rel)).st_size))
+            except FileNotFoundError:
+                continue
+        return result
+
+    def invalidate(self, relative: str | None = None) -> None:
+        """Re-list the directory holding `relative`, or everything, next time.
+
+        For writes made through the sidecar, which may land within the same
+        mtime tick as the last listing.
+        """
+        with self._lock:
+            parent = (os.path.dirname(relative.strip("/").replace(
+                os.sep, "/")) if relative is not None else None)
+            if parent in self._dirs:
+                _, files, subdirs = self._dirs[parent]
+                self._dirs[parent] = (-1, files, subdirs)
+            else:
+                self._dirs.clear()
+
+    def close(self) -> None:
+        """Drop the index and the project's entries in the shared caches.
+
+        A request still holding the workspace just rebuilds the index.
+        """
+        with self._lock:
+            self._dirs.clear()
+            self._sorted = None
+            self._bytes = 0
+        outline.forget(self.root)
+        images.forget(self.root)
+        confine.forget(self.root)
+
+    def approx_bytes(self) -> int:
+        """Estimated memory held by the index."""
+        return self._bytes
+
+    def stats(self) -> dict:
+        return {
+            "root": str(self.root),
+            "opened_at": self.opened_at,
+            "last_used": self.last_used,
+            "files": len(self._sorted or ()),
+            "approx_bytes": self._bytes,
+        }
+
+
+class WorkspaceManager:
+    """Least-recently-used set of open workspaces."""
+
+    def __init__(self,
+                 max_open: int = MAX_OPEN,
+                 memory_budget: int = MEMORY_BUDGET):
+        self.max_open = max_open
+        self.memory_budget = memory_budget
+        self._lock = threading.Lock()
+        self._open: OrderedDict[str, Workspace] = OrderedDict()
+
+    @staticmethod
+    def _key(dir: Path | str) -> str:
+        return str(resolved_root(Path(dir).absolute()))
+
+    def get(self, dir: Path | str) -> Workspace:
+        """Return the workspace for `dir`, opening it if needed."""
+        key = self._key(dir)
+        with self._lock:
+            workspace = self._open.get(key)
+            if workspace is not None:
+                self._open.move_to_end(key)
+                metrics.CACHE_LOOKUPS.inc(cache="workspaces", result="hit")
+                return workspace
+        metrics.CACHE_LOOKUPS.inc(cache="workspaces", result="miss")
+        workspace = Workspace(Path(key), on_grow=self._enforce_limits)
+        with self._lock:
+            workspace = self._open.setdefault(key, workspace)
+            self._open.move_to_end(key)
+            evicted = self._evict()
+        for closed in evicted:
+            closed.close()
+        return workspace
+
+    def _evict(self) -> list[Workspace]:
+        """Pop workspaces past the limits; the caller closes them unlocked."""
+        evicted = []
+        while len(self._open) > self.max_open:
+            evicted.append(self._open.popitem(last=False)[1])
+            WORKSPACE_EVICTIONS.inc(reason="count")
+        total = sum(w.approx_bytes() for w in self._open.values())
+        while total > self.memory_budget and len(self._open) > 1:
+            _, workspace = self._open.popitem(last=False)
+            total -= workspace.approx_bytes()
+            evicted.append(workspace)
+            WORKSPACE_EVICTIONS.inc(reason="memory")
+        return evicted
+
+    def _enforce_limits(self) -> None:
+        with self._lock:
+            evicted = self._evict()
+        for workspace in evicted:
+            workspace.close()
+
+    def invalidate(self, dir: Path | str, relative: str | None = None) -> None:
+        """Tell an open workspace about a write; a no-op if it is not open."""
+        with self._lock:
+            workspace = self._open.get(self._key(dir))
+        if workspace is not None:
+            workspace.invalidate(relative)
+
+    def close(self, dir: Path | str) -> bool:
+        with self._lock:
+            workspace = self._open.pop(self._key(dir), None)
+        if workspace is None:
+            return False
+        workspace.close()
+        return True
+
+    def open_count(self) -> int:
+        with self._lock:
+            return len(self._open)
+
+    def stats(self) -> list[dict]:
+        """Open workspaces, most recently used first."""
+        with self._lock:
+            open_workspaces = list(reversed(self._open.values()))
+        return [w.stats() for w in open_workspaces]
+
+
+workspaces = WorkspaceManager()
+
+metrics.Collector(
+    "spartan_sidecar_workspaces_open",
+    "Projects with a resident workspace.",
+    lambda: [({}, workspaces.open_count())],
+)
@@ -2,5 +2,6 @@ from . import first_run
 from .nuke import nuke_config
 from .fetch import fetch_all, fetch_one
 from .update import update_config
+from .store import store
 
-__all__ = ["first_run", "nuke", "fetch", "update_config"]
+__all__ = ["first_run", "nuke", "fetch", "update_config", "store"]
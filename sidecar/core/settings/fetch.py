@@ -1,22 +1,9 @@
-from core.settings.common import get_config_dir
-from core.settings.first_run import is_first_run, setup_first_run
-import tomlkit
+from core.settings.store import store
 
 
 def fetch_all() -> dict:
-    if is_first_run():
-        setup_first_run()
-
-    config_dir = get_config_dir()
-    config_file = config_dir / "config.toml"
-    if not config_file.exists():
-        return {}
-    fp = open(config_file, encoding="utf-8")
-    config = tomlkit.load(fp)
-    fp.close()
-    return config
+    return store.get_all()
 
 
 def fetch_one(key: str) -> str:
-    config = fetch_all()
-    return config.get(key, None)
+    return store.get(key)
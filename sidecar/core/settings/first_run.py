@@ -1,5 +1,4 @@
 from core.settings.common import get_config_dir
-import tomlkit
 
 
 def is_first_run() -> bool:
@@ -7,6 +6,8 @@ def is_first_run() -> bool:
 
 
 def setup_first_run() -> None:
+    import tomlkit
+
     config_dir = get_config_dir()
     config_dir.mkdir(parents=True, exist_ok=True)
 
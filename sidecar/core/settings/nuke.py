@@ -1,4 +1,5 @@
 from core.settings.common import get_config_dir
+from core.settings.store import store
 
 
 def nuke_config() -> None:
@@ -8,6 +9,7 @@ def nuke_config() -> None:
         return
 
     # click.echo("+ Nuking config...")
+    store.invalidate()
 
     config_dir = get_config_dir()
     if not config_dir.exists():
@@ -0,0 +1,138 @@
+"""Process-wide, in-memory view of config.toml.
+
+The file is parsed once and reads are served from memory. The store notices
+edits made outside the sidecar by checking the file's mtime and size, at most
+every STAT_INTERVAL seconds. Updates apply to memory at once and reach disk
+after DEBOUNCE seconds of quiet, via a temp file and an atomic rename, so a
+burst of changes from the settings UI costs one write.
+"""
+import atexit
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from core.metrics import CACHE_LOOKUPS
+from core.settings.common import get_config_dir
+from core.settings.first_run import is_first_run, setup_first_run
+
+if TYPE_CHECKING:
+    import tomlkit
+
+STAT_INTERVAL = 0.5
+DEBOUNCE = 0.25
+
+
+class SettingsStore:
+
+    def __init__(self, config_file: Path | None = None):
+        self._config_file = config_file
+        self._lock = threading.RLock()
+        self._config: "tomlkit.TOMLDocument | None" = None
+        self._stamp: tuple[int, int] | None = None
+        self._checked_at = 0.0
+        self._dirty = False
+        self._timer: threading.Timer | None = None
+
+    @property
+    def config_file(self) -> Path:
+        return self._config_file or get_config_dir() / "config.toml"
+
+    def _file_stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = self.config_file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> "tomlkit.TOMLDocument":
+        """Return the parsed config, re-reading it if the file changed."""
+        now = time.monotonic()
+        if self._config is not None and (self._dirty or now - self._checked_at
+                                         < STAT_INTERVAL):
+            CACHE_LOOKUPS.inc(cache="settings", result="hit")
+            return self._config
+        self._checked_at = now
+        if self._config_file is None and is_first_run():
+            setup_first_run()
+        stamp = self._file_stamp()
+        if self._config is not None and stamp == self._stamp:
+            CACHE_LOOKUPS.inc(cache="settings", result="hit")
+            return self._config
+
+        CACHE_LOOKUPS.inc(cache="settings", result="miss")
+        # Deferred until the first read so it stays off the startup path.
+        import tomlkit
+
+        if stamp is None:
+            self._config = tomlkit.document()
+        else:
+            self._config = tomlkit.loads(
+                self.config_file.read_text(encoding="utf-8"))
+        self._stamp = stamp
+        return self._config
+
+    def get_all(self) -> dict:
+        with self._lock:
+            return dict(self._load())
+
+    def get(self, key: str):
+        with self._lock:
+            return self._load().get(key, None)
+
+    def update(self, updates: dict) -> dict:
+        """Apply updates in memory and schedule a write."""
+        with self._lock:
+            config = self._load()
+            for key, value in updates.items():
+                config[key] = value
+            self._dirty = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(DEBOUNCE, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+            return dict(config)
+
+    def flush(self) -> None:
+        """Write pending updates now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty or self._config is None:
+                return
+            path = self.config_file
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent,
+                                       prefix=".config-",
+                                       suffix=".toml")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                    fp.write(self._config.as_string())
+                    fp.flush()
+                    os.fsync(fp.fileno())
+                os.replace(tmp, path)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+            self._dirty = False
+            # Our own write must not look like an outside edit.
+            self._stamp = self._file_stamp()
+            self._checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Drop the in-memory copy, discarding pending updates."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._config = None
+            self._stamp = None
+            self._dirty = False
+
+
+store = SettingsStore()
+atexit.register(store.flush)
@@ -0,0 +1,60 @@
+import pytest
+
+from core.project import history
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "user_data_path",
+                        lambda **kwargs: tmp_path / "data")
+    root = tmp_path / "project"
+    (root / "figures").mkdir(parents=True)
+    (root / "main.tex").write_text("\\section{Intro}\n")
+    (root / "figures" / "plot.png").write_bytes(b"png")
+    return root
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    """Paths copied into the blob store."""
+    paths = []
+    store_blob = history._store_blob
+
+    def counting(path):
+        paths.append(path.name)
+        return store_blob(path)
+
+    monkeypatch.setattr(history, "_store_blob", counting)
+    return paths
+
+
+def written(project_dir):
+    return {
+        p.relative_to(project_dir).as_posix(): p.stat().st_mtime_ns
+        for p in project_dir.rglob("*.json")
+    }
+
+
+def test_an_unchanged_project_writes_nothing(project, stored):
+    first = history.take_snapshot(project, "Project opened")
+    project_dir = history._project_dir(project)
+    before = written(project_dir)
+    stored.clear()
+
+    again = history.take_snapshot(project, "Before agent turn")
+
+    assert again == first
+    assert stored == []
+    assert written(project_dir) == before
+    assert len(history.list_snapshots(project)) == 1
+
+
+def test_only_changed_files_are_stored(project, stored):
+    history.take_snapshot(project)
+    stored.clear()
+    (project / "main.tex").write_text("\\section{Introduction}\n")
+
+    snapshot = history.take_snapshot(project)
+
+    assert stored == ["main.tex"]
+    assert snapshot["changed"] == 1
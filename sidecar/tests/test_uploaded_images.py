@@ -0,0 +1,88 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from api.server import app
+from core.project import image, image_store
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+@pytest.fixture(autouse=True)
+def runtime_dir(tmp_path, monkeypatch):
+    runtime = tmp_path / "runtime"
+    runtime.mkdir()
+    # Both modules ask platformdirs for the runtime dir on every call.
+    for module in (image, image_store):
+        monkeypatch.setattr(module, "user_runtime_path",
+                            lambda **kwargs: runtime)
+    return runtime
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def twins():
+    """The same bytes attached twice, under two names."""
+    return (image.store_uploaded_image_bytes("plot.png", PNG),
+            image.store_uploaded_image_bytes("copy.png", PNG))
+
+
+def test_twins_share_one_blob(twins):
+    first, second = twins
+    assert first["sha256"] == second["sha256"]
+    assert first["path"] != second["path"]
+    assert len(list(image_store.blobs_dir().iterdir())) == 1
+
+
+def test_removing_one_twin_keeps_the_other(client, twins):
+    first, second = twins
+    image.remove_uploaded_image(first["path"])
+
+    assert client.get(first["thumbnail_url"]).status_code == 404
+    response = client.get(second["thumbnail_url"])
+    assert response.status_code == 200
+    assert response.content == PNG
+
+
+def test_moving_one_twin_keeps_the_other_and_the_blob(client, twins,
+                                                      tmp_path):
+    first, second = twins
+    project_root = tmp_path / "project"
+    project_root.mkdir()
+    moved = image.move_uploaded_image_to_project(first["path"], project_root)
+
+    response = client.get(second["thumbnail_url"])
+    assert response.status_code == 200
+    assert response.content == PNG
+    # The project gets its own copy: editing it leaves the blob alone.
+    (project_root / moved).write_bytes(b"edited")
+    assert client.get(second["thumbnail_url"]).content == PNG
+    blob = image_store.blobs_dir() / first["sha256"]
+    assert blob.stat().st_nlink == 2
+
+
+def test_moving_twins_reuses_the_identical_figure(twins, tmp_path):
+    first, second = twins
+    project_root = tmp_path / "project"
+    project_root.mkdir()
+    assert (image.move_uploaded_image_to_project(
+        first["path"], project_root) == image.move_uploaded_image_to_project(
+            second["path"], project_root) == "figures/plot.png")
+    assert [p.name for p in (project_root / "figures").iterdir()
+            ] == ["plot.png"]
+
+
+def test_a_name_clash_with_other_content_gets_a_hash_suffix(twins,
+                                                            tmp_path):
+    first, _ = twins
+    figures = tmp_path / "project" / "figures"
+    figures.mkdir(parents=True)
+    (figures / "plot.png").write_bytes(b"another plot")
+
+    moved = image.move_uploaded_image_to_project(first["path"],
+                                                 tmp_path / "project")
+    assert moved == f"figures/plot-{first['sha256'][:8]}.png"
+    assert (figures / "plot.png").read_bytes() == b"another plot"
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+from core.project.workspace import WorkspaceManager
+from spartan_shared import confine, images, outline
+
+
+def make_project(root: Path, files: int = 1) -> Path:
+    (root / "sections").mkdir(parents=True)
+    (root / "main.tex").write_text("\\section{Intro}\n")
+    for i in range(files):
+        (root / "sections" / f"part-{i:04}.tex").write_text("text\n")
+    return root
+
+
+def cached_under(root: Path) -> dict[str, int]:
+    prefix = f"{root.resolve()}/"
+    return {
+        "outline": sum(k.startswith(prefix) for k in outline._cache),
+        "hashes": sum(k[0].startswith(prefix) for k in images._hash_cache),
+        "dirs": sum(k.startswith(prefix) for k in confine._plain_dirs),
+    }
+
+
+def warm(manager: WorkspaceManager, root: Path) -> None:
+    workspace = manager.get(root)
+    workspace.files()
+    outline.project_outline(workspace.root)
+    images.file_sha256(workspace.resolve("main.tex"))
+    workspace.resolve("sections/part-0000.tex")
+
+
+@pytest.fixture
+def projects(tmp_path):
+    return [make_project(tmp_path / name) for name in ("a", "b")]
+
+
+def test_eviction_drops_the_project_from_shared_caches(projects):
+    first, second = projects
+    manager = WorkspaceManager(max_open=1)
+    warm(manager, first)
+    assert all(cached_under(first).values())
+
+    warm(manager, second)
+
+    assert manager.open_count() == 1
+    assert cached_under(first) == {"outline": 0, "hashes": 0, "dirs": 0}
+    assert all(cached_under(second).values())
+
+
+def test_close_drops_the_index_and_caches(projects):
+    first, _ = projects
+    manager = WorkspaceManager()
+    warm(manager, first)
+    workspace = manager.get(first)
+
+    assert manager.close(first)
+
+    assert manager.open_count() == 0
+    assert workspace.approx_bytes() == 0
+    assert cached_under(first) == {"outline": 0, "hashes": 0, "dirs": 0}
+
+
+def test_budget_is_enforced_when_an_index_grows(tmp_path):
+    small = make_project(tmp_path / "small")
+    large = tmp_path / "large"
+    large.mkdir()
+    manager = WorkspaceManager(memory_budget=20_000)
+    manager.get(small).files()
+    workspace = manager.get(large)
+    assert manager.open_count() == 2
+
+    make_project(large, files=200)
+    workspace.files()
+
+    assert workspace.approx_bytes() > manager.memory_budget
+    assert [s["root"] for s in manager.stats()] == [str(large.resolve())]